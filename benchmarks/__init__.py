@@ -0,0 +1,12 @@
+"""
+心理测试反馈报告生成器 - 性能基准测试
+从项目根目录运行，例如：python -m benchmarks.bench_store_memory
+"""
+
+import os
+import sys
+
+# 与 src/main.py 一致：将src目录加入Python路径，以便直接导入各模块
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
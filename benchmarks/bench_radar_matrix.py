@@ -0,0 +1,160 @@
+"""
+雷达图渲染参数矩阵基准测试
+
+对 RadarChartGenerator 影响渲染开销的参数（dpi、图形尺寸、测评项目数量、数据点标记、
+区域填充、保存时裁剪边界、PNG压缩优化）做全组合测试，每种组合分别测量：
+- build:  创建图形（坐标轴、刻度、标签等，create_figure）
+- canvas: 绘制到画布（fig.canvas.draw()）
+- encode: 编码为PNG字节（encode_figure，含保存时的重新绘制）
+- bytes:  PNG大小
+
+结果以表格输出，可同时写入JSON或CSV，用于为正式批量生成选择默认参数。
+
+用法：
+    python -m benchmarks.bench_radar_matrix
+    python -m benchmarks.bench_radar_matrix --dpi 150,300 --variables 6,12,30 --output radar.csv
+    python -m benchmarks.bench_radar_matrix --tight 0,1 --optimize 0,1 --repeat 5
+"""
+
+import argparse
+import csv
+import gc
+import itertools
+import json
+import statistics
+import time
+from typing import Any, Dict, List
+
+import matplotlib.pyplot as plt
+
+from benchmarks.synthetic import make_cohort
+from participant_store import ParticipantStore
+from radar_chart import RadarChartGenerator
+
+
+# 默认参数矩阵（第一个取值为当前默认值）
+DEFAULT_MATRIX = {
+    'dpi': [300, 150],
+    'size': [8],
+    'variables': [6, 12],
+    'markers': [1, 0],
+    'fill': [1],
+    'tight': [1, 0],
+    'optimize': [1],
+}
+
+FIELDS = ('dpi', 'size', 'variables', 'markers', 'fill', 'tight', 'optimize',
+          'build_ms', 'canvas_ms', 'encode_ms', 'total_ms', 'png_kb')
+
+
+def _median_ms(durations: List[float]) -> float:
+    return statistics.median(durations) * 1000
+
+
+def measure(dpi: int, size: int, variables: int, markers: bool, fill: bool, tight: bool,
+            optimize: bool, repeat: int) -> Dict[str, Any]:
+    """测量一种参数组合，返回各阶段耗时中位数（毫秒）和PNG大小"""
+    store = ParticipantStore.from_dataframe(make_cohort(repeat + 1, variables, missing_rate=0))
+    generator = RadarChartGenerator(figure_size=(size, size), dpi=dpi,
+                                    tight_bbox=tight, png_optimize=optimize)
+    generator.style_config['show_markers'] = markers
+    generator.style_config['show_fill'] = fill
+    generator.set_variables(store.score_columns)
+
+    rows = list(store)
+    # 预热：首次绘图会加载字体等
+    plt.close(generator.create_figure(rows[0]))
+
+    build, canvas, encode, sizes = [], [], [], []
+    for row in rows[1:]:
+        gc.collect()
+        start = time.perf_counter()
+        fig = generator.create_figure(row)
+        built = time.perf_counter()
+        fig.canvas.draw()
+        drawn = time.perf_counter()
+        image_bytes = generator.encode_figure(fig)
+        encoded = time.perf_counter()
+        plt.close(fig)
+
+        build.append(built - start)
+        canvas.append(drawn - built)
+        encode.append(encoded - drawn)
+        sizes.append(len(image_bytes))
+
+    return {
+        'dpi': dpi, 'size': size, 'variables': variables,
+        'markers': int(markers), 'fill': int(fill), 'tight': int(tight), 'optimize': int(optimize),
+        'build_ms': _median_ms(build),
+        'canvas_ms': _median_ms(canvas),
+        'encode_ms': _median_ms(encode),
+        # 正式生成时不单独绘制画布，总耗时为创建图形 + 编码
+        'total_ms': _median_ms(build) + _median_ms(encode),
+        'png_kb': statistics.median(sizes) / 1024,
+    }
+
+
+def run_matrix(matrix: Dict[str, List[int]], repeat: int) -> List[Dict[str, Any]]:
+    """按参数矩阵的全部组合依次测量"""
+    keys = list(DEFAULT_MATRIX)
+    results = []
+    combinations = list(itertools.product(*(matrix[key] for key in keys)))
+    for i, values in enumerate(combinations, 1):
+        params = dict(zip(keys, values))
+        print(f"  [{i}/{len(combinations)}] {json.dumps(params)}", flush=True)
+        results.append(measure(repeat=repeat, **params))
+    return results
+
+
+def format_table(results: List[Dict[str, Any]]) -> str:
+    """以Markdown表格输出，按总耗时排序"""
+    header = "| " + " | ".join(FIELDS) + " |"
+    lines = [header, "|" + "---:|" * len(FIELDS)]
+    for result in sorted(results, key=lambda r: r['total_ms']):
+        cells = [f"{result[field]:.1f}" if isinstance(result[field], float) else str(result[field])
+                 for field in FIELDS]
+        lines.append("| " + " | ".join(cells) + " |")
+    return "\n".join(lines)
+
+
+def write_results(results: List[Dict[str, Any]], output: str):
+    """写入JSON或CSV（按扩展名）"""
+    if output.lower().endswith('.csv'):
+        with open(output, 'w', newline='', encoding='utf-8-sig') as f:
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            writer.writerows(results)
+    else:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="雷达图渲染参数矩阵基准测试")
+    parser.add_argument('--dpi', type=_int_list, help="分辨率，如 150,200,300")
+    parser.add_argument('--sizes', dest='size', type=_int_list, help="图形尺寸（英寸，正方形），如 6,8")
+    parser.add_argument('--variables', type=_int_list, help="测评项目数量，如 3,12,30")
+    parser.add_argument('--markers', type=_int_list, help="是否绘制数据点标记：1,0")
+    parser.add_argument('--fill', type=_int_list, help="是否填充数据区域：1,0")
+    parser.add_argument('--tight', type=_int_list, help="保存时是否裁剪边界：1,0")
+    parser.add_argument('--optimize', type=_int_list, help="是否压缩优化PNG：1,0")
+    parser.add_argument('--repeat', type=int, default=3, help="每种组合的测量次数")
+    parser.add_argument('--output', help="将结果写入JSON或CSV文件")
+    args = parser.parse_args()
+
+    matrix = {key: getattr(args, key) or default for key, default in DEFAULT_MATRIX.items()}
+    results = run_matrix(matrix, args.repeat)
+    print()
+    print(format_table(results))
+
+    if args.output:
+        write_results(results, args.output)
+        print(f"结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
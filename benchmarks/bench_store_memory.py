@@ -0,0 +1,101 @@
+"""
+受试者数据内存占用基准测试
+
+对比两种内存表示的峰值RSS（按每1万名受试者折算）：
+- before: DataFrame + 逐行 pd.Series（原 iterrows 方式）
+- after:  ParticipantStore 列式存储 + 按需创建的 ParticipantRecord
+
+每种表示在独立子进程中测量，避免相互影响。
+
+用法：
+    python -m benchmarks.bench_store_memory --rows 10000 --scores 12
+"""
+
+import argparse
+import gc
+import json
+import subprocess
+import sys
+
+import psutil
+
+from participant_store import ParticipantStore
+from benchmarks.synthetic import make_cohort
+
+
+DISCLAIMER = "测试结果与受试者当时的状态有关，良好状态下的评估结果更可靠。" * 3
+
+
+def _peak_rss() -> int:
+    """进程峰值RSS（字节）"""
+    info = psutil.Process().memory_info()
+    if hasattr(info, 'peak_wset'):
+        return info.peak_wset
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _measure(mode: str, rows: int, score_count: int) -> dict:
+    """在当前进程中构建指定表示并返回内存统计"""
+    process = psutil.Process()
+    gc.collect()
+    base_rss = process.memory_info().rss
+
+    df = make_cohort(rows, score_count, note=DISCLAIMER)
+    if mode == 'before':
+        held = [row for _, row in df.iterrows()]
+    else:
+        held = ParticipantStore.from_dataframe(df)
+        del df
+        # 模拟渲染循环：记录按需创建，不长期持有
+        for record in held:
+            record.get('ID')
+    gc.collect()
+
+    retained = process.memory_info().rss - base_rss
+    return {
+        'mode': mode,
+        'rows': rows,
+        'scores': score_count,
+        'retained_rss': retained,
+        'peak_rss': _peak_rss(),
+        'retained_rss_per_10k': retained * 10000 / rows,
+        'held_type': type(held).__name__,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="受试者数据内存占用基准测试")
+    parser.add_argument('--rows', type=int, default=10000, help="受试者数量")
+    parser.add_argument('--scores', type=int, default=12, help="测评变量数量")
+    parser.add_argument('--json', help="将结果写入JSON文件")
+    parser.add_argument('--measure', choices=['before', 'after'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(_measure(args.measure, args.rows, args.scores)))
+        return
+
+    results = []
+    for mode in ('before', 'after'):
+        output = subprocess.run(
+            [sys.executable, '-m', 'benchmarks.bench_store_memory', '--measure', mode,
+             '--rows', str(args.rows), '--scores', str(args.scores)],
+            check=True, capture_output=True, text=True
+        ).stdout
+        results.append(json.loads(output.strip().splitlines()[-1]))
+
+    mb = 1024 * 1024
+    print(f"受试者数量: {args.rows}，测评变量: {args.scores}")
+    print(f"{'表示':<8}{'常驻增量(MB)':>14}{'每1万人(MB)':>14}{'峰值RSS(MB)':>14}")
+    for item in results:
+        print(f"{item['mode']:<8}{item['retained_rss'] / mb:>14.1f}"
+              f"{item['retained_rss_per_10k'] / mb:>14.1f}{item['peak_rss'] / mb:>14.1f}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+"""
+性能回归检查
+
+以固定规模（GATE_SETTINGS）运行基准测试，将各项目的耗时中位数、单份报告各阶段耗时和峰值内存
+与提交在仓库中的基准文件（benchmarks/baseline.json）对比，超过容差时列出差异并以非0状态退出。
+
+不同机器的速度不同：基准文件中记录了一段固定计算的校准耗时，对比前先按本机与基准机器的
+校准耗时之比换算基准值。
+
+为避免测量噪声造成误报，首轮发现异常时再重复测量（共 CONFIRM_ROUNDS 轮），
+只有每一轮都超出容差的项目才判定为回归；耗时比基准减少一半以上的项目同样判定为失败
+（通常是渲染出错、提前返回，而不是真的变快了）。
+
+用法：
+    python -m benchmarks.regression_gate                 # 对比并输出差异
+    python -m benchmarks.regression_gate --tolerance 0.5
+    python -m benchmarks.regression_gate --update        # 用本次结果更新基准文件
+"""
+
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+
+from benchmarks.run_benchmarks import run_suite
+
+
+BASELINE_FILE = Path(__file__).parent / "baseline.json"
+
+# 回归检查使用的固定测试规模
+GATE_SETTINGS = {
+    'rows': [1000],
+    'scores': [12],
+    'tiers': [3],
+    'kinds': ['numeric'],
+    'render_rows': 5,
+    'repeat': 5,
+    'workers': 1,
+}
+
+GATE_BENCHMARKS = ('load', 'config', 'evaluate', 'radar', 'layout')
+
+# 默认容差：耗时比基准慢25%以上、峰值内存比基准高20%以上视为回归
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_MEMORY_TOLERANCE = 0.20
+
+# 耗时比基准减少该比例以上视为异常（如渲染失败）
+DEFAULT_DROP_TOLERANCE = 0.50
+
+# 首轮发现异常时最多测量的总轮数，每一轮都异常才判定失败
+CONFIRM_ROUNDS = 3
+
+# 低于该耗时（秒）的差异视为测量噪声，不判定为回归
+NOISE_FLOOR = 0.005
+
+
+def calibrate(repeat: int = 7) -> float:
+    """
+    运行一段固定的Python和numpy计算（每次约0.1-0.3秒），返回耗时中位数（秒），用于换算不同机器的速度
+    """
+    rng = np.random.default_rng(0)
+    data = rng.normal(size=2_000_000)
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        np.sort(data)
+        total = 0
+        for i in range(2_000_000):
+            total += i % 7
+        durations.append(time.perf_counter() - start)
+    return float(np.median(durations))
+
+
+def collect_metrics(report: Dict[str, Any]) -> Dict[str, float]:
+    """
+    从基准测试结果中提取对比指标
+
+    Returns:
+        {指标名: 秒数}，指标名形如 "radar scores=12" 或 "layout scores=12 tiers=3 / build"
+    """
+    metrics = {}
+    for record in report['results']:
+        params = " ".join(f"{key}={value}" for key, value in record['params'].items())
+        name = f"{record['benchmark']} {params}"
+        metrics[name] = record['seconds']['median']
+        for stage, seconds in record.get('stages', {}).items():
+            metrics[f"{name} / {stage}"] = seconds
+    return metrics
+
+
+def run_gate() -> Dict[str, Any]:
+    """运行固定规模的基准测试，返回可保存为基准文件的结果"""
+    calibration = calibrate()
+    report = run_suite(GATE_SETTINGS, GATE_BENCHMARKS)
+    return {
+        'environment': report['environment'],
+        'settings': GATE_SETTINGS,
+        'calibration': calibration,
+        'metrics': collect_metrics(report),
+        'peak_rss': report['peak_rss'],
+    }
+
+
+def _changes(baseline: Dict[str, Any], current: Dict[str, Any]) -> Dict[str, Tuple[float, float, float]]:
+    """各指标按机器速度换算后的 (基准值, 本次值, 变化比例)；本次缺少的指标不包含在内"""
+    scale = current['calibration'] / baseline['calibration'] if baseline.get('calibration') else 1.0
+    changes = {}
+    for name, base_value in baseline['metrics'].items():
+        value = current['metrics'].get(name)
+        if value is None:
+            continue
+        expected = base_value * scale
+        changes[name] = (expected, value, value / expected - 1 if expected > 0 else 0.0)
+    return changes
+
+
+def _status(expected: float, value: float, change: float, tolerance: float, drop_tolerance: float) -> str:
+    """单个指标的判定：回归 / 异常下降 / 正常"""
+    if abs(value - expected) <= NOISE_FLOOR:
+        return "正常"
+    if change > tolerance:
+        return "回归"
+    if change < -drop_tolerance:
+        return "异常下降"
+    return "正常"
+
+
+def compare(baseline: Dict[str, Any], rounds: List[Dict[str, Any]], tolerance: float = DEFAULT_TOLERANCE,
+            memory_tolerance: float = DEFAULT_MEMORY_TOLERANCE,
+            drop_tolerance: float = DEFAULT_DROP_TOLERANCE) -> Tuple[List[str], List[str]]:
+    """
+    对比各轮测量结果与基准
+
+    每个指标取与基准最接近的一轮显示，只有每一轮都回归（或都异常下降）时才列为失败项。
+
+    Args:
+        baseline: 基准文件内容
+        rounds: 各轮 run_gate() 的结果（至少一轮）
+
+    Returns:
+        (对比表各行, 失败项列表)
+    """
+    current = rounds[0]
+    scale = current['calibration'] / baseline['calibration'] if baseline.get('calibration') else 1.0
+    lines = [f"机器速度换算系数: {scale:.2f}（本机校准 {current['calibration'] * 1000:.1f} ms，"
+             f"基准 {baseline.get('calibration', 0) * 1000:.1f} ms），共测量 {len(rounds)} 轮",
+             "",
+             f"{'指标':<48}{'基准(ms)':>12}{'本次(ms)':>12}{'变化':>10}  结果"]
+    regressions = []
+    if baseline.get('settings') != GATE_SETTINGS:
+        regressions.append("基准文件的测试规模与 GATE_SETTINGS 不一致，请用 --update 重新记录基准")
+
+    per_round = [_changes(baseline, result) for result in rounds]
+    for name, base_value in baseline['metrics'].items():
+        measured = [changes[name] for changes in per_round if name in changes]
+        if len(measured) < len(rounds):
+            lines.append(f"{name:<48}{base_value * scale * 1000:>12.2f}{'-':>12}{'-':>10}  缺失")
+            regressions.append(f"{name}: 本次结果中缺少该指标")
+            continue
+        statuses = {_status(*item, tolerance, drop_tolerance) for item in measured}
+        expected, value, change = min(measured, key=lambda item: abs(item[2]))
+        status = statuses.pop() if len(statuses) == 1 else "正常"
+        lines.append(f"{name:<48}{expected * 1000:>12.2f}{value * 1000:>12.2f}{change:>+10.0%}  {status}")
+        if status == "回归":
+            regressions.append(f"{name}: {expected * 1000:.2f} ms -> {value * 1000:.2f} ms（{change:+.0%}，"
+                               f"容差 {tolerance:.0%}）")
+        elif status == "异常下降":
+            regressions.append(f"{name}: {expected * 1000:.2f} ms -> {value * 1000:.2f} ms（{change:+.0%}），"
+                               f"耗时减少超过 {drop_tolerance:.0%}，请检查该环节是否出错")
+
+    for name in current['metrics'].keys() - baseline['metrics'].keys():
+        lines.append(f"{name:<48}{'-':>12}{current['metrics'][name] * 1000:>12.2f}{'-':>10}  新增")
+
+    mb = 1024 * 1024
+    current = min(rounds, key=lambda result: result['peak_rss'])
+    memory_change = current['peak_rss'] / baseline['peak_rss'] - 1
+    memory_regressed = memory_change > memory_tolerance
+    lines.append("")
+    lines.append(f"{'峰值内存(MB)':<48}{baseline['peak_rss'] / mb:>12.1f}{current['peak_rss'] / mb:>12.1f}"
+                 f"{memory_change:>+10.0%}  {'回归' if memory_regressed else '正常'}")
+    if memory_regressed:
+        regressions.append(f"峰值内存: {baseline['peak_rss'] / mb:.1f} MB -> {current['peak_rss'] / mb:.1f} MB"
+                           f"（{memory_change:+.0%}，容差 {memory_tolerance:.0%}）")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能回归检查")
+    parser.add_argument('--baseline', default=str(BASELINE_FILE), help="基准文件")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="耗时容差（0.25表示比基准慢25%%以内视为正常）")
+    parser.add_argument('--memory-tolerance', type=float, default=DEFAULT_MEMORY_TOLERANCE,
+                        help="峰值内存容差")
+    parser.add_argument('--drop-tolerance', type=float, default=DEFAULT_DROP_TOLERANCE,
+                        help="耗时减少超过该比例视为异常（0.5表示比基准快一半以上）")
+    parser.add_argument('--rounds', type=int, default=CONFIRM_ROUNDS,
+                        help="首轮发现异常时最多测量的总轮数")
+    parser.add_argument('--update', action='store_true', help="用本次结果更新基准文件")
+    parser.add_argument('--output', help="将本次结果写入JSON文件")
+    args = parser.parse_args()
+
+    try:
+        current = run_gate()
+    except RuntimeError as e:
+        print(f"基准测试失败：{e}")
+        return 1
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+
+    if args.update:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"基准文件已更新: {args.baseline}")
+        return 0
+
+    with open(args.baseline, 'r', encoding='utf-8') as f:
+        baseline = json.load(f)
+
+    rounds = [current]
+    lines, regressions = compare(baseline, rounds, args.tolerance, args.memory_tolerance, args.drop_tolerance)
+    while regressions and len(rounds) < args.rounds:
+        # 可能是测量噪声：再测一轮，每一轮都异常的项目才判定失败
+        print(f"\n发现 {len(regressions)} 项异常，重新测量确认（第 {len(rounds) + 1} 轮）")
+        try:
+            rounds.append(run_gate())
+        except RuntimeError as e:
+            print(f"基准测试失败：{e}")
+            return 1
+        lines, regressions = compare(baseline, rounds, args.tolerance, args.memory_tolerance,
+                                     args.drop_tolerance)
+    print()
+    print("\n".join(lines))
+    print()
+    if regressions:
+        print(f"发现 {len(regressions)} 项性能回归：")
+        for item in regressions:
+            print(f"  - {item}")
+        return 1
+    print("未发现性能回归")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,355 @@
+"""
+性能基准测试套件
+
+使用合成数据（见 benchmarks/synthetic.py）测量各环节耗时：
+- load:     读取数据Excel、规范化日期列并转换为列式存储
+- config:   解析评分配置Excel（不使用缓存）
+- evaluate: 按整列计算等级矩阵
+- radar:    绘制单张雷达图并编码为PNG
+- layout:   生成单份报告，按阶段（雷达图、PNG编码、排版、PDF生成、写文件）统计
+- batch:    端到端批量生成，统计每秒报告数
+
+每项测量重复多次，记录最小值、中位数和平均值；结果输出为JSON，便于不同版本之间对比。
+
+用法：
+    python -m benchmarks.run_benchmarks --profile quick --output bench.json
+    python -m benchmarks.run_benchmarks --profile full --only load,evaluate
+    python -m benchmarks.run_benchmarks --rows 100,100000 --scores 3,60 --only load
+"""
+
+import argparse
+import gc
+import json
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+import psutil
+
+from benchmarks.synthetic import SCORE_KINDS, TIER_COUNTS, make_cohort, write_fixture
+
+
+BENCHMARKS = ('load', 'config', 'evaluate', 'radar', 'layout', 'batch')
+
+# 预设测试规模
+PROFILES = {
+    'quick': {
+        'rows': [100, 1000],
+        'scores': [3, 12],
+        'tiers': [3],
+        'kinds': ['numeric'],
+        'render_rows': 5,
+        'repeat': 3,
+    },
+    'full': {
+        'rows': [100, 1000, 10000, 100000],
+        'scores': [3, 12, 30, 60],
+        'tiers': list(TIER_COUNTS),
+        'kinds': list(SCORE_KINDS),
+        'render_rows': 50,
+        'repeat': 5,
+    },
+}
+
+
+def _time(func: Callable[[], Any], repeat: int) -> List[float]:
+    """重复执行并返回每次耗时（秒），每次执行前先回收垃圾"""
+    durations = []
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        func()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _seconds(durations: List[float]) -> Dict[str, float]:
+    return {
+        'min': min(durations),
+        'median': statistics.median(durations),
+        'mean': statistics.fmean(durations),
+    }
+
+
+def _record(benchmark: str, params: Dict[str, Any], durations: List[float], **extra) -> Dict[str, Any]:
+    record = {'benchmark': benchmark, 'params': params, 'repeat': len(durations),
+              'seconds': _seconds(durations)}
+    record.update(extra)
+    print(f"  {benchmark:<9}{json.dumps(params, ensure_ascii=False):<60}"
+          f"中位数 {record['seconds']['median'] * 1000:10.2f} ms")
+    return record
+
+
+def _peak_rss() -> int:
+    """进程峰值RSS（字节）"""
+    info = psutil.Process().memory_info()
+    if hasattr(info, 'peak_wset'):
+        return info.peak_wset
+    import resource
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def _render(generator, row, output_file: str):
+    """生成一份报告；失败时中止测试（失败的报告几乎不耗时，会被误记为加速）"""
+    if not generator.generate_single_report(row, output_file):
+        raise RuntimeError(f"报告生成失败（{output_file}），请检查字体和日志")
+
+
+def bench_load(settings, fixtures: Path) -> List[Dict[str, Any]]:
+    """读取数据 + 日期规范化 + 列式存储"""
+    import pandas as pd
+    from participant_store import ParticipantStore, normalize_date_columns
+
+    records = []
+    for kind in settings['kinds']:
+        for scores in settings['scores']:
+            for rows in settings['rows']:
+                data_file, _ = write_fixture(fixtures, rows, scores, score_kind=kind)
+
+                def run():
+                    ParticipantStore.from_dataframe(normalize_date_columns(pd.read_excel(data_file)))
+
+                records.append(_record('load', {'rows': rows, 'scores': scores, 'kind': kind},
+                                       _time(run, settings['repeat'])))
+    return records
+
+
+def bench_config(settings, fixtures: Path) -> List[Dict[str, Any]]:
+    """解析评分配置（不使用缓存）"""
+    from config_manager import ConfigManager
+
+    records = []
+    for tiers in settings['tiers']:
+        for scores in settings['scores']:
+            _, config_file = write_fixture(fixtures, min(settings['rows']), scores, tiers)
+            manager = ConfigManager(cache_dir=None)
+            durations = _time(lambda: manager.load_config_from_excel(config_file), settings['repeat'])
+            records.append(_record('config', {'scores': scores, 'tiers': tiers}, durations))
+    return records
+
+
+def bench_evaluate(settings, fixtures: Path) -> List[Dict[str, Any]]:
+    """按整列计算等级矩阵"""
+    from config_manager import ConfigManager
+    from evaluation_engine import EvaluationEngine
+    from participant_store import ParticipantStore
+
+    records = []
+    for tiers in settings['tiers']:
+        for scores in settings['scores']:
+            _, config_file = write_fixture(fixtures, min(settings['rows']), scores, tiers)
+            manager = ConfigManager(cache_dir=None)
+            manager.load_config_from_excel(config_file)
+            engine = EvaluationEngine(manager.get_task_config(), manager.get_evaluation_dict())
+            for rows in settings['rows']:
+                store = ParticipantStore.from_dataframe(make_cohort(rows, scores))
+                durations = _time(lambda: engine.classify(store.score_columns, store.scores),
+                                  settings['repeat'])
+                records.append(_record('evaluate', {'rows': rows, 'scores': scores, 'tiers': tiers},
+                                       durations))
+    return records
+
+
+def bench_radar(settings, fixtures: Path) -> List[Dict[str, Any]]:
+    """绘制单张雷达图并编码为PNG"""
+    from participant_store import ParticipantStore
+    from radar_chart import RadarChartGenerator
+
+    records = []
+    for scores in settings['scores']:
+        store = ParticipantStore.from_dataframe(
+            make_cohort(settings['render_rows'], scores, missing_rate=0))
+        generator = RadarChartGenerator()
+        generator.set_variables(store.score_columns)
+        rows = list(store)
+        # 预热：首次绘图会加载字体等
+        image_bytes = generator.generate_radar_chart(rows[0])
+        iterator = iter(rows * settings['repeat'])
+        durations = _time(lambda: generator.generate_radar_chart(next(iterator)),
+                          len(rows) * settings['repeat'])
+        records.append(_record('radar', {'scores': scores}, durations, png_bytes=len(image_bytes)))
+    return records
+
+
+def bench_layout(settings, fixtures: Path) -> List[Dict[str, Any]]:
+    """生成单份报告，按阶段统计"""
+    from config_manager import ConfigManager
+    from participant_store import ParticipantStore
+    from report_generator import ReportGenerator
+
+    records = []
+    for tiers in settings['tiers']:
+        for scores in settings['scores']:
+            _, config_file = write_fixture(fixtures, min(settings['rows']), scores, tiers)
+            manager = ConfigManager(cache_dir=None)
+            manager.load_config_from_excel(config_file)
+            generator = ReportGenerator(manager.get_task_config(), manager.get_evaluation_dict())
+            store = ParticipantStore.from_dataframe(
+                make_cohort(settings['render_rows'], scores, missing_rate=0))
+            store.levels = generator.evaluation_engine.classify(store.score_columns, store.scores)
+
+            with tempfile.TemporaryDirectory() as output_dir:
+                _render(generator, store.record(0), f"{output_dir}/warmup.pdf")
+                timer = generator.timer
+                timer.reset()
+                timer.enabled = True
+                durations = []
+                for _ in range(settings['repeat']):
+                    for index, row in enumerate(store):
+                        gc.collect()
+                        timer.begin_row()
+                        _render(generator, row, f"{output_dir}/{index}.pdf")
+                        durations.append(timer.end_row(index)['total'])
+                summary = timer.summary()
+                timer.enabled = False
+
+            stages = {stage: values['p50'] for stage, values in summary['stages'].items() if stage != 'total'}
+            records.append(_record('layout', {'scores': scores, 'tiers': tiers}, durations,
+                                   stages=stages, pdf_bytes=summary['bytes_written'] // len(durations)))
+    return records
+
+
+def bench_batch(settings, fixtures: Path) -> List[Dict[str, Any]]:
+    """端到端批量生成"""
+    from config_manager import ConfigManager
+    from report_generator import ReportGenerator
+    from batch_engine import BatchOptions
+
+    records = []
+    rows = settings['render_rows']
+    for kind in settings['kinds']:
+        for scores in settings['scores']:
+            tiers = settings['tiers'][0]
+            # 不含缺失成绩，保证每份报告都完整绘制雷达图
+            data_file, config_file = write_fixture(fixtures, rows, scores, tiers, kind, missing_rate=0)
+            manager = ConfigManager(cache_dir=None)
+            manager.load_config_from_excel(config_file)
+            generator = ReportGenerator(manager.get_task_config(), manager.get_evaluation_dict())
+
+            def run():
+                with tempfile.TemporaryDirectory() as output_dir:
+                    results = generator.generate_batch_reports(
+                        data_file, output_dir, options=BatchOptions(workers=settings['workers']))
+                    if results['failed'] or results['errors']:
+                        raise RuntimeError(f"批量生成失败: {results['errors'][:3]}")
+
+            durations = _time(run, settings['repeat'])
+            records.append(_record(
+                'batch', {'rows': rows, 'scores': scores, 'kind': kind, 'workers': settings['workers']},
+                durations, rows_per_second=rows / statistics.median(durations)))
+    return records
+
+
+BENCHMARK_FUNCTIONS = {
+    'load': bench_load,
+    'config': bench_config,
+    'evaluate': bench_evaluate,
+    'radar': bench_radar,
+    'layout': bench_layout,
+    'batch': bench_batch,
+}
+
+
+def _environment() -> Dict[str, Any]:
+    """运行环境信息（用于对比不同机器、不同版本的结果）"""
+    import matplotlib
+    import numpy
+    import pandas
+    import reportlab
+
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                                text=True, check=True, cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': psutil.cpu_count(logical=True),
+        'versions': {
+            'numpy': numpy.__version__,
+            'pandas': pandas.__version__,
+            'matplotlib': matplotlib.__version__,
+            'reportlab': reportlab.Version,
+        },
+    }
+
+
+def run_suite(settings: Dict[str, Any], benchmarks=BENCHMARKS, fixtures=None) -> Dict[str, Any]:
+    """
+    运行基准测试
+
+    Args:
+        settings: 测试规模（rows/scores/tiers/kinds/render_rows/repeat/workers，见 PROFILES）
+        benchmarks: 要运行的测试项目
+        fixtures: 合成数据目录（None 表示使用临时目录）
+
+    Returns:
+        {'environment', 'settings', 'results', 'peak_rss'}
+    """
+    settings = dict(settings)
+    settings.setdefault('workers', 1)
+    with tempfile.TemporaryDirectory() as temp_dir:
+        fixture_dir = Path(fixtures or temp_dir)
+        results = []
+        for name in benchmarks:
+            print(f"[{name}]")
+            results.extend(BENCHMARK_FUNCTIONS[name](settings, fixture_dir))
+    return {
+        'environment': _environment(),
+        'settings': settings,
+        'results': results,
+        'peak_rss': _peak_rss(),
+    }
+
+
+def _int_list(text: str) -> List[int]:
+    return [int(item) for item in text.split(',') if item]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="性能基准测试套件")
+    parser.add_argument('--profile', choices=sorted(PROFILES), default='quick', help="预设测试规模")
+    parser.add_argument('--only', help=f"只运行指定项目（逗号分隔）：{','.join(BENCHMARKS)}")
+    parser.add_argument('--rows', type=_int_list, help="受试者数量，如 100,1000,100000")
+    parser.add_argument('--scores', type=_int_list, help="测评项目数量，如 3,12,60")
+    parser.add_argument('--tiers', type=_int_list, help="分档数（2-7）")
+    parser.add_argument('--kinds', help="成绩类型：numeric,text")
+    parser.add_argument('--render-rows', type=int, help="雷达图、报告和批量测试使用的受试者数量")
+    parser.add_argument('--repeat', type=int, help="每项测量的重复次数")
+    parser.add_argument('--workers', type=int, default=1, help="批量测试的渲染进程数")
+    parser.add_argument('--fixtures', help="合成数据目录（保留以便重复使用，默认使用临时目录）")
+    parser.add_argument('--output', help="将结果写入JSON文件")
+    args = parser.parse_args()
+
+    settings = dict(PROFILES[args.profile], workers=args.workers)
+    for key in ('rows', 'scores', 'tiers', 'render_rows', 'repeat'):
+        value = getattr(args, key)
+        if value:
+            settings[key] = value
+    if args.kinds:
+        settings['kinds'] = args.kinds.split(',')
+
+    benchmarks = args.only.split(',') if args.only else BENCHMARKS
+    unknown = [name for name in benchmarks if name not in BENCHMARK_FUNCTIONS]
+    if unknown:
+        parser.error(f"未知的测试项目：{', '.join(unknown)}")
+
+    report = run_suite(settings, benchmarks, args.fixtures)
+    print(f"峰值RSS: {report['peak_rss'] / 1024 / 1024:.1f} MB")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"结果已写入: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
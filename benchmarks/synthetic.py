@@ -0,0 +1,113 @@
+"""
+合成测试数据生成
+
+按模板格式（templates/test_data.xlsx、templates/config_template_N_tiers.xlsx）生成
+任意规模的受试者数据和评分配置，用于性能基准测试。相同参数和随机种子生成的数据完全相同。
+"""
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from config_manager import TIER_LAYOUTS
+from participant_store import normalize_date_columns
+
+
+# 成绩列的数据类型：数值，或带单位的文本（如 "105分"，走文本解析路径）
+SCORE_KINDS = ('numeric', 'text')
+
+# load_config_from_excel 支持的分档数
+TIER_COUNTS = tuple(len(names) for names, _ in TIER_LAYOUTS.values())
+
+# 合成成绩的分布（与标准分一致）
+SCORE_MEAN = 100.0
+SCORE_STD = 15.0
+
+# 合成数据中约有这一比例的成绩缺失
+MISSING_RATE = 0.02
+
+
+def score_names(count: int) -> List[str]:
+    """测评项目名称"""
+    return [f"测评项目{j + 1}" for j in range(count)]
+
+
+def make_cohort(rows: int, score_count: int, seed: int = 0, score_kind: str = 'numeric',
+                note: Optional[str] = None, missing_rate: float = MISSING_RATE) -> pd.DataFrame:
+    """
+    生成与模板格式一致的受试者数据（前6列为个人信息，之后为测评成绩）
+
+    Args:
+        rows: 受试者数量
+        score_count: 测评项目数量
+        seed: 随机种子
+        score_kind: 'numeric' 数值成绩；'text' 文本成绩（如 "105分"）
+        note: 结果说明（可选，提供时追加为最后一列）
+        missing_rate: 成绩缺失比例
+    """
+    if score_kind not in SCORE_KINDS:
+        raise ValueError(f"不支持的成绩类型：{score_kind}。支持的类型：{', '.join(SCORE_KINDS)}")
+
+    rng = np.random.default_rng(seed)
+    birthdays = np.datetime64('2010-01-01') + rng.integers(0, 9 * 365, size=rows).astype('timedelta64[D]')
+    data = {
+        '姓名': [f"受试者{i:06d}" for i in range(rows)],
+        '性别': rng.choice(['男', '女'], size=rows),
+        '生日': pd.to_datetime(birthdays).strftime('%Y%m%d').astype(np.int64),
+        '年龄': rng.uniform(6, 15, size=rows),
+        '测试日期': rng.choice([20250708, 20250709, 20250710], size=rows),
+        'ID': [f"P{i:08d}" for i in range(rows)],
+    }
+    for name in score_names(score_count):
+        scores = rng.normal(SCORE_MEAN, SCORE_STD, size=rows).round()
+        scores[rng.random(rows) < missing_rate] = np.nan
+        if score_kind == 'text':
+            data[name] = [f"{score:.0f}分" if score == score else None for score in scores]
+        else:
+            data[name] = scores
+    if note is not None:
+        data['结果说明'] = note
+    return normalize_date_columns(pd.DataFrame(data))
+
+
+def make_config_frame(names: List[str], tiers: int) -> pd.DataFrame:
+    """
+    生成评分配置表（与 config_template_N_tiers.xlsx 的列布局一致）
+
+    阈值在平均分上下2个标准差内等距分布。
+    """
+    layouts = {len(level_names): labels for level_names, labels in TIER_LAYOUTS.values()}
+    if tiers not in layouts:
+        raise ValueError(f"不支持的分档数：{tiers}。支持：{', '.join(map(str, TIER_COUNTS))}")
+
+    labels = layouts[tiers]
+    thresholds = np.linspace(SCORE_MEAN - 2 * SCORE_STD, SCORE_MEAN + 2 * SCORE_STD, tiers + 1)[1:-1].round()
+    data = {'测评项目': names}
+    for i, threshold in enumerate(thresholds):
+        data[f'阈值{i + 1}'] = [threshold] * len(names)
+    for label in labels:
+        data[label] = [f"{name}{label[:-2]}：合成评价说明文本，用于性能测试。" for name in names]
+    return pd.DataFrame(data)
+
+
+def write_fixture(directory, rows: int, score_count: int, tiers: int = 3,
+                  score_kind: str = 'numeric', seed: int = 0,
+                  missing_rate: float = MISSING_RATE) -> Tuple[str, str]:
+    """
+    写出一组合成数据和评分配置Excel文件（已存在时直接复用）
+
+    Returns:
+        (数据文件路径, 配置文件路径)
+    """
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    data_file = directory / f"cohort_{rows}x{score_count}_{score_kind}_{seed}_{missing_rate:g}.xlsx"
+    config_file = directory / f"config_{score_count}_{tiers}tiers.xlsx"
+    if not data_file.exists():
+        make_cohort(rows, score_count, seed, score_kind, missing_rate=missing_rate).to_excel(
+            data_file, index=False)
+    if not config_file.exists():
+        make_config_frame(score_names(score_count), tiers).to_excel(config_file, index=False)
+    return str(data_file), str(config_file)
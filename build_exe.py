@@ -215,6 +215,15 @@ hiddenimports = [
     'report_generator',
     'config_manager',
     'radar_chart',
+    'participant_store',
+    'batch_engine',
+    'evaluation_engine',
+    'evaluation_export',
+    'instrumentation',
+    'font_index',
+    'preflight',
+    'preview',
+    'watcher',
     # 第三方库
     'pandas',
     'numpy',
@@ -228,6 +237,7 @@ hiddenimports = [
     'reportlab.platypus',
     'openpyxl',
     'openpyxl.cell._writer',
+    'pyarrow',
     'PIL',
     'PIL._tkinter_finder',
     'tkinter',
@@ -0,0 +1,771 @@
+"""
+心理测试反馈报告生成器 - 多进程批量渲染模块
+受试者数据每批次写入一次共享内存，常驻工作进程只接收行号并直接读取共享数据
+"""
+
+import os
+import sys
+import copy
+import time
+import queue
+import logging
+import logging.handlers
+import threading
+import multiprocessing
+import multiprocessing.connection
+from collections import deque
+from dataclasses import dataclass
+import psutil
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Callable
+
+from participant_store import ParticipantStore
+from instrumentation import process_peak_rss
+
+
+logger = logging.getLogger(__name__)
+
+# 每个工作进程同时持有的行数（返回结果时手上仍有任务，避免空等）
+ROWS_PER_WORKER = 2
+
+# 等待结果时检查工作进程存活状态和单行耗时的间隔（秒）
+POLL_INTERVAL = 0.5
+
+# 超时或导致进程崩溃的行最多重试的次数（每次在新的工作进程中），仍失败时隔离
+DEFAULT_ROW_RETRIES = 1
+
+# 自适应进程数：调整间隔（秒）；未测得时每个渲染进程的内存估计（字节）
+ADAPT_INTERVAL = 2.0
+DEFAULT_WORKER_MEMORY = 200 * 1024 * 1024
+# 未设置内存上限时，进程池（主进程 + 渲染进程）RSS 的上限占物理内存的比例
+DEFAULT_MEMORY_FRACTION = 0.6
+# RSS 超过上限的该比例时减少进程；增加进程后预计不超过该比例时才允许增加
+SHRINK_THRESHOLD = 0.9
+GROW_THRESHOLD = 0.8
+
+
+def resolve_worker_count(workers: Optional[int], row_count: int) -> int:
+    """
+    解析渲染进程数
+
+    Args:
+        workers: 期望进程数，0或None表示按CPU核数自动选择（保留一个核给界面）
+        row_count: 待生成的报告数量（进程数不超过报告数量）
+
+    Returns:
+        实际使用的进程数（至少为1）
+    """
+    if not workers or workers <= 0:
+        workers = max(1, (os.cpu_count() or 1) - 1)
+    return max(1, min(workers, row_count))
+
+
+class ConcurrencyController:
+    """
+    自适应渲染进程数
+
+    启动时按可用内存确定进程数（不超过CPU核数减一），运行中每 ADAPT_INTERVAL 秒检查一次：
+    进程池RSS接近内存上限或系统可用内存不足时减少一个进程，有空闲CPU核且内存充足时增加一个进程。
+    每次调整都记录在 changes 中，汇总见 summary()。
+    """
+
+    def __init__(self, max_workers: int, memory_limit: Optional[int] = None, min_workers: int = 1,
+                 interval: float = ADAPT_INTERVAL):
+        """
+        Args:
+            max_workers: 最多的进程数
+            memory_limit: 进程池（主进程 + 渲染进程）RSS上限（字节），None表示物理内存的 DEFAULT_MEMORY_FRACTION
+            min_workers: 最少的进程数
+            interval: 调整间隔（秒）
+        """
+        self.max_workers = max(1, max_workers)
+        self.min_workers = max(1, min(min_workers, self.max_workers))
+        self.memory_limit = memory_limit or int(psutil.virtual_memory().total * DEFAULT_MEMORY_FRACTION)
+        self.interval = interval
+        self.cpu_count = psutil.cpu_count(logical=True) or 1
+        self.changes: List[Dict[str, Any]] = []
+        self.initial = None
+        self.current = None
+        self.peak = 0
+        self._start = time.monotonic()
+        self._next_decision = self._start + interval
+        psutil.cpu_percent(interval=None)  # 首次调用只设置CPU利用率的计算起点
+
+    def _measure(self, pids: List[int]) -> Dict[str, float]:
+        """进程池RSS合计、单个渲染进程的RSS（取最大值）、系统CPU利用率和可用内存"""
+        rss = psutil.Process().memory_info().rss
+        worker_rss = 0
+        for pid in pids:
+            try:
+                value = psutil.Process(pid).memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+            rss += value
+            worker_rss = max(worker_rss, value)
+        return {
+            'rss': rss,
+            'worker_rss': worker_rss or DEFAULT_WORKER_MEMORY,
+            'cpu_percent': psutil.cpu_percent(interval=None),
+            'available': psutil.virtual_memory().available,
+        }
+
+    def _record(self, target: int, reason: str, measured: Dict[str, float]):
+        self.changes.append({
+            'time': round(time.monotonic() - self._start, 2),
+            'from': self.current,
+            'to': target,
+            'reason': reason,
+            'rss': int(measured['rss']),
+            'available': int(measured['available']),
+            'cpu_percent': measured['cpu_percent'],
+        })
+        logger.info(f"渲染进程数 {self.current} -> {target}（{reason}）")
+        self.current = target
+        self.peak = max(self.peak, target)
+
+    def initial_workers(self, row_count: int) -> int:
+        """按可用内存和待生成数量确定启动时的进程数"""
+        measured = self._measure([])
+        budget = min(self.memory_limit - measured['rss'], measured['available'] - DEFAULT_WORKER_MEMORY)
+        fit = int(budget // DEFAULT_WORKER_MEMORY)
+        self.initial = self.current = max(self.min_workers, min(self.max_workers, row_count, fit))
+        self.peak = self.current
+        logger.info(f"自适应渲染进程数：启动 {self.current} 个（最多 {self.max_workers} 个，"
+                    f"内存上限 {self.memory_limit / 1048576:.0f} MB）")
+        return self.current
+
+    def resume(self, current: int) -> int:
+        """沿用已启动的进程（如常驻进程池），以其数量作为启动时的进程数"""
+        self.initial = self.current = self.peak = max(self.min_workers, min(self.max_workers, current))
+        logger.info(f"自适应渲染进程数：沿用 {self.current} 个已启动的进程（最多 {self.max_workers} 个）")
+        return self.current
+
+    def decide(self, pids: List[int], backlog: int) -> int:
+        """
+        检查资源占用并返回目标进程数（未到调整时间时返回当前进程数）
+
+        Args:
+            pids: 当前渲染进程的进程ID
+            backlog: 尚未分派的行数
+        """
+        now = time.monotonic()
+        if now < self._next_decision:
+            return self.current
+        self._next_decision = now + self.interval
+
+        measured = self._measure(pids)
+        worker_rss = measured['worker_rss']
+        if self.current > self.min_workers:
+            if measured['rss'] > self.memory_limit * SHRINK_THRESHOLD:
+                self._record(self.current - 1, "进程池内存接近上限", measured)
+                return self.current
+            if measured['available'] < worker_rss:
+                self._record(self.current - 1, "系统可用内存不足", measured)
+                return self.current
+
+        idle_cores = self.cpu_count * (1 - measured['cpu_percent'] / 100)
+        if (self.current < self.max_workers and backlog > self.current * ROWS_PER_WORKER
+                and idle_cores >= 1
+                and measured['rss'] + worker_rss < self.memory_limit * GROW_THRESHOLD
+                and measured['available'] > 2 * worker_rss):
+            self._record(self.current + 1, f"空闲CPU约 {idle_cores:.1f} 核", measured)
+        return self.current
+
+    def worker_lost(self, reason: str):
+        """进程启动或初始化失败且不再补充时减少目标进程数，避免反复启动失败的进程"""
+        if self.current > self.min_workers:
+            self._record(self.current - 1, reason, self._measure([]))
+
+    def summary(self) -> Dict[str, Any]:
+        """并发度统计：模式、启动/最终/最多进程数、内存上限和每次调整"""
+        return {
+            'mode': 'adaptive',
+            'initial': self.initial,
+            'final': self.current,
+            'peak': self.peak,
+            'min_workers': self.min_workers,
+            'max_workers': self.max_workers,
+            'memory_limit': self.memory_limit,
+            'changes': self.changes,
+        }
+
+
+def _close_shared_memory(shm) -> None:
+    """关闭共享内存映射（调用前应先释放所有引用它的数组）"""
+    if shm is None:
+        return
+    try:
+        shm.close()
+    except BufferError:
+        # 仍有数组引用共享内存时无法立即关闭，进程退出时由系统回收
+        logger.debug("共享内存仍被引用，延迟到进程退出时释放")
+
+
+def _render_row(generator, store: ParticipantStore, index: int, batch: Dict[str, Any]) -> tuple:
+    """在工作进程中渲染一行，返回 (是否成功, 显示名称, 错误信息, 分阶段耗时)"""
+    number = index + batch.get('index_offset', 0)  # 在整个数据文件中的行号
+    name = f"第{number + 1}个"
+    generator.timer.begin_row()
+    try:
+        row = store.record(index)
+        name, filename = generator.build_report_filename(
+            row, number, batch['filename_mode'], batch['filename_separator'])
+        output_file = Path(batch['output_dir']) / filename
+        success = generator.generate_single_report(row, str(output_file), batch['image_dir'])
+        error = None if success else "生成失败"
+    except Exception as e:
+        logger.exception(f"渲染{name}时出错")
+        success, error = False, str(e)
+    return success, name, error, generator.timer.end_row(number, keep=False)
+
+
+class _PipeLogHandler(logging.handlers.QueueHandler):
+    """
+    工作进程的日志处理器：把日志记录写入本进程独占的管道
+
+    不使用进程间共享的队列：共享队列的写锁跨进程，超时被强制结束的进程可能正持有该锁，
+    之后其他进程写日志时会永久阻塞。
+    """
+
+    def enqueue(self, record: logging.LogRecord):
+        self.queue.send(record)
+
+
+def _setup_worker_logging(log_connection, level: int):
+    """工作进程的日志记录交给主进程，由主进程的日志处理器写入同一日志文件"""
+    root = logging.getLogger()
+    root.handlers[:] = [_PipeLogHandler(log_connection)]
+    root.setLevel(level)
+
+
+class _LogReceiver:
+    """主进程中的后台线程：接收各工作进程日志管道中的记录，交给同名记录器处理"""
+
+    def __init__(self):
+        self._connections = []
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread = None
+
+    def add(self, connection):
+        with self._lock:
+            self._connections.append(connection)
+
+    def start(self):
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run, name="ReportWorkerLogs", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """读完已写入管道的记录后结束线程"""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+
+    def _drop(self, connection):
+        with self._lock:
+            self._connections.remove(connection)
+        connection.close()
+
+    def _run(self):
+        while True:
+            stopping = self._stopping.is_set()
+            with self._lock:
+                connections = list(self._connections)
+            if not connections:
+                if stopping:
+                    break
+                self._stopping.wait(POLL_INTERVAL)
+                continue
+            ready = multiprocessing.connection.wait(connections, timeout=0 if stopping else POLL_INTERVAL)
+            if stopping and not ready:
+                break
+            for connection in ready:
+                try:
+                    record = connection.recv()
+                except Exception:
+                    # 进程已退出，或在写入中途被结束（只丢弃这一条不完整的记录）
+                    self._drop(connection)
+                    continue
+                target = logging.getLogger(record.name)
+                if target.isEnabledFor(record.levelno):
+                    target.handle(record)
+
+
+def _worker_main(worker_id: int, inbox, outbox, settings: Dict[str, Any],
+                 log_connection=None, log_level: int = logging.INFO):
+    """
+    工作进程入口 - 常驻一个 ReportGenerator，按消息处理批次
+
+    启动完成后发送 ('ready', worker_id)。提供 log_connection 时日志记录（含异常堆栈）发送给主进程。
+
+    消息格式：
+        ('settings', 改变的设置)       就地更新报告生成器的设置（见 ReportGenerator.apply_settings）
+        ('batch', 描述信息, 批次参数)  挂载本批次的共享内存
+        ('row', 行号)                  渲染一行并返回结果（含分阶段耗时，未启用统计时为None）；
+                                       批次参数中 reset_every 大于0时每渲染这么多行重置一次绘图状态
+        ('end_batch',)                 释放本批次的共享内存
+        ('stop',)                      退出
+    """
+    if log_connection is not None:
+        _setup_worker_logging(log_connection, log_level)
+
+    # 在工作进程中导入，避免与 report_generator 循环导入
+    from report_generator import ReportGenerator
+
+    try:
+        generator = ReportGenerator(**settings)
+    except Exception as e:
+        outbox.put(('failed', worker_id, f"工作进程初始化失败: {e}"))
+        return
+    outbox.put(('ready', worker_id))
+
+    store = shm = batch = None
+    rendered = 0
+    try:
+        while True:
+            message = inbox.get()
+            kind = message[0]
+
+            if kind == 'row':
+                index = message[1]
+                success, name, error, timing = _render_row(generator, store, index, batch)
+                outbox.put(('done', worker_id, index, success, name, error, timing))
+                rendered += 1
+                if batch.get('reset_every') and rendered % batch['reset_every'] == 0:
+                    generator.reset_render_state()
+            elif kind == 'settings':
+                generator.apply_settings(message[1])
+            elif kind == 'batch':
+                store = None
+                _close_shared_memory(shm)
+                store, shm = ParticipantStore.attach_shared_memory(message[1])
+                batch = message[2]
+                generator.timer.enabled = batch.get('timing', False)
+            elif kind == 'end_batch':
+                store = batch = None
+                _close_shared_memory(shm)
+                shm = None
+            elif kind == 'stop':
+                break
+    finally:
+        store = None
+        _close_shared_memory(shm)
+
+
+class _WorkerSlot:
+    """一个工作进程及分派给它、尚未返回结果的行（按分派顺序，队首为正在渲染的行）"""
+
+    def __init__(self, process, inbox):
+        self.process = process
+        self.inbox = inbox
+        self.rows = deque()
+        self.ready = False
+        self.retiring = False  # 减少进程时不再分派新行，手上的行完成后退出
+        self.started_at = None  # 队首行开始渲染的时间（进程启动完成前为None）
+
+    def mark_started(self):
+        self.started_at = time.monotonic() if self.ready and self.rows else None
+
+
+class RenderPool:
+    """
+    报告渲染进程池
+
+    每个工作进程有独立的收件队列（用于广播批次信息和分派行号），
+    所有结果汇总到同一个结果队列。使用spawn方式启动，各平台行为一致。
+
+    某一行渲染超时或导致工作进程崩溃时，只结束该进程并启动新的进程接替，
+    该行重新排队（最多 row_retries 次），仍失败时隔离并附上诊断信息，其余行不受影响。
+
+    提供 controller 时按CPU和内存占用在运行中增减工作进程（见 ConcurrencyController）。
+
+    进程池可以跨批次常驻（如界面中整个会话只启动一次）：批次之间工作进程保持运行，
+    设置改变时用 update_settings 只把改变的项发送给工作进程。
+    """
+
+    def __init__(self, workers: int, generator_settings: Dict[str, Any],
+                 row_timeout: Optional[float] = None, row_retries: int = DEFAULT_ROW_RETRIES,
+                 controller: Optional[ConcurrencyController] = None):
+        """
+        Args:
+            workers: 工作进程数（提供 controller 时为启动时的进程数）
+            generator_settings: 构建 ReportGenerator 的参数（见 ReportGenerator.get_generator_settings）
+            row_timeout: 单行渲染的时间限制（秒），None或0表示不限制
+            row_retries: 超时或崩溃的行最多重试的次数
+            controller: 自适应进程数控制器，None表示进程数固定
+        """
+        self.worker_count = max(1, workers)
+        self.generator_settings = copy.deepcopy(generator_settings)
+        self.row_timeout = row_timeout or None
+        self.row_retries = max(0, row_retries)
+        self.controller = controller
+        self._context = multiprocessing.get_context('spawn')
+        self._outbox = None
+        self._log_receiver = None
+        self._workers: Dict[int, _WorkerSlot] = {}
+        self._retired: List[_WorkerSlot] = []
+        self._next_id = 0
+        self.peak_worker_rss = 0  # 已测得的单个工作进程峰值RSS（字节）
+
+    def __enter__(self) -> 'RenderPool':
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _start_worker(self) -> int:
+        """启动一个工作进程（编号不重复，已结束进程的迟到消息可据此忽略）"""
+        worker_id = self._next_id
+        self._next_id += 1
+        inbox = self._context.Queue()
+        log_reader, log_writer = self._context.Pipe(duplex=False)
+        process = self._context.Process(
+            target=_worker_main,
+            args=(worker_id, inbox, self._outbox, self.generator_settings,
+                  log_writer, logging.getLogger().getEffectiveLevel()),
+            daemon=True,
+            name=f"ReportWorker-{worker_id}"
+        )
+        process.start()
+        log_writer.close()  # 只保留工作进程中的写端，进程退出时读端即可结束
+        self._log_receiver.add(log_reader)
+        self._workers[worker_id] = _WorkerSlot(process, inbox)
+        return worker_id
+
+    def start(self):
+        """启动工作进程（已启动时直接返回，缺少的进程在 run_batch 中补足）"""
+        if self._workers:
+            return
+        if self._outbox is None:
+            self._outbox = self._context.Queue()
+            self._log_receiver = _LogReceiver()
+            self._log_receiver.start()
+        for _ in range(self.worker_count):
+            self._start_worker()
+        logger.info(f"已启动 {self.worker_count} 个渲染进程")
+
+    def update_settings(self, generator_settings: Dict[str, Any]) -> List[str]:
+        """
+        更新报告生成器设置：只把改变的项发送给已启动的工作进程（就地更新，不重新创建生成器），
+        之后启动的工作进程直接使用新设置。应在批次之间调用。
+
+        Returns:
+            改变的设置项名称
+        """
+        delta = {key: copy.deepcopy(value) for key, value in generator_settings.items()
+                 if self.generator_settings.get(key) != value}
+        if delta:
+            self.generator_settings.update(delta)
+            for slot in self._workers.values():
+                slot.inbox.put(('settings', delta))
+            logger.info(f"已向 {len(self._workers)} 个渲染进程发送设置更新：{', '.join(delta)}")
+        return list(delta)
+
+    def active_worker_count(self) -> int:
+        """可以接收新行的工作进程数"""
+        return sum(1 for slot in self._workers.values() if not slot.retiring)
+
+    def measure_peak_rss(self) -> int:
+        """更新并返回单个工作进程的峰值RSS（字节，包括已结束的进程）"""
+        for slot in self._workers.values():
+            self._note_peak_rss(slot)
+        return self.peak_worker_rss
+
+    def worker_pids(self):
+        """当前存活的工作进程ID列表"""
+        return [slot.process.pid for slot in self._workers.values() if slot.process.is_alive()]
+    
+    def _note_peak_rss(self, slot: _WorkerSlot):
+        """记录工作进程退出前的峰值RSS"""
+        if slot.process.is_alive():
+            self.peak_worker_rss = max(self.peak_worker_rss, process_peak_rss(slot.process.pid))
+
+    def close(self):
+        """通知工作进程退出并等待结束"""
+        for slot in self._workers.values():
+            self._note_peak_rss(slot)
+            if slot.process.is_alive():
+                slot.inbox.put(('stop',))
+        for slot in list(self._workers.values()) + self._retired:
+            slot.process.join(timeout=5)
+            if slot.process.is_alive():
+                slot.process.terminate()
+        self._workers.clear()
+        self._retired.clear()
+        if self._log_receiver is not None:
+            self._log_receiver.stop()
+            self._log_receiver = None
+        self._outbox = None
+
+    def _retire_worker(self, worker_id: int):
+        """让已完成手上所有行的工作进程退出（减少进程数时使用）"""
+        slot = self._workers.pop(worker_id)
+        self._note_peak_rss(slot)
+        slot.inbox.put(('stop',))
+        self._retired = [other for other in self._retired if other.process.is_alive()]
+        self._retired.append(slot)
+
+    def _kill_worker(self, worker_id: int) -> _WorkerSlot:
+        """强制结束工作进程（用于超时的进程；进程正卡在渲染中，不会在写结果队列）"""
+        slot = self._workers.pop(worker_id)
+        self._note_peak_rss(slot)
+        if slot.process.is_alive():
+            slot.process.kill()
+        slot.process.join(timeout=5)
+        return slot
+
+    def run_batch(self, store: ParticipantStore, output_dir, image_dir: Optional[str],
+                  filename_mode: str, filename_separator: str,
+                  on_result: Callable[..., None], timing: bool = False,
+                  index_offset: int = 0, reset_every: int = 0,
+                  controller: Optional[ConcurrencyController] = None) -> List[Dict[str, Any]]:
+        """
+        渲染一个批次
+
+        Args:
+            store: 受试者数据（整体写入共享内存一次）
+            output_dir: 输出目录
+            image_dir: 图片目录（可选）
+            filename_mode: 文件命名模式
+            filename_separator: 自定义内容
+            on_result: 每行完成时的回调 on_result(行号, 是否成功, 显示名称, 错误信息[, 分阶段耗时])
+            timing: 工作进程是否记录分阶段耗时
+            index_offset: 本批次第一行在整个数据文件中的行号（分块生成时用于文件名和提示信息）
+            reset_every: 工作进程每渲染多少行重置一次绘图状态，0表示不重置
+            controller: 本批次使用的自适应进程数控制器，None表示使用创建进程池时提供的控制器
+
+        Returns:
+            被隔离的行：[{'index': 行号, 'reason': 'timeout' / 'crash', 'attempts': 尝试次数,
+                         'detail': 诊断信息}]，这些行也会以失败结果回调 on_result
+        """
+        controller = controller or self.controller
+        self.start()
+        shm, descriptor = store.to_shared_memory()
+        batch = {
+            'output_dir': str(output_dir),
+            'image_dir': image_dir,
+            'filename_mode': filename_mode,
+            'filename_separator': filename_separator,
+            'timing': timing,
+            'index_offset': index_offset,
+            'reset_every': reset_every,
+        }
+        quarantined = []
+        try:
+            # 补足之前因启动失败而未接替的进程（自适应时以控制器当前的目标进程数为准）
+            target = controller.current if controller is not None and controller.current else self.worker_count
+            for _ in range(target - self.active_worker_count()):
+                self._start_worker()
+            for slot in self._workers.values():
+                slot.inbox.put(('batch', descriptor, batch))
+
+            pending = deque(range(len(store)))
+            attempts: Dict[int, int] = {}
+            remaining = len(store)
+            last_error = "工作进程异常退出"
+            next_check = time.monotonic() + POLL_INTERVAL
+
+            def dispatch(worker_id):
+                slot = self._workers[worker_id]
+                while not slot.retiring and pending and len(slot.rows) < ROWS_PER_WORKER:
+                    index = pending.popleft()
+                    slot.rows.append(index)
+                    slot.inbox.put(('row', index))
+                if slot.started_at is None:
+                    slot.mark_started()
+
+            def fail(index, error):
+                nonlocal remaining
+                remaining -= 1
+                on_result(index, False, f"第{index + index_offset + 1}个", error)
+
+            def retry_or_quarantine(index, reason, detail):
+                """超时或崩溃的行：未超过重试次数时重新排队，否则隔离"""
+                attempts[index] = attempts.get(index, 0) + 1
+                if attempts[index] <= self.row_retries:
+                    logger.warning(f"第{index + index_offset + 1}个{detail}，将在新的渲染进程中重试")
+                    pending.append(index)
+                    return
+                detail = f"{detail}（已尝试 {attempts[index]} 次），已隔离"
+                logger.error(f"第{index + index_offset + 1}个{detail}")
+                quarantined.append({'index': index, 'reason': reason,
+                                    'attempts': attempts[index], 'detail': detail})
+                fail(index, detail)
+
+            def add_worker():
+                new_id = self._start_worker()
+                self._workers[new_id].inbox.put(('batch', descriptor, batch))
+                dispatch(new_id)
+
+            def replace_worker(slot, reason, detail):
+                """
+                结束的进程：队首行按超时/崩溃处理，其余已分派的行放回队列，
+                并启动新进程接替（即使已没有待分派的行，常驻进程池的进程数也不因此减少）
+                """
+                rows = list(slot.rows)
+                pending.extendleft(reversed(rows[1:]))
+                if rows:
+                    retry_or_quarantine(rows[0], reason, detail)
+                if not slot.retiring:
+                    add_worker()
+
+            def resize(target):
+                """按目标进程数增加进程或让进程在完成手上的行后退出"""
+                active = [worker_id for worker_id, slot in self._workers.items() if not slot.retiring]
+                for _ in range(target - len(active)):
+                    add_worker()
+                # 优先让手上行数最少的进程退出，其未开始的行放回队列
+                surplus = max(0, len(active) - target)
+                for worker_id in sorted(active, key=lambda i: len(self._workers[i].rows))[:surplus]:
+                    slot = self._workers[worker_id]
+                    slot.retiring = True
+                    while len(slot.rows) > 1:
+                        pending.appendleft(slot.rows.pop())
+                    if not slot.rows:
+                        self._retire_worker(worker_id)
+                if surplus:
+                    for other_id in list(self._workers):
+                        dispatch(other_id)
+
+            for worker_id in list(self._workers):
+                dispatch(worker_id)
+
+            while remaining:
+                try:
+                    message = self._outbox.get(timeout=POLL_INTERVAL)
+                except queue.Empty:
+                    message = None
+
+                if message is not None:
+                    kind, worker_id = message[0], message[1]
+                    slot = self._workers.get(worker_id)
+                    if kind == 'failed':
+                        last_error = message[2]
+                        logger.error(last_error)
+                    if slot is None:
+                        pass  # 已结束的进程的迟到消息
+                    elif kind == 'done':
+                        _, _, index, success, name, error, timing = message
+                        if index in slot.rows:
+                            slot.rows.remove(index)
+                        remaining -= 1
+                        on_result(index, success, name, error, timing)
+                        slot.started_at = None
+                        if slot.retiring and not slot.rows:
+                            self._retire_worker(worker_id)
+                        else:
+                            dispatch(worker_id)
+                    elif kind == 'ready':
+                        slot.ready = True
+                        slot.mark_started()
+                    elif kind == 'failed':
+                        # 初始化失败的进程尚未处理任何行，将其行放回队列交给其他进程
+                        pending.extendleft(reversed(self._workers.pop(worker_id).rows))
+                        if controller is not None:
+                            controller.worker_lost("渲染进程初始化失败")
+                        for other_id in list(self._workers):
+                            dispatch(other_id)
+
+                now = time.monotonic()
+                if message is not None and now < next_check:
+                    continue
+                next_check = now + POLL_INTERVAL
+
+                # 检查单行超时和异常退出的工作进程
+                for worker_id, slot in list(self._workers.items()):
+                    timed_out = (self.row_timeout and slot.started_at is not None
+                                 and now - slot.started_at > self.row_timeout)
+                    if timed_out:
+                        logger.error(f"渲染进程 {worker_id} 的第{slot.rows[0] + index_offset + 1}个超过时间限制，结束该进程")
+                        replace_worker(self._kill_worker(worker_id), 'timeout',
+                                       f"渲染超过时间限制（{self.row_timeout:g} 秒）")
+                    elif not slot.process.is_alive():
+                        del self._workers[worker_id]
+                        if slot.ready:
+                            logger.error(f"渲染进程 {worker_id} 异常退出（退出码 {slot.process.exitcode}）")
+                            replace_worker(slot, 'crash', f"渲染时工作进程崩溃（退出码 {slot.process.exitcode}）")
+                        else:
+                            # 启动阶段退出（未发送初始化失败消息），不再补充进程
+                            logger.error(f"渲染进程 {worker_id} 启动失败")
+                            pending.extendleft(reversed(slot.rows))
+                            if controller is not None:
+                                controller.worker_lost("渲染进程启动失败")
+                            for other_id in list(self._workers):
+                                dispatch(other_id)
+                if controller is not None and self._workers:
+                    resize(controller.decide(self.worker_pids(), len(pending)))
+                if not self._workers:
+                    # 没有可用的工作进程，剩余行全部记为失败
+                    while pending:
+                        fail(pending.popleft(), last_error)
+        finally:
+            for slot in self._workers.values():
+                if slot.process.is_alive():
+                    slot.inbox.put(('end_batch',))
+            shm.close()
+            shm.unlink()
+        return quarantined
+
+
+@dataclass
+class BatchOptions:
+    """
+    批量生成的执行选项，见 ReportGenerator.generate_batch_reports
+
+    Attributes:
+        workers: 渲染进程数；大于1时使用多进程渲染，0表示自动选择：启动时按可用内存确定进程数（不超过CPU核数减一），
+            运行中按CPU和内存占用增减（结果的 concurrency 中记录每次调整）
+        row_timeout: 单份报告的渲染时间限制（秒）；设置后即使只有一个进程也在独立的工作进程中渲染，
+            超时或导致进程崩溃的行在新进程中重试，仍失败时隔离（结果中增加 quarantined），其余行继续生成
+        row_retries: 超时或崩溃的行最多重试的次数
+        memory_limit_mb: 自动选择进程数时进程池（主进程 + 渲染进程）的内存上限（MB），0表示物理内存的60%
+        max_rows_in_flight: 内存受限模式 - 同时读入和处理的最多行数，0表示一次读入全部数据；
+            设置后按块读取Excel（.xlsx 逐行流式读取），每块生成完毕后释放，并定期重置绘图状态
+        pool: 常驻渲染进程池（可选，如界面整个会话共用的进程池）；提供时先把改变的设置发送给工作进程，
+            再用已启动的进程渲染，结束后进程保持运行。单行时间限制和重试次数以进程池的设置为准，
+            workers 为0时仍按CPU和内存占用增减进程
+        timing: 是否记录分阶段耗时（结果中增加 timings）
+        timing_format: 同时将耗时统计写入输出目录（"json" 或 "csv"，None表示不写文件）
+        profile: 性能分析模式 - 在性能分析器下逐个生成（不启用多进程；安装了 pyinstrument 时采样分析，否则用 cProfile），
+            并在输出目录写入 profile.pstats 和按代码来源分组的 profile_summary.txt
+        memory_sample_every: 每生成N份报告采样一次内存占用（0表示不跟踪）；
+            结果中增加 memory（每1000份报告的增长等），并写入输出目录的 memory.json
+        trace_allocations: 同时用 tracemalloc 统计增长最多的内存分配位置（只跟踪当前进程）
+    """
+    workers: int = 1
+    row_timeout: Optional[float] = None
+    row_retries: int = DEFAULT_ROW_RETRIES
+    memory_limit_mb: int = 0
+    max_rows_in_flight: int = 0
+    pool: Optional[RenderPool] = None
+    timing: bool = False
+    timing_format: Optional[str] = None
+    profile: bool = False
+    memory_sample_every: int = 0
+    trace_allocations: bool = False
+
+
+def create_persistent_pool(options: BatchOptions, generator_settings: Dict[str, Any]) -> Optional[RenderPool]:
+    """
+    按执行选项创建跨批次常驻的渲染进程池并启动工作进程（界面会话、监视文件夹模式使用）
+
+    options.workers 为0时按可用内存确定常驻的进程数；只使用一个进程且不限制单行时间时返回None，
+    此时每次生成都逐行进行，无需进程池。
+    """
+    row_timeout = options.row_timeout or None
+    worker_count = resolve_worker_count(options.workers, sys.maxsize)
+    if not options.workers and worker_count > 1:
+        worker_count = ConcurrencyController(
+            worker_count, options.memory_limit_mb * 1048576 or None).initial_workers(worker_count)
+    if worker_count <= 1 and not row_timeout:
+        return None
+    pool = RenderPool(worker_count, generator_settings, row_timeout=row_timeout, row_retries=options.row_retries)
+    pool.start()
+    return pool
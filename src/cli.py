@@ -0,0 +1,336 @@
+"""
+心理测试反馈报告生成器 - 命令行入口
+无界面批量生成报告或导出评价结果，支持耗时统计和性能分析
+
+用法示例：
+    python src/cli.py generate -d 数据.xlsx -c 评分配置.xlsx -o reports
+    python src/cli.py generate -d 数据.xlsx -c 评分配置.xlsx -o reports --timing json
+    python src/cli.py generate -d 数据.xlsx -c 评分配置.xlsx -o reports --profile
+    python src/cli.py generate -d 数据.xlsx -c 评分配置.xlsx -o reports --max-rows-in-flight 2000
+    python src/cli.py export -d 数据.xlsx -c 评分配置.xlsx -o 评价结果.csv
+    python src/cli.py check -d 数据.xlsx -o 数据预检问题.csv
+    python src/cli.py preview -d 数据.xlsx -c 评分配置.xlsx -o 预览.png --row 2
+    python src/cli.py watch -i 收件箱 -c 评分配置.xlsx -o reports
+"""
+
+import os
+import sys
+import logging
+import argparse
+import multiprocessing
+
+# 确保可以导入同目录下的模块
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from config import app_config
+from utils import setup_logging, read_excel_file
+from config_manager import ConfigManager
+
+
+def _create_generator(config_file: str):
+    """加载评分配置并创建报告生成器"""
+    # 在需要时才导入，使 --help 等命令不必加载 matplotlib 和 reportlab
+    from report_generator import ReportGenerator
+
+    config_manager = ConfigManager()
+    config_manager.load_config_from_excel(config_file)
+    return ReportGenerator(
+        task_config=config_manager.get_task_config(),
+        evaluation_dict=config_manager.get_evaluation_dict()
+    )
+
+
+def _print_progress(progress: float, message: str):
+    """在同一行刷新进度"""
+    sys.stderr.write(f"\r[{progress:5.1f}%] {message}\033[K")
+    sys.stderr.flush()
+
+
+def cmd_generate(args) -> int:
+    """批量生成报告"""
+    data = None
+    if args.max_rows_in_flight:
+        # 内存受限模式：由生成器逐块读取，不整表读入验证和预检（需要时先运行 check 子命令）
+        if not os.path.isfile(args.data):
+            print("Excel文件验证失败：文件不存在", file=sys.stderr)
+            return 2
+    else:
+        # 验证时读取的数据直接用于生成，不再重复读取
+        is_valid, message, data = read_excel_file(args.data)
+        if not is_valid:
+            print(f"Excel文件验证失败：{message}", file=sys.stderr)
+            return 2
+
+        # 生成前按整列预检全部数据
+        from preflight import preflight_check, summarize_issues, format_issues
+
+        issues = preflight_check(data, args.filename_mode)
+        if not issues.empty:
+            print(format_issues(issues), file=sys.stderr)
+            if args.strict and summarize_issues(issues)["error_rows"]:
+                print("数据预检发现错误，未生成报告（去掉 --strict 可忽略错误继续生成）", file=sys.stderr)
+                return 2
+
+    from batch_engine import BatchOptions
+
+    generator = _create_generator(args.config)
+    options = BatchOptions(
+        workers=args.workers,
+        row_timeout=args.row_timeout or None,
+        row_retries=args.row_retries,
+        memory_limit_mb=args.memory_limit,
+        max_rows_in_flight=args.max_rows_in_flight,
+        timing=args.timing is not None,
+        timing_format=args.timing,
+        profile=args.profile,
+        memory_sample_every=args.memory_every,
+        trace_allocations=args.trace_allocations
+    )
+    results = generator.generate_batch_reports(
+        data_file=args.data,
+        output_dir=args.output,
+        image_dir=args.images,
+        progress_callback=None if args.quiet else _print_progress,
+        filename_mode=args.filename_mode,
+        filename_separator=args.suffix,
+        data=data,
+        options=options
+    )
+    if not args.quiet:
+        sys.stderr.write("\n")
+
+    print(f"总计: {results['total']} 份，成功: {results['success']} 份，失败: {results['failed']} 份")
+    for error in results["errors"]:
+        print(f"  - {error}")
+    for item in results.get("quarantined", []):
+        print(f"  已隔离: 第{item['excel_row']}行 {item['name']}（ID {item['id']}）- {item['detail']}")
+    concurrency = results.get("concurrency")
+    if concurrency and concurrency["mode"] == "adaptive":
+        print(f"渲染进程数: 启动 {concurrency['initial']} 个，最多 {concurrency['peak']} 个，"
+              f"结束 {concurrency['final']} 个，调整 {len(concurrency['changes'])} 次")
+        for change in concurrency["changes"]:
+            print(f"  {change['time']:.1f}s: {change['from']} -> {change['to']}（{change['reason']}）")
+    timings = results.get("timings")
+    if timings:
+        print(f"耗时: {timings['elapsed']:.2f} 秒，{timings['rows_per_second']:.2f} 份/秒，"
+              f"写入 {timings['bytes_written']} 字节")
+    peak = f"峰值内存: 主进程 {results.get('peak_rss', 0) / 1048576:.1f} MB"
+    if results.get("worker_peak_rss"):
+        peak += f"，单个渲染进程 {results['worker_peak_rss'] / 1048576:.1f} MB"
+    print(peak)
+    memory = results.get("memory")
+    if memory:
+        growth = memory['growth_per_1000']
+        growth = f"{growth / 1048576:.1f} MB" if growth is not None else "采样不足，未计算"
+        print(f"内存: 开始 {memory['start_rss'] / 1048576:.1f} MB，结束 {memory['end_rss'] / 1048576:.1f} MB，"
+              f"峰值 {memory['peak_rss'] / 1048576:.1f} MB，每1000份报告增长 {growth}")
+    for key in ("timings_file", "memory_file", "profile_file", "profile_summary_file"):
+        if key in results:
+            print(f"{key}: {results[key]}")
+    return 0 if results["failed"] == 0 and not results["errors"] else 1
+
+
+def cmd_export(args) -> int:
+    """仅导出评价结果"""
+    is_valid, message, data = read_excel_file(args.data)
+    if not is_valid:
+        print(f"Excel文件验证失败：{message}", file=sys.stderr)
+        return 2
+
+    from evaluation_export import export_evaluations
+    from participant_store import normalize_date_columns
+
+    config_manager = ConfigManager()
+    config_manager.load_config_from_excel(args.config)
+    results = export_evaluations(args.data, args.output, config_manager.get_task_config(),
+                                 config_manager.get_evaluation_dict(), data=normalize_date_columns(data))
+    print(f"已导出 {results['total']} 名受试者、{results['measures']} 个测评项目: {results['output_file']}")
+    return 0
+
+
+def cmd_check(args) -> int:
+    """仅预检数据，不生成报告"""
+    is_valid, message, data = read_excel_file(args.data)
+    if not is_valid:
+        print(f"Excel文件验证失败：{message}", file=sys.stderr)
+        return 2
+
+    from preflight import preflight_check, summarize_issues, format_issues, write_issues
+
+    issues = preflight_check(data, args.filename_mode)
+    print(format_issues(issues, limit=args.limit))
+    if args.output and not issues.empty:
+        print(f"问题表: {write_issues(issues, args.output)}")
+    return 1 if summarize_issues(issues)["error_rows"] else 0
+
+
+def cmd_preview(args) -> int:
+    """绘制单个受试者报告第一页的草图（PNG），不生成PDF"""
+    is_valid, message, data = read_excel_file(args.data)
+    if not is_valid:
+        print(f"Excel文件验证失败：{message}", file=sys.stderr)
+        return 2
+    index = args.row - 2  # Excel中的行号（第1行为表头）
+    if not 0 <= index < len(data):
+        print(f"行号超出范围：数据共 {len(data)} 行（第2行至第{len(data) + 1}行）", file=sys.stderr)
+        return 2
+
+    from preview import PreviewRenderer
+    from participant_store import normalize_date_columns
+
+    generator = _create_generator(args.config)
+    renderer = PreviewRenderer(generator, dpi=args.dpi)
+    row = normalize_date_columns(data).iloc[index]
+    page = renderer.render(row, args.title or generator.report_title,
+                           generator.disclaimer if args.disclaimer is None else args.disclaimer)
+    page.save(args.output)
+    print(f"已保存第{args.row}行的报告草图: {args.output}")
+    if page.info.get("hidden_rows"):
+        print(f"另有 {page.info['hidden_rows']} 个测评项目在后续页面，草图中未显示")
+    return 0
+
+
+def cmd_watch(args) -> int:
+    """监视输入目录，自动为新增或修改的数据文件生成报告"""
+    from watcher import FolderWatcher
+    from batch_engine import BatchOptions
+
+    def on_result(name, entry):
+        status = "失败" if entry["errors"] and not entry["success"] else "完成"
+        print(f"[{entry['processed_at']}] {name}: {status}，成功 {entry['success']} 份，"
+              f"失败 {entry['failed']} 份，耗时 {entry['elapsed']} 秒 -> {entry['output_dir']}", flush=True)
+        for error in entry["errors"][:5]:
+            print(f"  - {error}", flush=True)
+
+    watcher = FolderWatcher(
+        args.input, args.output, args.config,
+        interval=args.interval,
+        settle=args.settle,
+        filename_mode=args.filename_mode,
+        filename_separator=args.suffix,
+        options=BatchOptions(
+            workers=args.workers,
+            row_timeout=app_config.get("performance.row_timeout", 0) or None,
+            row_retries=app_config.get("performance.row_retries", 1),
+            memory_limit_mb=app_config.get("performance.memory_limit_mb", 0),
+            max_rows_in_flight=app_config.get("performance.max_rows_in_flight", 0)
+        ),
+        on_result=on_result
+    )
+    if args.once:
+        try:
+            processed = watcher.poll_once(settled_only=False)
+        finally:
+            watcher.close()
+        print(f"已处理 {len(processed)} 个数据文件")
+        return 1 if any(entry["errors"] for entry in processed) else 0
+
+    print(f"正在监视 {args.input}（按 Ctrl+C 停止）", flush=True)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("已停止监视")
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """构建命令行参数解析器"""
+    parser = argparse.ArgumentParser(description="心理测试反馈报告生成器（命令行）")
+    parser.add_argument("-v", "--verbose", action="store_true", help="输出DEBUG级别日志")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    generate = subparsers.add_parser("generate", help="批量生成PDF报告")
+    generate.add_argument("-d", "--data", required=True, help="受试者数据Excel文件")
+    generate.add_argument("-c", "--config", required=True, help="评分配置Excel文件")
+    generate.add_argument("-o", "--output", required=True, help="报告输出目录")
+    generate.add_argument("--images", default=None, help="雷达图图片目录（可选，雷达图生成失败时使用）")
+    generate.add_argument("--filename-mode", choices=["name_custom", "id_only"], default="name_custom",
+                          help="文件命名模式：姓名或ID")
+    generate.add_argument("--suffix", default="", help="文件名中的自定义内容")
+    generate.add_argument("-w", "--workers", type=int,
+                          default=app_config.get("performance.workers", 0),
+                          help="渲染进程数，0表示按CPU和内存占用自动选择并在运行中调整，1表示不使用多进程")
+    generate.add_argument("--timing", choices=["json", "csv"], default=None,
+                          help="记录分阶段耗时并写入输出目录")
+    generate.add_argument("--profile", action="store_true",
+                          help="性能分析模式：逐个生成（安装了pyinstrument时采样分析，否则用cProfile）"
+                               "并写入profile.pstats和profile_summary.txt")
+    generate.add_argument("--memory-every", type=int, default=0, metavar="N",
+                          help="每生成N份报告采样一次内存占用，并写入输出目录的memory.json")
+    generate.add_argument("--trace-allocations", action="store_true",
+                          help="配合--memory-every，用tracemalloc统计增长最多的内存分配位置")
+    generate.add_argument("--row-timeout", type=float,
+                          default=app_config.get("performance.row_timeout", 0),
+                          help="单份报告的渲染时间限制（秒），超时或崩溃的行重试后隔离；0表示不限制")
+    generate.add_argument("--row-retries", type=int,
+                          default=app_config.get("performance.row_retries", 1),
+                          help="超时或崩溃的行最多重试的次数")
+    generate.add_argument("--memory-limit", type=int, metavar="MB",
+                          default=app_config.get("performance.memory_limit_mb", 0),
+                          help="自动选择进程数（-w 0）时进程池的内存上限（MB），0表示物理内存的60%%")
+    generate.add_argument("--max-rows-in-flight", type=int, metavar="N",
+                          default=app_config.get("performance.max_rows_in_flight", 0),
+                          help="内存受限模式：每次最多读入和处理N行数据（不做整表预检），0表示一次读入全部数据")
+    generate.add_argument("--strict", action="store_true", help="数据预检发现错误时不生成报告")
+    generate.add_argument("-q", "--quiet", action="store_true", help="不显示进度")
+    generate.set_defaults(func=cmd_generate)
+
+    export = subparsers.add_parser("export", help="仅导出评价结果（不生成PDF）")
+    export.add_argument("-d", "--data", required=True, help="受试者数据Excel文件")
+    export.add_argument("-c", "--config", required=True, help="评分配置Excel文件")
+    export.add_argument("-o", "--output", required=True, help="导出文件（.csv / .parquet / .xlsx）")
+    export.set_defaults(func=cmd_export)
+
+    check = subparsers.add_parser("check", help="预检数据（成绩、日期、文件名重复等），不生成报告")
+    check.add_argument("-d", "--data", required=True, help="受试者数据Excel文件")
+    check.add_argument("-o", "--output", default=None, help="问题表输出文件（.csv / .xlsx，可选）")
+    check.add_argument("--filename-mode", choices=["name_custom", "id_only"], default="name_custom",
+                       help="文件命名模式（用于检查文件名重复）")
+    check.add_argument("--limit", type=int, default=20, help="最多显示的问题数")
+    check.set_defaults(func=cmd_check)
+
+    preview = subparsers.add_parser("preview", help="绘制单个受试者报告第一页的草图（PNG），不生成PDF")
+    preview.add_argument("-d", "--data", required=True, help="受试者数据Excel文件")
+    preview.add_argument("-c", "--config", required=True, help="评分配置Excel文件")
+    preview.add_argument("-o", "--output", required=True, help="草图输出文件（.png）")
+    preview.add_argument("--row", type=int, default=2, help="受试者在Excel中的行号（第1行为表头）")
+    preview.add_argument("--title", default=None, help="报告标题（默认使用生成器的标题）")
+    preview.add_argument("--disclaimer", default=None, help="结果说明（默认使用生成器的结果说明）")
+    preview.add_argument("--dpi", type=int, default=app_config.get("preview.dpi", 96),
+                         help="草图分辨率（每英寸像素数）")
+    preview.set_defaults(func=cmd_preview)
+
+    watch = subparsers.add_parser("watch", help="监视输入目录，自动为新增或修改的数据文件生成报告")
+    watch.add_argument("-i", "--input", required=True, help="监视的输入目录（放入受试者数据Excel文件）")
+    watch.add_argument("-c", "--config", required=True, help="评分配置Excel文件（修改后自动重新加载）")
+    watch.add_argument("-o", "--output", required=True,
+                       help="输出根目录（每个数据文件的报告生成到同名子目录，台账为 watch_ledger.json）")
+    watch.add_argument("--interval", type=float, default=2.0, help="检查间隔（秒）")
+    watch.add_argument("--settle", type=float, default=2.0, help="文件最后一次修改后至少等待的秒数")
+    watch.add_argument("--once", action="store_true", help="只处理当前需要处理的文件，然后退出")
+    watch.add_argument("--filename-mode", choices=["name_custom", "id_only"], default="name_custom",
+                       help="文件命名模式：姓名或ID")
+    watch.add_argument("--suffix", default="", help="文件名中的自定义内容")
+    watch.add_argument("-w", "--workers", type=int,
+                       default=app_config.get("performance.workers", 0),
+                       help="渲染进程数，0表示按CPU核数自动选择，1表示不使用多进程")
+    watch.set_defaults(func=cmd_watch)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    """命令行主函数"""
+    args = build_parser().parse_args(argv)
+    setup_logging(level=logging.DEBUG if args.verbose else logging.WARNING)
+    try:
+        return args.func(args)
+    except Exception as e:
+        print(f"执行失败：{e}", file=sys.stderr)
+        return 1
+
+
+if __name__ == "__main__":
+    # 打包为exe后多进程渲染需要
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -29,6 +29,7 @@ class Config:
                 "last_data_file": "",
                 "last_image_dir": "",
                 "last_output_dir": "",
+                "last_config_file": "",
                 "default_output_dir": "./reports"
             },
             "report": {
@@ -55,6 +56,25 @@ class Config:
                     "low": 85,
                     "high": 115
                 }
+            },
+            "performance": {
+                "workers": 0,  # 渲染进程数，0表示按CPU和内存占用自动选择并在运行中调整
+                "memory_limit_mb": 0,  # 自动选择进程数时进程池的内存上限（MB），0表示物理内存的60%
+                "max_rows_in_flight": 0,  # 内存受限模式：每次最多读入和处理的行数，0表示一次读入全部数据
+                "keep_workers_warm": True,  # 界面中渲染进程在整个会话中常驻，多次生成之间不重新启动
+                "timing_format": "",  # 分阶段耗时统计文件格式（json/csv），空表示不记录
+                "row_timeout": 60,  # 单份报告的渲染时间限制（秒），超时的行在新进程中重试后隔离；0表示不限制
+                "row_retries": 1  # 超时或导致渲染进程崩溃的行最多重试的次数
+            },
+            "preview": {
+                "dpi": 96  # 报告预览草图的分辨率（每英寸像素数）
+            },
+            "logging": {
+                "level": "INFO",  # 设为 DEBUG 可输出逐行调试事件
+                "max_file_mb": 10,  # 单个日志文件大小上限（MB）
+                "backup_count": 5,  # 保留的轮转日志数量
+                "gui_max_lines": 1000,  # 界面日志框保留的最大行数
+                "gui_flush_ms": 200  # 界面日志框刷新间隔（毫秒）
             }
         }
     
@@ -4,25 +4,109 @@
 """
 
 import pandas as pd
+import numpy as np
 import json
+import os
+import hashlib
 import logging
+import tempfile
 from pathlib import Path
 from typing import Dict, Any, Optional, List, Tuple
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox
 
+from utils import get_cache_dir
+
 
 logger = logging.getLogger(__name__)
 
+# 编译后配置缓存的格式版本（缓存结构变化时递增，旧缓存自动失效）
+CONFIG_CACHE_VERSION = 1
+
+# 配置文件列数 -> (等级名称, 说明列名)；阈值列数 = 等级数 - 1
+TIER_LAYOUTS = {
+    4: (['low', 'high'],
+        ['低分说明', '高分说明']),
+    6: (['low', 'mid', 'high'],
+        ['低分说明', '中等分说明', '高分说明']),
+    8: (['very_low', 'low', 'mid', 'high'],
+        ['很低说明', '低分说明', '中等分说明', '高分说明']),
+    10: (['very_low', 'low', 'mid', 'high', 'very_high'],
+         ['很低说明', '低分说明', '中等分说明', '高分说明', '很高说明']),
+    12: (['extremely_low', 'low', 'mid_low', 'mid_high', 'high', 'extremely_high'],
+         ['极低说明', '低分说明', '中低说明', '中高说明', '高分说明', '极高说明']),
+    14: (['extremely_low', 'low', 'mid_low', 'mid', 'mid_high', 'high', 'extremely_high'],
+         ['极低说明', '低分说明', '中低说明', '中等说明', '中高说明', '高分说明', '极高说明']),
+}
+
+# 校验错误信息中最多列出的条数
+MAX_REPORTED_ERRORS = 20
+
+
+def file_sha256(file_path: str) -> str:
+    """计算文件内容的SHA-256（用于配置缓存的键）"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def validate_config_frame(df: pd.DataFrame, threshold_count: int, level_labels: List[str]) -> List[str]:
+    """
+    按列批量校验配置表，一次返回所有错误
+
+    Args:
+        df: 已按分档模式命名列的配置表
+        threshold_count: 阈值列数
+        level_labels: 说明列名
+
+    Returns:
+        错误信息列表（为空表示校验通过）；行号与Excel中的行号一致
+    """
+    items = df[df['测评项目'].notna()]
+    row_numbers = items.index.to_numpy() + 2
+    errors = {}
+
+    def add(mask, message):
+        for row_number in row_numbers[np.asarray(mask)]:
+            errors.setdefault(int(row_number), []).append(message)
+
+    # 阈值必须是有效数字
+    threshold_columns = [f'阈值{i}' for i in range(1, threshold_count + 1)]
+    thresholds = items[threshold_columns].apply(pd.to_numeric, errors='coerce').to_numpy(dtype=float)
+    invalid = np.isnan(thresholds)
+    for i, column in enumerate(threshold_columns):
+        add(invalid[:, i], f"{column}必须是有效数字")
+
+    # 阈值必须递增（只比较相邻的有效阈值）
+    if threshold_count > 1:
+        with np.errstate(invalid='ignore'):
+            not_increasing = (np.diff(thresholds, axis=1) <= 0).any(axis=1)
+        add(not_increasing, "阈值必须递增排列")
+
+    # 说明文本不能为空
+    for label in level_labels:
+        texts = items[label]
+        add(texts.isna() | (texts.astype(str).str.strip() == ''), f"{label}不能为空")
+
+    return [f"第{row_number}行：{'；'.join(messages)}" for row_number, messages in sorted(errors.items())]
+
 
 class ConfigManager:
     """配置管理器 - 管理评分配置和评价规则"""
     
-    def __init__(self):
+    def __init__(self, cache_dir: Optional[str] = str(get_cache_dir())):
+        """
+        Args:
+            cache_dir: 编译后配置的缓存目录（默认为用户的应用数据目录，见 utils.get_cache_dir），
+                       None表示不使用缓存
+        """
         self.task_config = self._get_default_task_config()
         # 默认使用空的评价规则字典，不预置变量
         self.evaluation_dict = {}
         self.config_file_path = None
+        self.cache_dir = Path(cache_dir) if cache_dir else None
         
     def _get_default_task_config(self) -> Dict:
         """获取默认任务配置 - 空配置，等待用户导入"""
@@ -35,7 +119,7 @@ class ConfigManager:
         """获取默认评价规则字典 - 空字典，等待用户导入配置"""
         return {}
     
-    def load_config_from_excel(self, file_path: str) -> bool:
+    def load_config_from_excel(self, file_path: str, use_cache: bool = True) -> bool:
         """
         从Excel文件加载配置
         
@@ -52,126 +136,32 @@ class ConfigManager:
         - 6档：阈值1 | 阈值2 | 阈值3 | 阈值4 | 阈值5 | 极低说明 | 低分说明 | 中低说明 | 中高说明 | 高分说明 | 极高说明
         - 7档：阈值1 | 阈值2 | 阈值3 | 阈值4 | 阈值5 | 阈值6 | 极低说明 | 低分说明 | 中低说明 | 中等说明 | 中高说明 | 高分说明 | 极高说明
         
+        解析并校验通过的配置按文件内容的哈希缓存，文件未改变时直接读取缓存。
+        
         Args:
             file_path: Excel文件路径
+            use_cache: 是否使用编译后配置缓存
             
         Returns:
             是否加载成功
         """
         try:
-            # 读取Excel文件
-            df = pd.read_excel(file_path)
-            
-            # 验证最少列数
-            if len(df.columns) < 4:
-                raise ValueError("Excel文件列数不足，最少需要4列：测评项目、阈值、低分说明、高分说明")
-            
-            # 自动检测分档模式
-            first_row = df.iloc[0]
-            col_count = len(df.columns)
-            
-            # 分析列结构，确定分档数量
-            if col_count == 4:  # 2档模式
-                level_count = 2
-                threshold_count = 1
-                df.columns = ['测评项目', '阈值1', '低分说明', '高分说明']
-                level_names = ['low', 'high']
-                level_labels = ['低分说明', '高分说明']
-            elif col_count == 6:  # 3档模式（原有格式）
-                level_count = 3
-                threshold_count = 2
-                df.columns = ['测评项目', '阈值1', '阈值2', '低分说明', '中等分说明', '高分说明']
-                level_names = ['low', 'mid', 'high']
-                level_labels = ['低分说明', '中等分说明', '高分说明']
-            elif col_count == 8:  # 4档模式
-                level_count = 4
-                threshold_count = 3
-                df.columns = ['测评项目', '阈值1', '阈值2', '阈值3', '很低说明', '低分说明', '中等分说明', '高分说明']
-                level_names = ['very_low', 'low', 'mid', 'high']
-                level_labels = ['很低说明', '低分说明', '中等分说明', '高分说明']
-            elif col_count == 10:  # 5档模式
-                level_count = 5
-                threshold_count = 4
-                df.columns = ['测评项目', '阈值1', '阈值2', '阈值3', '阈值4', '很低说明', '低分说明', '中等分说明', '高分说明', '很高说明']
-                level_names = ['very_low', 'low', 'mid', 'high', 'very_high']
-                level_labels = ['很低说明', '低分说明', '中等分说明', '高分说明', '很高说明']
-            elif col_count == 12:  # 6档模式
-                level_count = 6
-                threshold_count = 5
-                df.columns = ['测评项目', '阈值1', '阈值2', '阈值3', '阈值4', '阈值5', '极低说明', '低分说明', '中低说明', '中高说明', '高分说明', '极高说明']
-                level_names = ['extremely_low', 'low', 'mid_low', 'mid_high', 'high', 'extremely_high']
-                level_labels = ['极低说明', '低分说明', '中低说明', '中高说明', '高分说明', '极高说明']
-            elif col_count == 14:  # 7档模式
-                level_count = 7
-                threshold_count = 6
-                df.columns = ['测评项目', '阈值1', '阈值2', '阈值3', '阈值4', '阈值5', '阈值6', '极低说明', '低分说明', '中低说明', '中等说明', '中高说明', '高分说明', '极高说明']
-                level_names = ['extremely_low', 'low', 'mid_low', 'mid', 'mid_high', 'high', 'extremely_high']
-                level_labels = ['极低说明', '低分说明', '中低说明', '中等说明', '中高说明', '高分说明', '极高说明']
-            else:
-                raise ValueError(f"不支持的列数：{col_count}。支持的格式：4列(2档)、6列(3档)、8列(4档)、10列(5档)、12列(6档)、14列(7档)")
-            
-            # 验证数据
-            for idx, row in df.iterrows():
-                if pd.isna(row['测评项目']):
-                    continue
-                    
-                # 验证阈值
-                thresholds = []
-                for i in range(1, threshold_count + 1):
-                    try:
-                        threshold = float(row[f'阈值{i}'])
-                        thresholds.append(threshold)
-                    except (ValueError, TypeError):
-                        raise ValueError(f"第{idx+2}行：阈值{i}必须是有效数字")
-                
-                # 验证阈值递增
-                for i in range(len(thresholds) - 1):
-                    if thresholds[i] >= thresholds[i + 1]:
-                        raise ValueError(f"第{idx+2}行：阈值必须递增排列")
-                
-                # 验证说明文本
-                for label in level_labels:
-                    if pd.isna(row[label]) or str(row[label]).strip() == '':
-                        raise ValueError(f"第{idx+2}行：{label}不能为空")
-            
-            # 构建新的配置
-            new_evaluation_dict = {}
-            task_items = []
-            
-            for idx, row in df.iterrows():
-                if pd.isna(row['测评项目']):
-                    continue
-                    
-                item_name = str(row['测评项目']).strip()
-                task_items.append(item_name)
-                
-                # 构建阈值列表
-                thresholds = []
-                for i in range(1, threshold_count + 1):
-                    thresholds.append(float(row[f'阈值{i}']))
-                
-                # 构建等级说明字典
-                levels = {}
-                for i, (level_name, level_label) in enumerate(zip(level_names, level_labels)):
-                    levels[level_name] = str(row[level_label]).strip()
-                
-                new_evaluation_dict[item_name] = {
-                    "thresholds": thresholds,
-                    "levels": levels,
-                    "level_count": level_count,
-                    "level_names": level_names
-                }
+            cache_file = None
+            if use_cache and self.cache_dir is not None:
+                cache_file = self.cache_dir / f"config_{file_sha256(file_path)}.json"
+                compiled = self._read_compiled_config(cache_file)
+                if compiled is not None:
+                    self._apply_compiled_config(compiled, file_path)
+                    logger.info(f"从缓存加载配置：{file_path}")
+                    return True
             
-            # 更新配置
-            self.evaluation_dict = new_evaluation_dict
-            self.task_config = {
-                "常规任务": task_items,
-                "特殊任务": []
-            }
-            self.config_file_path = file_path
+            compiled = self._compile_config_from_excel(file_path)
+            self._apply_compiled_config(compiled, file_path)
+            if cache_file is not None:
+                self._write_compiled_config(cache_file, compiled)
             
             logger.info(f"成功从Excel文件加载配置：{file_path}")
-            logger.info(f"加载了{len(task_items)}个测评项目，使用{level_count}档评价模式")
+            logger.info(f"加载了{len(compiled['task_items'])}个测评项目，使用{compiled['level_count']}档评价模式")
             
             return True
             
@@ -179,6 +169,103 @@ class ConfigManager:
             logger.error(f"加载Excel配置文件失败：{str(e)}")
             raise
     
+    def _compile_config_from_excel(self, file_path: str) -> Dict[str, Any]:
+        """解析并校验Excel配置文件，返回编译后的配置"""
+        # 读取Excel文件
+        df = pd.read_excel(file_path)
+        
+        # 验证最少列数
+        if len(df.columns) < 4:
+            raise ValueError("Excel文件列数不足，最少需要4列：测评项目、阈值、低分说明、高分说明")
+        
+        # 根据列数确定分档模式
+        col_count = len(df.columns)
+        if col_count not in TIER_LAYOUTS:
+            raise ValueError(f"不支持的列数：{col_count}。支持的格式：4列(2档)、6列(3档)、8列(4档)、10列(5档)、12列(6档)、14列(7档)")
+        level_names, level_labels = TIER_LAYOUTS[col_count]
+        level_count = len(level_names)
+        threshold_count = level_count - 1
+        df.columns = ['测评项目'] + [f'阈值{i}' for i in range(1, threshold_count + 1)] + level_labels
+        
+        # 一次校验所有行，汇总全部错误
+        errors = validate_config_frame(df, threshold_count, level_labels)
+        if errors:
+            shown = errors[:MAX_REPORTED_ERRORS]
+            if len(errors) > MAX_REPORTED_ERRORS:
+                shown.append(f"……另有{len(errors) - MAX_REPORTED_ERRORS}行存在错误")
+            raise ValueError(f"配置文件共有{len(errors)}行存在错误：\n" + "\n".join(shown))
+        
+        # 构建新的配置
+        items = df[df['测评项目'].notna()]
+        threshold_values = items[[f'阈值{i}' for i in range(1, threshold_count + 1)]].apply(
+            pd.to_numeric, errors='coerce').to_numpy(dtype=float).tolist()
+        level_texts = items[level_labels].astype(str).to_numpy().tolist()
+        
+        new_evaluation_dict = {}
+        task_items = []
+        for item, thresholds, texts in zip(items['测评项目'], threshold_values, level_texts):
+            item_name = str(item).strip()
+            task_items.append(item_name)
+            new_evaluation_dict[item_name] = {
+                "thresholds": thresholds,
+                "levels": {name: text.strip() for name, text in zip(level_names, texts)},
+                "level_count": level_count,
+                "level_names": level_names
+            }
+        
+        return {
+            "version": CONFIG_CACHE_VERSION,
+            "task_items": task_items,
+            "evaluation_dict": new_evaluation_dict,
+            "level_count": level_count,
+        }
+    
+    def _apply_compiled_config(self, compiled: Dict[str, Any], file_path: str):
+        """使用编译后的配置更新当前配置"""
+        self.evaluation_dict = compiled["evaluation_dict"]
+        self.task_config = {
+            "常规任务": list(compiled["task_items"]),
+            "特殊任务": []
+        }
+        self.config_file_path = file_path
+    
+    def _read_compiled_config(self, cache_file: Path) -> Optional[Dict[str, Any]]:
+        """读取编译后配置缓存，不存在或版本不符时返回None"""
+        if not cache_file.exists():
+            return None
+        try:
+            with open(cache_file, 'r', encoding='utf-8') as f:
+                compiled = json.load(f)
+            if compiled.get("version") == CONFIG_CACHE_VERSION:
+                return compiled
+        except (OSError, ValueError) as e:
+            logger.warning(f"配置缓存读取失败，将重新解析：{cache_file} - {e}")
+        return None
+    
+    def _write_compiled_config(self, cache_file: Path, compiled: Dict[str, Any]):
+        """
+        写入编译后配置缓存（先写临时文件再替换，避免并发读到半个文件）
+        
+        每次写入使用独立的临时文件名，多个进程同时写同一缓存时不会互相覆盖临时文件。
+        写入失败（目录只读、磁盘已满等）只记录警告，不影响配置加载。
+        """
+        temp_file = None
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=cache_file.parent,
+                                             prefix=cache_file.stem + '.', suffix='.tmp',
+                                             delete=False) as f:
+                temp_file = f.name
+                json.dump(compiled, f, ensure_ascii=False)
+            os.replace(temp_file, cache_file)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"配置缓存写入失败：{cache_file} - {e}")
+            if temp_file is not None:
+                try:
+                    os.unlink(temp_file)
+                except OSError:
+                    pass
+    
     def save_config_to_json(self, file_path: str) -> bool:
         """
         保存配置到JSON文件
@@ -0,0 +1,116 @@
+"""
+心理测试反馈报告生成器 - 评价规则模块
+将评分配置编译为有序阈值数组和等级说明表，支持按整列批量分档
+"""
+
+import bisect
+import numpy as np
+from typing import Dict, List, Optional
+
+
+# 无法评价（缺失值、未配置项目）时显示的文本
+MISSING_TEXT = "-"
+
+# 等级矩阵中表示无法评价的编码
+NO_LEVEL = -1
+
+# 未指定 level_names 时的默认三档等级
+DEFAULT_LEVEL_NAMES = ["low", "mid", "high"]
+
+
+class CompiledRule:
+    """单个测评项目编译后的评价规则"""
+
+    __slots__ = ('bounds', 'bound_list', 'level_names', 'texts', 'max_level')
+
+    def __init__(self, config: Dict):
+        thresholds = np.asarray(config["thresholds"], dtype=np.float64)
+        # 原逻辑逐个比较阈值，遇到第一个未超过的阈值即停止：
+        # 等级 = 前缀阈值全部被超过的个数 = 阈值前缀最大值中小于分数的个数。
+        # 对前缀最大值（单调不减）做二分查找，结果与逐个比较完全一致。
+        self.bounds = np.maximum.accumulate(thresholds) if thresholds.size else thresholds
+        self.bound_list = self.bounds.tolist()
+        self.level_names = list(config.get("level_names", DEFAULT_LEVEL_NAMES))
+        levels = config.get("levels", {})
+        self.texts = [levels.get(name, MISSING_TEXT) for name in self.level_names]
+        self.max_level = len(self.level_names) - 1
+
+
+class EvaluationEngine:
+    """
+    评价引擎
+
+    - 初始化时将评价规则编译为每个项目的阈值数组和等级说明表
+    - evaluate()/level_index() 对单个分数二分查找
+    - classify() 对整个成绩矩阵按列调用 np.searchsorted，得到等级矩阵
+    """
+
+    def __init__(self, task_config: Dict, evaluation_dict: Dict):
+        """
+        Args:
+            task_config: 任务配置字典（常规任务、特殊任务）
+            evaluation_dict: 评价规则字典
+        """
+        tasks = list(task_config.get("常规任务", [])) + list(task_config.get("特殊任务", []))
+        # 只有同时出现在任务列表和评价规则中的项目才参与评价
+        self.rules: Dict[str, CompiledRule] = {
+            task: CompiledRule(evaluation_dict[task])
+            for task in tasks if task in evaluation_dict
+        }
+
+    def level_index(self, task: str, score) -> int:
+        """获取单个分数的等级编号，无法评价时返回 NO_LEVEL"""
+        rule = self.rules.get(task)
+        if rule is None or rule.max_level < 0:
+            return NO_LEVEL
+        try:
+            score = float(score)
+        except (ValueError, TypeError):
+            return NO_LEVEL
+        if score != score:  # NaN
+            return NO_LEVEL
+        return min(bisect.bisect_left(rule.bound_list, score), rule.max_level)
+
+    def level_text(self, task: str, level: int) -> str:
+        """根据等级编号获取评价说明"""
+        if level < 0:
+            return MISSING_TEXT
+        return self.rules[task].texts[level]
+
+    def level_name(self, task: str, level: int) -> str:
+        """根据等级编号获取等级名称（如 low、mid、high）"""
+        if level < 0:
+            return MISSING_TEXT
+        return self.rules[task].level_names[level]
+
+    def evaluate(self, task: str, score) -> str:
+        """获取单个分数的评价说明"""
+        return self.level_text(task, self.level_index(task, score))
+
+    def classify(self, columns: List[str], scores: np.ndarray) -> np.ndarray:
+        """
+        按整列计算等级矩阵
+
+        Args:
+            columns: 成绩矩阵各列对应的测评项目
+            scores: 成绩矩阵（行=受试者，列=测评项目），缺失值为NaN
+
+        Returns:
+            int8等级矩阵，形状与成绩矩阵相同；无法评价的单元格为 NO_LEVEL
+        """
+        levels = np.full(scores.shape, NO_LEVEL, dtype=np.int8)
+        for j, task in enumerate(columns):
+            rule = self.rules.get(task)
+            if rule is None or rule.max_level < 0:
+                continue
+            column = scores[:, j]
+            column_levels = np.searchsorted(rule.bounds, column, side='left')
+            np.minimum(column_levels, rule.max_level, out=column_levels)
+            column_levels[np.isnan(column)] = NO_LEVEL
+            levels[:, j] = column_levels
+        return levels
+
+    def text_table(self, task: str) -> Optional[List[str]]:
+        """获取项目的等级说明表（按等级编号索引），未配置时返回None"""
+        rule = self.rules.get(task)
+        return rule.texts if rule is not None else None
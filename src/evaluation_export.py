@@ -0,0 +1,133 @@
+"""
+心理测试反馈报告生成器 - 评价结果导出模块
+只执行读取、清洗和评价，导出每位受试者每个测评项目的成绩和等级，不生成PDF
+（本模块不导入matplotlib和reportlab）
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, Any, Optional
+
+from participant_store import ParticipantStore, load_participant_data
+from evaluation_engine import EvaluationEngine, MISSING_TEXT
+
+
+logger = logging.getLogger(__name__)
+
+# 支持的导出格式（按文件扩展名识别）
+EXPORT_FORMATS = {'.csv': 'csv', '.parquet': 'parquet', '.xlsx': 'excel'}
+
+# Excel单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+
+
+def build_evaluation_frame(store: ParticipantStore, engine: EvaluationEngine) -> pd.DataFrame:
+    """
+    构建长格式评价结果表：每行对应一位受试者的一个测评项目
+
+    列：个人信息列 | 测评项目 | 成绩 | 等级序号 | 等级 | 等级说明
+    """
+    if store.levels is None:
+        store.levels = engine.classify(store.score_columns, store.scores)
+
+    rows, measures = len(store), len(store.score_columns)
+    frame = {}
+    for col in store.columns:
+        if col not in store.score_index:
+            frame[col] = np.repeat(store.column_values(col), measures)
+    frame['测评项目'] = np.tile(np.array(store.score_columns, dtype=object), rows)
+
+    scores = np.empty((rows, measures), dtype=object)
+    level_names = np.empty((rows, measures), dtype=object)
+    level_texts = np.empty((rows, measures), dtype=object)
+    for j, task in enumerate(store.score_columns):
+        scores[:, j] = store.column_values(task)
+        codes = store.levels[:, j]
+        rule = engine.rules.get(task)
+        if rule is None:
+            level_names[:, j] = MISSING_TEXT
+            level_texts[:, j] = MISSING_TEXT
+            continue
+        # 查找表末尾追加缺失文本，编码-1恰好索引到最后一项
+        level_names[:, j] = np.array(rule.level_names + [MISSING_TEXT], dtype=object)[codes]
+        level_texts[:, j] = np.array(rule.texts + [MISSING_TEXT], dtype=object)[codes]
+
+    level_numbers = store.levels.astype(np.float64).ravel() + 1
+    level_numbers[level_numbers <= 0] = np.nan
+
+    frame['成绩'] = scores.ravel()
+    frame['等级序号'] = pd.array(level_numbers, dtype="Int64")
+    frame['等级'] = level_names.ravel()
+    frame['等级说明'] = level_texts.ravel()
+    return pd.DataFrame(frame)
+
+
+def _parquet_compatible(frame: pd.DataFrame) -> pd.DataFrame:
+    """
+    将数值和文本混合的对象列（如含“缺考”的成绩列、数字与文本混合的ID）转为字符串列，
+    pyarrow 要求同一列的值类型一致；缺失值保留为空
+    """
+    mixed = [col for col in frame.columns
+             if frame[col].dtype == object
+             and pd.api.types.infer_dtype(frame[col], skipna=True) in ('mixed', 'mixed-integer')]
+    if not mixed:
+        return frame
+    return frame.astype({col: "string" for col in mixed})
+
+
+def write_evaluation_frame(frame: pd.DataFrame, output_file: str) -> str:
+    """按扩展名将评价结果写入CSV、Parquet或Excel文件，返回导出格式"""
+    suffix = Path(output_file).suffix.lower()
+    file_format = EXPORT_FORMATS.get(suffix)
+    if file_format is None:
+        raise ValueError(f"不支持的导出格式：{suffix}。支持的格式：{', '.join(EXPORT_FORMATS)}")
+
+    if file_format == 'csv':
+        # 带BOM的UTF-8，Excel直接打开不乱码
+        frame.to_csv(output_file, index=False, encoding='utf-8-sig')
+    elif file_format == 'parquet':
+        try:
+            _parquet_compatible(frame).to_parquet(output_file, index=False)
+        except ImportError:
+            raise ImportError("导出Parquet需要安装pyarrow：pip install pyarrow")
+    else:
+        if len(frame) + 1 > EXCEL_MAX_ROWS:
+            raise ValueError(f"结果共{len(frame)}行，超过Excel单表上限，请导出为CSV或Parquet")
+        frame.to_excel(output_file, index=False)
+    return file_format
+
+
+def export_evaluations(data_file: str, output_file: str, task_config: Dict, evaluation_dict: Dict,
+                       data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+    """
+    仅评价模式：读取数据、清洗、评价并导出等级矩阵，不生成PDF
+
+    Args:
+        data_file: Excel数据文件路径
+        output_file: 导出文件路径（.csv / .parquet / .xlsx）
+        task_config: 任务配置字典
+        evaluation_dict: 评价规则字典
+        data: 已读取并规范化的数据（可选，提供时不再读取data_file）
+
+    Returns:
+        Dict: 导出结果统计（受试者数、测评项目数、导出行数、输出文件）
+    """
+    df = data if data is not None else load_participant_data(data_file)
+    store = ParticipantStore.from_dataframe(df)
+    engine = EvaluationEngine(task_config, evaluation_dict)
+    frame = build_evaluation_frame(store, engine)
+
+    output_path = Path(output_file)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    file_format = write_evaluation_frame(frame, str(output_path))
+
+    logger.info(f"评价结果已导出: {output_path}（{len(store)}名受试者，{len(store.score_columns)}个测评项目）")
+    return {
+        "total": len(store),
+        "measures": len(store.score_columns),
+        "rows": len(frame),
+        "format": file_format,
+        "output_file": str(output_path),
+    }
@@ -0,0 +1,277 @@
+"""
+心理测试反馈报告生成器 - 系统字体索引
+扫描一次系统和用户字体目录，建立“字体族名 -> 字体文件和TTC子字体序号”的索引并缓存到文件，
+字体目录的修改时间改变时自动重建。启动时解析字体只需查表，无需逐个尝试固定路径。
+"""
+
+import os
+import sys
+import json
+import struct
+import logging
+import threading
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils import get_cache_dir
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DEFAULT_INDEX_FILE = get_cache_dir() / "font_index.json"
+
+FONT_EXTENSIONS = ('.ttf', '.ttc', '.otf', '.otc')
+
+# 报告使用的字体名 -> 候选字体族（按优先级，不区分大小写）
+FONT_FAMILIES = {
+    "SimSun": ["SimSun", "宋体", "NSimSun", "STSong", "Songti SC", "AR PL UMing CN",
+               "Noto Serif CJK SC", "Source Han Serif SC"],
+    "SimKai": ["KaiTi", "楷体", "SimKai", "STKaiti", "Kaiti SC", "AR PL UKai CN"],
+    "SimHei": ["SimHei", "黑体", "Microsoft YaHei", "微软雅黑", "STHeiti", "Heiti SC",
+               "Noto Sans CJK SC", "Source Han Sans SC"],
+}
+
+# 随程序分发、放在工作目录下的字体文件
+LOCAL_FONT_FILES = {
+    "SimSun": ["SimSun.ttc"],
+    "SimKai": ["SIMKAI.TTF"],
+    "SimHei": ["simhei.ttf"],
+}
+
+# 以上都找不到时使用的通用中文字体（Linux 服务器常见）
+CJK_FALLBACK_FAMILIES = ["WenQuanYi Zen Hei", "WenQuanYi Micro Hei", "Noto Sans CJK SC",
+                         "Noto Serif CJK SC", "Source Han Sans SC", "Droid Sans Fallback",
+                         "AR PL UMing CN", "AR PL UKai CN"]
+
+# name 表中的字体族名称：1 字体族，16 排版字体族
+_FAMILY_NAME_IDS = (1, 16)
+
+
+def font_directories() -> List[Path]:
+    """当前系统的字体目录（系统目录和用户目录）"""
+    home = Path.home()
+    if sys.platform == 'win32':
+        windir = os.environ.get('WINDIR', r'C:\Windows')
+        dirs = [Path(windir) / 'Fonts']
+        local_appdata = os.environ.get('LOCALAPPDATA')
+        if local_appdata:
+            dirs.append(Path(local_appdata) / 'Microsoft' / 'Windows' / 'Fonts')
+    elif sys.platform == 'darwin':
+        dirs = [Path('/System/Library/Fonts'), Path('/Library/Fonts'), home / 'Library' / 'Fonts']
+    else:
+        data_home = Path(os.environ.get('XDG_DATA_HOME', home / '.local' / 'share'))
+        dirs = [Path('/usr/share/fonts'), Path('/usr/local/share/fonts'),
+                data_home / 'fonts', home / '.fonts']
+    return dirs
+
+
+def _mtime(path) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _decode_name(platform_id: int, encoding_id: int, raw: bytes) -> Optional[str]:
+    if platform_id in (0, 3):
+        return raw.decode('utf-16-be', errors='ignore')
+    if platform_id == 1 and encoding_id == 0:
+        return raw.decode('mac_roman', errors='ignore')
+    return None
+
+
+def _read_face(f, offset: int) -> Dict[str, Any]:
+    """读取一个字体（TTC中的一个子字体）的表目录和 name 表中的字体族名"""
+    f.seek(offset)
+    _, num_tables = struct.unpack('>IH', f.read(6))
+    f.seek(offset + 12)
+    tables = {}
+    for _ in range(num_tables):
+        tag, _, table_offset, length = struct.unpack('>4sIII', f.read(16))
+        tables[tag] = (table_offset, length)
+
+    families = set()
+    if b'name' in tables:
+        name_offset, _ = tables[b'name']
+        f.seek(name_offset)
+        _, count, string_offset = struct.unpack('>HHH', f.read(6))
+        records = [struct.unpack('>HHHHHH', f.read(12)) for _ in range(count)]
+        for platform_id, encoding_id, _, name_id, length, str_offset in records:
+            if name_id not in _FAMILY_NAME_IDS:
+                continue
+            f.seek(name_offset + string_offset + str_offset)
+            name = _decode_name(platform_id, encoding_id, f.read(length))
+            if name and name.strip():
+                families.add(name.strip())
+
+    # reportlab 只支持 TrueType 轮廓（glyf 表），不支持 CFF 轮廓的 OpenType 字体
+    return {'families': sorted(families), 'truetype': b'glyf' in tables}
+
+
+def read_font_faces(path) -> List[Dict[str, Any]]:
+    """
+    读取字体文件中各子字体的字体族名称（只读取文件头和 name 表）
+
+    Returns:
+        [{'subfont': 序号, 'families': [字体族名], 'truetype': 是否TrueType轮廓}]
+    """
+    with open(path, 'rb') as f:
+        tag = f.read(4)
+        if tag == b'ttcf':
+            _, num_fonts = struct.unpack('>II', f.read(8))
+            offsets = struct.unpack(f'>{num_fonts}I', f.read(4 * num_fonts))
+        elif tag in (b'\x00\x01\x00\x00', b'OTTO', b'true'):
+            offsets = (0,)
+        else:
+            return []
+        faces = []
+        for i, offset in enumerate(offsets):
+            face = _read_face(f, offset)
+            face['subfont'] = i
+            faces.append(face)
+        return faces
+
+
+class FontIndex:
+    """系统字体索引"""
+
+    def __init__(self, index_file: Optional[str] = str(DEFAULT_INDEX_FILE),
+                 directories: Optional[List[Path]] = None):
+        """
+        Args:
+            index_file: 索引缓存文件，None表示不缓存
+            directories: 扫描的字体目录，默认为 font_directories()
+        """
+        self.index_file = Path(index_file) if index_file else None
+        self.directories = [Path(d) for d in (directories or font_directories())]
+        self.dir_mtimes: Dict[str, Optional[int]] = {}
+        self.files: Dict[str, Dict[str, Any]] = {}
+        self.families: Dict[str, List[Tuple[str, int, bool]]] = {}
+
+    def load(self) -> 'FontIndex':
+        """读取缓存的索引；缓存不存在或字体目录有变化时重新扫描并保存"""
+        if self.index_file is not None and self.index_file.exists():
+            try:
+                with open(self.index_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if (data.get('version') == INDEX_VERSION
+                        and data.get('roots') == [str(d) for d in self.directories]):
+                    self.dir_mtimes = data['dir_mtimes']
+                    self.files = data['files']
+            except (OSError, ValueError, KeyError) as e:
+                logger.debug("字体索引读取失败，将重新扫描: %s", e)
+
+        if not self.dir_mtimes or self.is_stale():
+            self.rebuild()
+            self.save()
+        else:
+            self._build_family_map()
+        return self
+
+    def is_stale(self) -> bool:
+        """字体目录（含子目录）的修改时间是否与索引记录的不同"""
+        for directory, mtime in self.dir_mtimes.items():
+            if _mtime(directory) != mtime:
+                return True
+        return False
+
+    def rebuild(self):
+        """扫描字体目录，重建索引（未改变的字体文件沿用已解析的结果）"""
+        previous = self.files
+        self.dir_mtimes = {}
+        self.files = {}
+        for root in self.directories:
+            self.dir_mtimes[str(root)] = _mtime(root)
+            if not root.is_dir():
+                continue
+            for dirpath, dirnames, filenames in os.walk(root):
+                if dirpath != str(root):
+                    self.dir_mtimes[dirpath] = _mtime(dirpath)
+                for filename in filenames:
+                    if not filename.lower().endswith(FONT_EXTENSIONS):
+                        continue
+                    path = os.path.join(dirpath, filename)
+                    try:
+                        stat = os.stat(path)
+                        entry = previous.get(path)
+                        if entry is None or entry['mtime'] != stat.st_mtime_ns or entry['size'] != stat.st_size:
+                            entry = {'mtime': stat.st_mtime_ns, 'size': stat.st_size,
+                                     'faces': read_font_faces(path)}
+                        self.files[path] = entry
+                    except (OSError, struct.error) as e:
+                        logger.debug("字体文件解析失败: %s - %s", path, e)
+        self._build_family_map()
+        logger.info("字体索引已重建: %d 个字体文件，%d 个字体族", len(self.files), len(self.families))
+
+    def save(self):
+        """保存索引到缓存文件（失败时忽略）"""
+        if self.index_file is None:
+            return
+        try:
+            self.index_file.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.index_file, 'w', encoding='utf-8') as f:
+                json.dump({'version': INDEX_VERSION, 'roots': [str(d) for d in self.directories],
+                           'dir_mtimes': self.dir_mtimes, 'files': self.files}, f, ensure_ascii=False)
+        except OSError as e:
+            logger.debug("字体索引保存失败: %s", e)
+
+    def _build_family_map(self):
+        self.families = {}
+        for path in sorted(self.files):
+            for face in self.files[path]['faces']:
+                for family in face['families']:
+                    self.families.setdefault(family.lower(), []).append(
+                        (path, face['subfont'], face['truetype']))
+
+    def find(self, family: str, truetype_only: bool = False) -> Optional[Tuple[str, int]]:
+        """
+        按字体族名查找字体
+
+        Returns:
+            (字体文件路径, TTC子字体序号)，找不到时返回None
+        """
+        for path, subfont, truetype in self.families.get(family.lower(), []):
+            if truetype or not truetype_only:
+                return path, subfont
+        return None
+
+
+_index: Optional[FontIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_font_index() -> FontIndex:
+    """进程内共享的字体索引（首次调用时加载）"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = FontIndex().load()
+        return _index
+
+
+def resolve_font(font_name: str, truetype_only: bool = True) -> Optional[Tuple[str, int]]:
+    """
+    解析报告使用的字体（SimSun / SimKai / SimHei）
+
+    依次查找：系统中的同名或同类字体 -> 工作目录下随附的字体文件 -> 通用中文字体。
+
+    Args:
+        font_name: 报告使用的字体名
+        truetype_only: 只返回TrueType轮廓的字体（reportlab需要）
+
+    Returns:
+        (字体文件路径, TTC子字体序号)，找不到时返回None
+    """
+    index = get_font_index()
+    for family in FONT_FAMILIES.get(font_name, [font_name]):
+        found = index.find(family, truetype_only)
+        if found:
+            return found
+    for filename in LOCAL_FONT_FILES.get(font_name, []):
+        if os.path.isfile(filename):
+            return filename, 0
+    for family in CJK_FALLBACK_FAMILIES:
+        found = index.find(family, truetype_only)
+        if found:
+            return found
+    return None
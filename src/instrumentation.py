@@ -0,0 +1,479 @@
+"""
+心理测试反馈报告生成器 - 性能统计模块
+批量生成时按阶段记录耗时，汇总每行和整批的统计（p50/p95/最大值、每秒行数、写入字节数）；
+长批次的内存占用采样与内存分配位置统计；cProfile 性能分析
+"""
+
+import os
+import sys
+import csv
+import json
+import tracemalloc
+import numpy as np
+import psutil
+from pathlib import Path
+from time import perf_counter
+from typing import Dict, Any, List, Optional
+
+
+# 每批次执行一次的阶段
+BATCH_STAGES = ('load', 'normalize_dates', 'store', 'evaluate')
+
+# 每行执行的阶段
+ROW_STAGES = ('chart', 'png_encode', 'layout', 'build', 'write')
+
+# 支持的统计文件格式
+TIMING_FORMATS = ('json', 'csv')
+
+# 拟合内存增长至少需要的采样点数和跨越的报告份数（不足时不给出增长，避免少量采样的噪声被放大）
+MIN_GROWTH_SAMPLES = 5
+MIN_GROWTH_ROWS = 500
+
+
+class _NullSpan:
+    """未启用统计时使用的空计时区间，进入和退出都不做任何事"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    """计时区间 - 嵌套时只统计自身耗时（进入子区间时暂停父区间）"""
+
+    __slots__ = ('timer', 'stage')
+
+    def __init__(self, timer: 'StageTimer', stage: str):
+        self.timer = timer
+        self.stage = stage
+
+    def __enter__(self):
+        now = perf_counter()
+        stack = self.timer._stack
+        if stack:
+            parent = stack[-1]
+            self.timer._add(parent[0], now - parent[1])
+        stack.append([self.stage, now])
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        now = perf_counter()
+        stack = self.timer._stack
+        stage, start = stack.pop()
+        self.timer._add(stage, now - start)
+        if stack:
+            stack[-1][1] = now
+        return False
+
+
+def _percentile_summary(values: List[float]) -> Dict[str, float]:
+    """计算一组耗时的次数、总和、p50、p95和最大值"""
+    array = np.asarray(values, dtype=np.float64)
+    return {
+        "count": int(array.size),
+        "total": float(array.sum()),
+        "p50": float(np.percentile(array, 50)),
+        "p95": float(np.percentile(array, 95)),
+        "max": float(array.max()),
+    }
+
+
+class StageTimer:
+    """
+    分阶段计时器
+
+    - span(阶段) 返回上下文管理器；未启用时返回共享的空区间，几乎没有开销
+    - begin_row()/end_row() 之间的耗时和写入字节数记入该行，其余记入批次阶段
+    - 工作进程中 end_row(keep=False) 返回行记录，由主进程 add_row() 汇总
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        """清空所有统计"""
+        self.batch_stages: Dict[str, float] = {}
+        self.rows: List[Dict[str, Any]] = []
+        self._stack: List[list] = []
+        self._row: Optional[Dict[str, Any]] = None
+        self._row_start = 0.0
+        self._batch_start: Optional[float] = None
+        self.elapsed = 0.0
+
+    def span(self, stage: str):
+        """获取阶段计时区间"""
+        return _Span(self, stage) if self.enabled else _NULL_SPAN
+
+    def _add(self, stage: str, seconds: float):
+        target = self._row if self._row is not None else self.batch_stages
+        target[stage] = target.get(stage, 0.0) + seconds
+
+    def start(self):
+        """开始整批计时"""
+        if self.enabled:
+            self._batch_start = perf_counter()
+
+    def stop(self):
+        """结束整批计时"""
+        if self.enabled and self._batch_start is not None:
+            self.elapsed = perf_counter() - self._batch_start
+            self._batch_start = None
+
+    def begin_row(self):
+        """开始记录一行"""
+        if self.enabled:
+            self._row = {}
+            self._row_start = perf_counter()
+
+    def add_bytes(self, size: int):
+        """记录当前行写入的字节数"""
+        if self._row is not None:
+            self._row["bytes"] = self._row.get("bytes", 0) + size
+
+    def end_row(self, index: int, keep: bool = True) -> Optional[Dict[str, Any]]:
+        """
+        结束记录一行
+
+        Args:
+            index: 行号
+            keep: 是否保存在本计时器中（工作进程中为False，由主进程汇总）
+
+        Returns:
+            行记录 {index, total, bytes, 各阶段耗时}；未启用时返回None
+        """
+        if self._row is None:
+            return None
+        record = {"index": index, "total": perf_counter() - self._row_start, "bytes": 0}
+        record.update(self._row)
+        self._row = None
+        self._stack.clear()
+        if keep:
+            self.rows.append(record)
+        return record
+
+    def add_row(self, record: Optional[Dict[str, Any]]):
+        """汇总工作进程返回的行记录"""
+        if self.enabled and record is not None:
+            self.rows.append(record)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        汇总统计
+
+        Returns:
+            {elapsed, rows, rows_per_second, bytes_written, batch_stages, stages, per_row}
+            stages 中每个行阶段（以及 total）包含 count/total/p50/p95/max
+        """
+        rows = sorted(self.rows, key=lambda record: record["index"])
+        stages = {}
+        for stage in ROW_STAGES + ("total",):
+            values = [record[stage] for record in rows if stage in record]
+            if values:
+                stages[stage] = _percentile_summary(values)
+        elapsed = self.elapsed
+        return {
+            "elapsed": elapsed,
+            "rows": len(rows),
+            "rows_per_second": len(rows) / elapsed if elapsed > 0 else 0.0,
+            "bytes_written": int(sum(record.get("bytes", 0) for record in rows)),
+            "batch_stages": dict(self.batch_stages),
+            "stages": stages,
+            "per_row": rows,
+        }
+
+
+def write_timings(summary: Dict[str, Any], output_dir, file_format: str = "json") -> str:
+    """
+    将统计结果写入输出目录
+
+    Args:
+        summary: StageTimer.summary() 的结果
+        output_dir: 输出目录
+        file_format: "json"（完整统计）或 "csv"（每行一条记录）
+
+    Returns:
+        统计文件路径
+    """
+    if file_format not in TIMING_FORMATS:
+        raise ValueError(f"不支持的统计文件格式：{file_format}。支持的格式：{', '.join(TIMING_FORMATS)}")
+
+    output_file = Path(output_dir) / f"timings.{file_format}"
+    if file_format == "json":
+        with open(output_file, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    else:
+        fields = ["index", "total", "bytes"] + list(ROW_STAGES)
+        with open(output_file, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            for record in summary["per_row"]:
+                writer.writerow(record)
+    return str(output_file)
+
+
+class MemoryTracker:
+    """
+    内存占用跟踪
+
+    - 每生成 sample_every 份报告采样一次RSS（多进程渲染时包含所有工作进程）
+    - trace_allocations 为True时用 tracemalloc 在每次采样时拍摄快照，
+      汇总时与开始时的快照对比，列出增长最多的分配位置（只跟踪当前进程）
+    - 汇总时按采样点线性拟合，给出每1000份报告的内存增长
+      （不含开始前的基准采样和第一个采样区间，避免把首次导入、字体缓存等预热开销算作增长；
+      采样点少于 MIN_GROWTH_SAMPLES 个或跨越不足 MIN_GROWTH_ROWS 份报告时不拟合）
+    """
+
+    def __init__(self, sample_every: int = 100, trace_allocations: bool = False, top: int = 10):
+        self.sample_every = max(1, sample_every)
+        self.trace_allocations = trace_allocations
+        self.top = top
+        self.samples: List[Dict[str, Any]] = []
+        self.rows = 0
+        self._pids = None
+        self._baseline_snapshot = None
+        self._last_snapshot = None
+        self._started_tracemalloc = False
+
+    def start(self, pids=None):
+        """
+        开始跟踪
+
+        Args:
+            pids: 返回需要一并统计的进程ID列表的函数（如渲染进程），可选
+        """
+        self._pids = pids
+        self.samples = []
+        self.rows = 0
+        if self.trace_allocations:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            self._baseline_snapshot = tracemalloc.take_snapshot()
+        self._sample()
+
+    def _rss(self) -> int:
+        """当前进程及附加进程的RSS合计（字节）"""
+        total = psutil.Process().memory_info().rss
+        for pid in (self._pids() if self._pids else ()):
+            try:
+                total += psutil.Process(pid).memory_info().rss
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+        return total
+
+    def _sample(self):
+        self.samples.append({"rows": self.rows, "rss": self._rss()})
+        if self.trace_allocations:
+            self._last_snapshot = tracemalloc.take_snapshot()
+
+    def on_row(self):
+        """每完成一份报告调用一次"""
+        self.rows += 1
+        if self.rows % self.sample_every == 0:
+            self._sample()
+
+    def stop(self):
+        """结束跟踪（补充最后一次采样）"""
+        if not self.samples or self.samples[-1]["rows"] != self.rows:
+            self._sample()
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+    def top_allocations(self) -> List[Dict[str, Any]]:
+        """与开始时相比内存增长最多的分配位置"""
+        if self._baseline_snapshot is None or self._last_snapshot is None:
+            return []
+        differences = self._last_snapshot.compare_to(self._baseline_snapshot, 'lineno')
+        return [
+            {"location": str(diff.traceback[0]), "size_diff": diff.size_diff, "count_diff": diff.count_diff}
+            for diff in differences[:self.top]
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        汇总内存统计
+
+        Returns:
+            {samples, start_rss, end_rss, peak_rss, growth_per_1000, top_allocations}
+            growth_per_1000 为按采样点线性拟合得到的每1000份报告RSS增长（字节），
+            采样不足以拟合时为None
+        """
+        rss = [sample["rss"] for sample in self.samples]
+        # 跳过基准采样和第一个采样区间（预热）
+        fitted = self.samples[2:]
+        growth = None
+        if (len(fitted) >= MIN_GROWTH_SAMPLES
+                and fitted[-1]["rows"] - fitted[0]["rows"] >= MIN_GROWTH_ROWS):
+            rows = np.array([sample["rows"] for sample in fitted], dtype=np.float64)
+            slope = np.polyfit(rows, np.array([sample["rss"] for sample in fitted], dtype=np.float64), 1)[0]
+            growth = float(slope * 1000)
+        return {
+            "samples": self.samples,
+            "start_rss": rss[0] if rss else 0,
+            "end_rss": rss[-1] if rss else 0,
+            "peak_rss": max(rss) if rss else 0,
+            "growth_per_1000": growth,
+            "top_allocations": self.top_allocations(),
+        }
+
+
+def process_peak_rss(pid: Optional[int] = None) -> int:
+    """
+    进程从启动到现在的峰值RSS（字节），默认为当前进程
+
+    Windows 读取峰值工作集，Linux 读取 /proc 中的 VmHWM；无法获取峰值时返回当前RSS，进程已退出时返回0
+    """
+    pid = pid or os.getpid()
+    try:
+        if sys.platform == 'win32':
+            return psutil.Process(pid).memory_info().peak_wset
+        if sys.platform.startswith('linux'):
+            with open(f"/proc/{pid}/status", encoding="ascii") as f:
+                for line in f:
+                    if line.startswith("VmHWM:"):
+                        return int(line.split()[1]) * 1024
+        return psutil.Process(pid).memory_info().rss
+    except (OSError, psutil.NoSuchProcess, psutil.AccessDenied):
+        return 0
+
+
+def reset_peak_rss():
+    """
+    将当前进程的峰值RSS重置为当前值（Linux），使 process_peak_rss 只反映之后的峰值
+
+    其他系统无法重置，峰值从进程启动时算起。
+    """
+    if not sys.platform.startswith('linux'):
+        return
+    try:
+        with open(f"/proc/{os.getpid()}/clear_refs", "w", encoding="ascii") as f:
+            f.write("5")
+    except OSError:
+        pass
+
+
+def write_memory_report(summary: Dict[str, Any], output_dir) -> str:
+    """将内存统计写入输出目录的 memory.json，返回文件路径"""
+    output_file = Path(output_dir) / "memory.json"
+    with open(output_file, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return str(output_file)
+
+
+# 性能分析结果按代码来源分组（按文件路径中的包名识别）
+PROFILE_GROUPS = ('matplotlib', 'reportlab', 'pandas')
+
+# 安装了 pyinstrument 时按该间隔（秒）采样调用栈，否则使用 cProfile
+PROFILE_SAMPLE_INTERVAL = 0.001
+
+# 本项目源代码目录
+_PROJECT_DIR = str(Path(__file__).resolve().parent)
+
+
+def _classify_source(filename: str) -> str:
+    """根据函数所在文件判断代码来源：matplotlib / reportlab / pandas / 项目代码 / 其他"""
+    normalized = filename.replace('\\', '/')
+    for group in PROFILE_GROUPS:
+        if f"/{group}/" in normalized:
+            return group
+    if filename.startswith(_PROJECT_DIR):
+        return "项目代码"
+    return "其他"
+
+
+def profile_call(func, *args, **kwargs):
+    """
+    在性能分析器下调用函数
+
+    安装了 pyinstrument 时使用采样分析（开销固定，不会像 cProfile 那样放大大量短小函数调用的耗时），
+    否则使用 cProfile
+
+    Returns:
+        (函数返回值, pyinstrument.Profiler 或 cProfile.Profile)
+    """
+    try:
+        from pyinstrument import Profiler
+    except ImportError:
+        import cProfile
+        profiler = cProfile.Profile()
+        return profiler.runcall(func, *args, **kwargs), profiler
+
+    profiler = Profiler(interval=PROFILE_SAMPLE_INTERVAL)
+    profiler.start()
+    try:
+        result = func(*args, **kwargs)
+    finally:
+        profiler.stop()
+    return result, profiler
+
+
+def summarize_profile(stats, top: int = 10) -> str:
+    """
+    生成性能分析文本摘要：各代码来源的自身耗时合计及耗时最多的函数
+
+    Args:
+        stats: pstats.Stats
+        top: 每组列出的函数数量
+    """
+    groups: Dict[str, list] = {}
+    for (filename, line, function), (_, calls, self_time, cumulative, _) in stats.stats.items():
+        groups.setdefault(_classify_source(filename), []).append(
+            (self_time, cumulative, calls, f"{Path(filename).name}:{line}({function})"))
+
+    total = sum(entry[0] for entries in groups.values() for entry in entries) or 1.0
+    lines = [f"总耗时（自身时间合计）: {total:.3f} 秒", ""]
+    order = list(PROFILE_GROUPS) + ["项目代码", "其他"]
+    for group in order:
+        entries = groups.get(group)
+        if not entries:
+            continue
+        group_time = sum(entry[0] for entry in entries)
+        lines.append(f"== {group}: {group_time:.3f} 秒 ({group_time / total:.1%}) ==")
+        lines.append(f"{'自身耗时':>10} {'累计耗时':>10} {'调用次数':>10}  函数")
+        for self_time, cumulative, calls, name in sorted(entries, reverse=True)[:top]:
+            # 采样分析不统计调用次数（记为-1）
+            calls = f"{calls:10d}" if calls >= 0 else f"{'-':>10}"
+            lines.append(f"{self_time:10.3f} {cumulative:10.3f} {calls}  {name}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def write_profile(profiler, output_dir, top: int = 10) -> Dict[str, str]:
+    """
+    将性能分析结果写入输出目录（profile.pstats + profile_summary.txt）
+
+    Args:
+        profiler: profile_call 返回的分析器（采样分析的结果同样转换为 .pstats 格式）
+
+    Returns:
+        {"profile_file": .pstats路径, "profile_summary_file": 摘要路径}
+    """
+    import pstats
+    output_path = Path(output_dir)
+    output_path.mkdir(parents=True, exist_ok=True)
+    profile_file = output_path / "profile.pstats"
+    summary_file = output_path / "profile_summary.txt"
+
+    if hasattr(profiler, "dump_stats"):
+        profiler.dump_stats(str(profile_file))
+        method = "cProfile"
+    else:
+        from pyinstrument.renderers import PstatsRenderer
+        # 渲染结果是以 surrogateescape 解码的 marshal 数据
+        data = profiler.output(PstatsRenderer())
+        profile_file.write_bytes(data.encode("utf-8", errors="surrogateescape"))
+        method = f"pyinstrument（每 {PROFILE_SAMPLE_INTERVAL * 1000:g} 毫秒采样）"
+    stats = pstats.Stats(str(profile_file))
+    with open(summary_file, "w", encoding="utf-8") as f:
+        f.write(f"分析方式: {method}\n")
+        f.write(summarize_profile(stats, top))
+    return {"profile_file": str(profile_file), "profile_summary_file": str(summary_file)}
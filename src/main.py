@@ -3,14 +3,21 @@
 提供友好的图形界面用于批量生成心理测试反馈报告
 """
 
+import time
+
+# 启动计时起点（窗口显示和后台预热的耗时都从这里算起）
+_STARTUP_BEGIN = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, scrolledtext
 import threading
+import multiprocessing
 import os
 import sys
 from pathlib import Path
 import logging
 from datetime import datetime
+from dataclasses import replace
 
 # 添加src目录到Python路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
@@ -27,12 +34,13 @@ sys.path.insert(0, current_dir)
 try:
     from config import app_config
     from utils import (
-        setup_logging, validate_excel_file, validate_image_directory, 
-        validate_output_directory, center_window, show_error, show_info,
-        ask_yes_no, ProgressCallback
+        setup_logging, validate_image_directory, 
+        validate_output_directory, center_window, show_error, show_info, show_warning,
+        ask_yes_no, ProgressCallback, BufferedTextHandler, get_log_file,
+        read_excel_file, file_signature
     )
-    from report_generator import ReportGenerator
-    from config_manager import ConfigManager, ConfigDialog
+    # report_generator、config_manager 会加载 pandas、matplotlib 和 reportlab，
+    # 改为在窗口显示后于后台线程中导入（见 ReportGeneratorGUI._warm_up）
 except ImportError as e:
     # 如果相对导入失败，尝试绝对导入
     try:
@@ -40,19 +48,18 @@ except ImportError as e:
         app_config = config.app_config
         import utils
         setup_logging = utils.setup_logging
-        validate_excel_file = utils.validate_excel_file
         validate_image_directory = utils.validate_image_directory
         validate_output_directory = utils.validate_output_directory
         center_window = utils.center_window
         show_error = utils.show_error
         show_info = utils.show_info
+        show_warning = utils.show_warning
         ask_yes_no = utils.ask_yes_no
         ProgressCallback = utils.ProgressCallback
-        import report_generator
-        ReportGenerator = report_generator.ReportGenerator
-        import config_manager
-        ConfigManager = config_manager.ConfigManager
-        ConfigDialog = config_manager.ConfigDialog
+        BufferedTextHandler = utils.BufferedTextHandler
+        get_log_file = utils.get_log_file
+        read_excel_file = utils.read_excel_file
+        file_signature = utils.file_signature
     except ImportError:
         print(f"模块导入失败: {e}")
         print(f"当前工作目录: {os.getcwd()}")
@@ -60,6 +67,10 @@ except ImportError as e:
         raise
 
 
+# 数据预检问题表（保存在输出目录）
+PREFLIGHT_FILE = "数据预检问题.csv"
+
+
 class ReportGeneratorGUI:
     """心理测试反馈报告生成器GUI主类"""
     
@@ -71,16 +82,14 @@ class ReportGeneratorGUI:
         self.setup_logging()
         self.load_last_settings()
         
-        # 初始化配置管理器
-        self.config_manager = ConfigManager()
-        
-        # 初始化报告生成器
-        self.report_generator = ReportGenerator(
-            task_config=self.config_manager.get_task_config(),
-            evaluation_dict=self.config_manager.get_evaluation_dict(),
-            report_title=self.report_title_var.get(),
-            disclaimer=self.disclaimer_var.get()
-        )
+        # 配置管理器和报告生成器在窗口显示后由后台线程创建（见 _warm_up），
+        # 完成前禁用依赖它们的按钮
+        self.config_manager = None
+        self.report_generator = None
+        # 整个会话共用的渲染进程池（预热时启动，退出时关闭），多次生成之间工作进程保持运行
+        self.render_pool = None
+        self._set_components_ready(False)
+        self.status_var.set("正在加载组件...")
         
     def setup_window(self):
         """设置主窗口"""
@@ -121,9 +130,18 @@ class ReportGeneratorGUI:
         self.filename_mode_var = tk.StringVar(value="id_only")  # "id_only" 或 "name_custom"
         self.filename_separator_var = tk.StringVar(value="")  # 自定义分隔符
         
-        # 生成状态
+        # 生成状态（生成或导出线程；点击“停止”后界面恢复，但线程可能仍在使用报告生成器）
         self.is_generating = False
         self.generation_thread = None
+        # 生成期间修改的评分配置，本次生成结束后再应用到报告生成器
+        self._pending_generator_settings = None
+        
+        # 验证状态：验证在后台线程中进行，读取的数据（文件签名, DataFrame）交给生成或导出使用
+        self.is_validating = False
+        self._validated_data = None
+        
+        # 报告预览窗口（见 open_preview）
+        self.preview_panel = None
     
     def setup_widgets(self):
         """设置界面组件"""
@@ -242,6 +260,11 @@ class ReportGeneratorGUI:
                                       command=self.validate_settings)
         self.validate_btn.pack(side=tk.LEFT, padx=5)
         
+        # 预览报告按钮
+        self.preview_btn = ttk.Button(action_frame, text="预览报告", 
+                                     command=self.open_preview)
+        self.preview_btn.pack(side=tk.LEFT, padx=5)
+        
         # 生成报告按钮
         self.generate_btn = ttk.Button(action_frame, text="生成报告", 
                                       command=self.start_generation, 
@@ -253,6 +276,11 @@ class ReportGeneratorGUI:
                                   command=self.stop_generation, state=tk.DISABLED)
         self.stop_btn.pack(side=tk.LEFT, padx=5)
         
+        # 仅导出评价结果按钮（不生成PDF）
+        self.export_btn = ttk.Button(action_frame, text="导出评价结果", 
+                                    command=self.start_export)
+        self.export_btn.pack(side=tk.LEFT, padx=5)
+        
         # 打开输出目录按钮
         self.open_output_btn = ttk.Button(action_frame, text="打开输出目录", 
                                          command=self.open_output_directory)
@@ -277,6 +305,11 @@ class ReportGeneratorGUI:
         # 进度标签
         self.progress_label = ttk.Label(progress_frame, text="0%")
         self.progress_label.grid(row=0, column=1, padx=(10, 0), pady=2)
+        
+        # 进度详情：已完成数量、成功/失败、速度和预计剩余时间
+        self.progress_detail_var = tk.StringVar()
+        self.progress_detail_label = ttk.Label(progress_frame, textvariable=self.progress_detail_var)
+        self.progress_detail_label.grid(row=1, column=0, columnspan=2, sticky=tk.W, pady=(2, 0))
     
     def create_log_area(self, parent):
         """创建日志显示区域"""
@@ -291,6 +324,11 @@ class ReportGeneratorGUI:
         # 日志文本框
         self.log_text = scrolledtext.ScrolledText(log_frame, height=15, width=80)
         self.log_text.grid(row=0, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        
+        # 完整日志链接（日志框只保留最近的若干行）
+        self.full_log_label = ttk.Label(log_frame, text="查看完整日志", foreground="blue", cursor="hand2")
+        self.full_log_label.grid(row=1, column=0, sticky=tk.E, pady=(5, 0))
+        self.full_log_label.bind("<Button-1>", lambda event: self.open_full_log())
     
     def create_status_bar(self, parent):
         """创建状态栏"""
@@ -308,25 +346,23 @@ class ReportGeneratorGUI:
     
     def setup_logging(self):
         """设置日志系统"""
-        self.logger = setup_logging()
+        level = getattr(logging, str(app_config.get("logging.level", "INFO")).upper(), logging.INFO)
+        self.logger = setup_logging(
+            level=level,
+            max_bytes=int(app_config.get("logging.max_file_mb", 10)) * 1024 * 1024,
+            backup_count=int(app_config.get("logging.backup_count", 5))
+        )
         
-        # 创建GUI日志处理器
-        class GUILogHandler(logging.Handler):
-            def __init__(self, text_widget):
-                super().__init__()
-                self.text_widget = text_widget
-                
-            def emit(self, record):
-                msg = self.format(record)
-                def append():
-                    self.text_widget.insert(tk.END, msg + '\n')
-                    self.text_widget.see(tk.END)
-                self.text_widget.after(0, append)
-        
-        # 添加GUI处理器
-        gui_handler = GUILogHandler(self.log_text)
-        gui_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
-        self.logger.addHandler(gui_handler)
+        # 添加GUI处理器：定时批量刷新，日志框只保留最近的若干行
+        self.gui_log_handler = BufferedTextHandler(
+            self.log_text,
+            max_lines=int(app_config.get("logging.gui_max_lines", 1000)),
+            flush_interval=int(app_config.get("logging.gui_flush_ms", 200))
+        )
+        self.gui_log_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+        self.gui_log_handler.on_trim = self._on_log_trimmed
+        self.gui_log_handler.start()
+        self.logger.addHandler(self.gui_log_handler)
         
         # 记录启动信息
         self.logger.info("心理测试反馈报告生成器启动")
@@ -338,6 +374,17 @@ class ReportGeneratorGUI:
         self.image_dir_var.set("")
         self.output_dir_var.set("")
     
+    def load_last_config(self):
+        """加载上次使用的评分配置文件"""
+        last_config = app_config.get("paths.last_config_file", "")
+        if not last_config or not Path(last_config).exists():
+            return
+        try:
+            self.config_manager.load_config_from_excel(last_config)
+            self.logger.info(f"已加载上次的评分配置: {last_config}")
+        except Exception as e:
+            self.logger.warning(f"上次的评分配置加载失败: {last_config} - {e}")
+    
     def save_settings(self):
         """保存当前设置"""
         app_config.update_last_paths(
@@ -370,110 +417,284 @@ class ReportGeneratorGUI:
             self.output_dir_var.set(dirname)
             self.logger.info(f"选择输出目录: {dirname}")
     
-    def validate_settings(self):
-        """验证设置"""
-        self.logger.info("开始验证设置...")
+    def validate_settings(self, on_success=None, data_only: bool = False):
+        """
+        在后台线程中验证设置，界面显示验证进度
+        
+        Args:
+            on_success: 验证通过后在界面线程中调用，参数为 (读取的数据, 数据预检问题摘要或None)；
+                None表示提示验证结果
+            data_only: 只验证数据文件（导出评价结果、预览报告时使用）
+        """
+        if self.is_validating or self.is_generating:
+            return
         
-        # 验证Excel文件
-        is_valid, message = validate_excel_file(self.data_file_var.get())
-        if not is_valid:
-            show_error("Excel文件验证失败", message)
-            self.logger.error(f"Excel文件验证失败: {message}")
-            return False
-        self.logger.info(f"Excel文件验证通过: {message}")
-        
-        # 验证图片目录（可选）
-        image_dir = self.image_dir_var.get()
-        if image_dir:  # 只有当用户提供了图片目录时才验证
-            is_valid, message = validate_image_directory(image_dir)
-            if not is_valid:
-                show_error("图片目录验证失败", message)
-                self.logger.error(f"图片目录验证失败: {message}")
-                return False
-            self.logger.info(f"图片目录验证通过: {message}")
-        else:
-            self.logger.info("未指定图片目录，将自动生成雷达图")
+        self.is_validating = True
+        self.validate_btn.config(state=tk.DISABLED)
+        self.generate_btn.config(state=tk.DISABLED)
+        self.export_btn.config(state=tk.DISABLED)
+        self.preview_btn.config(state=tk.DISABLED)
+        self.status_var.set("正在验证设置...")
+        self.progress_detail_var.set("")
+        self.progress_bar.config(mode="indeterminate")
+        self.progress_bar.start(15)
+        
+        threading.Thread(
+            target=self._validate_settings_thread,
+            args=(self.data_file_var.get(), self.image_dir_var.get(), self.output_dir_var.get(),
+                  self.filename_mode_var.get(), on_success, data_only),
+            daemon=True
+        ).start()
+    
+    def _validate_settings_thread(self, data_file, image_dir, output_dir, filename_mode, on_success, data_only):
+        """验证设置的线程函数"""
+        def step(message):
+            self.root.after(0, lambda: self.progress_detail_var.set(message))
         
-        # 验证输出目录
-        is_valid, message = validate_output_directory(self.output_dir_var.get())
-        if not is_valid:
-            show_error("输出目录验证失败", message)
-            self.logger.error(f"输出目录验证失败: {message}")
-            return False
-        self.logger.info(f"输出目录验证通过: {message}")
+        def fail(title, message):
+            self.logger.error(f"{title}: {message}")
+            self.root.after(0, lambda: self._on_validation_done(False, None, on_success, (title, message)))
         
-        show_info("验证成功", "所有设置验证通过，可以开始生成报告！")
-        self.logger.info("所有设置验证通过")
-        return True
+        self.logger.info("开始验证设置...")
+        try:
+            # 验证Excel文件（文件未改变时直接使用上次验证读取的数据）
+            step("正在读取Excel文件...")
+            signature = file_signature(data_file) if data_file else None
+            if signature is not None and self._validated_data and self._validated_data[0] == signature:
+                data = self._validated_data[1]
+                self.logger.info("Excel文件验证通过: 文件未改变，使用已读取的数据")
+            else:
+                self._validated_data = None
+                is_valid, message, data = read_excel_file(data_file)
+                if not is_valid:
+                    fail("Excel文件验证失败", message)
+                    return
+                self._validated_data = (signature, data)
+                self.logger.info(f"Excel文件验证通过: {message}（{len(data)} 行）")
+        
+            if not data_only:
+                # 验证图片目录（可选）
+                if image_dir:  # 只有当用户提供了图片目录时才验证
+                    step("正在检查图片目录...")
+                    is_valid, message = validate_image_directory(image_dir)
+                    if not is_valid:
+                        fail("图片目录验证失败", message)
+                        return
+                    self.logger.info(f"图片目录验证通过: {message}")
+                else:
+                    self.logger.info("未指定图片目录，将自动生成雷达图")
+        
+                # 验证输出目录
+                step("正在检查输出目录...")
+                is_valid, message = validate_output_directory(output_dir)
+                if not is_valid:
+                    fail("输出目录验证失败", message)
+                    return
+                self.logger.info(f"输出目录验证通过: {message}")
+                
+                # 按整列预检全部数据，问题表保存到输出目录
+                step("正在预检数据...")
+                notice = self._preflight(data, filename_mode, output_dir)
+            else:
+                notice = None
+            
+            self.logger.info("所有设置验证通过")
+            self.root.after(0, lambda: self._on_validation_done(True, data, on_success, notice=notice))
+        except Exception as e:
+            fail("验证错误", f"验证过程中出现错误：{str(e)}")
+    
+    def _preflight(self, data, filename_mode: str, output_dir: str):
+        """预检数据，返回问题摘要（没有问题时返回None）"""
+        from preflight import preflight_check, format_issues, write_issues
+        
+        issues = preflight_check(data, filename_mode)
+        if issues.empty:
+            self.logger.info("数据预检通过")
+            return None
+        notice = format_issues(issues)
+        self.logger.warning(notice)
+        try:
+            issues_file = write_issues(issues, str(Path(output_dir) / PREFLIGHT_FILE))
+            notice += f"\n\n完整问题表：{issues_file}"
+        except Exception as e:
+            self.logger.warning(f"数据预检问题表保存失败: {e}")
+        return notice
+    
+    def _on_validation_done(self, success: bool, data, on_success, error=None, notice=None):
+        """验证结束：恢复界面状态，提示结果或继续后续操作"""
+        self.is_validating = False
+        self.progress_bar.stop()
+        self.progress_bar.config(mode="determinate")
+        self.progress_var.set(0)
+        self.progress_detail_var.set("")
+        self.status_var.set("就绪")
+        self.validate_btn.config(state=tk.NORMAL)
+        self._set_components_ready(self.report_generator is not None)
+        
+        if not success:
+            show_error(*error)
+        elif on_success is not None:
+            on_success(data, notice)
+        elif notice:
+            show_warning("验证完成", f"设置验证通过，但数据存在问题：\n\n{notice}")
+        else:
+            show_info("验证成功", "所有设置验证通过，可以开始生成报告！")
+    
+    def _generator_in_use(self) -> bool:
+        """生成或导出线程是否仍在运行"""
+        return self.generation_thread is not None and self.generation_thread.is_alive()
     
     def start_generation(self):
-        """开始生成报告"""
+        """开始生成报告（先在后台验证设置）"""
         if self.is_generating:
             return
-        
-        # 验证设置
-        if not self.validate_settings():
+        if self._generator_in_use():
+            show_warning("请稍候", "上一次生成仍在进行，请等待完成后再开始。")
             return
-        
-        # 确认生成
-        if not ask_yes_no("确认生成", "确定要开始生成报告吗？"):
+        self.validate_settings(on_success=self._confirm_generation)
+    
+    def _confirm_generation(self, data, notice=None):
+        """验证通过后确认并开始生成"""
+        # 确认生成（数据预检发现问题时一并提示）
+        question = f"{notice}\n\n仍要开始生成报告吗？" if notice else "确定要开始生成报告吗？"
+        if not ask_yes_no("确认生成", question):
             return
         
         # 保存设置
         self.save_settings()
         
+        # 验证时读取的数据交给本次生成，不再保留（生成时会原地规范化日期列）
+        self._validated_data = None
+        
         # 更新界面状态
         self.is_generating = True
         self.generate_btn.config(state=tk.DISABLED)
+        self.config_btn.config(state=tk.DISABLED)
         self.stop_btn.config(state=tk.NORMAL)
         self.status_var.set("正在生成报告...")
         
         # 重置进度
         self.progress_var.set(0)
         self.progress_label.config(text="0%")
+        self.progress_detail_var.set("")
         
         # 启动生成线程
-        self.generation_thread = threading.Thread(target=self._generate_reports_thread)
+        self.generation_thread = threading.Thread(target=self._generate_reports_thread, args=(data,))
         self.generation_thread.daemon = True
         self.generation_thread.start()
     
-    def _generate_reports_thread(self):
+    def _generate_reports_thread(self, data=None):
         """生成报告的线程函数"""
         try:
             # 更新报告生成器的设置
             self.report_generator.report_title = self.report_title_var.get()
             self.report_generator.disclaimer = self.disclaimer_var.get()
             
-            # 创建进度回调
+            # 创建进度回调（生成器已按时间节流，每秒最多约10次）
             def progress_callback(progress, message):
                 self.root.after(0, lambda: self._update_progress(progress, message))
             
             # 生成报告
             image_dir = self.image_dir_var.get() if self.image_dir_var.get() else None
+            options = replace(self._batch_options(),
+                              timing_format=app_config.get("performance.timing_format", "") or None,
+                              pool=self.render_pool)
             results = self.report_generator.generate_batch_reports(
                 data_file=self.data_file_var.get(),
                 image_dir=image_dir,
                 output_dir=self.output_dir_var.get(),
                 progress_callback=progress_callback,
                 filename_mode=self.filename_mode_var.get(),
-                filename_separator=self.filename_separator_var.get()
+                filename_separator=self.filename_separator_var.get(),
+                data=data,
+                options=options
             )
             
             # 显示结果
             self.root.after(0, lambda: self._show_generation_results(results))
             
         except Exception as e:
-            self.logger.error(f"生成过程中出现错误: {str(e)}")
-            self.root.after(0, lambda: show_error("生成错误", f"生成过程中出现错误：{str(e)}"))
+            error = str(e)
+            self.logger.error(f"生成过程中出现错误: {error}")
+            self.root.after(0, lambda error=error: show_error("生成错误", f"生成过程中出现错误：{error}"))
         finally:
-            # 恢复界面状态
-            self.root.after(0, self._reset_generation_state)
+            # 应用生成期间修改的评分配置并恢复界面状态
+            self.root.after(0, self._on_generation_thread_done)
+    
+    def open_preview(self):
+        """打开报告预览窗口（先在后台读取数据文件，文件未改变时直接使用已读取的数据）"""
+        self.validate_settings(on_success=self._show_preview, data_only=True)
+    
+    def _show_preview(self, data, notice=None):
+        """验证通过后显示预览窗口"""
+        from preview import PreviewPanel
+        from participant_store import normalize_date_columns
+        
+        if self.preview_panel is None or self.preview_panel.closed:
+            self.preview_panel = PreviewPanel(
+                self.root,
+                get_generator=lambda: self.report_generator,
+                title_var=self.report_title_var,
+                disclaimer_var=self.disclaimer_var,
+                is_busy=lambda: self.is_generating,
+                dpi=app_config.get("preview.dpi", 96)
+            )
+        else:
+            self.preview_panel.lift()
+        # 验证时读取的数据可能交给后续的生成使用（生成时原地规范化日期列），预览使用副本
+        self.preview_panel.set_data(normalize_date_columns(data.copy()))
+    
+    def start_export(self):
+        """仅导出评价结果（成绩、等级、等级说明），不生成PDF（先在后台验证数据文件）"""
+        if self.is_generating:
+            return
+        if self._generator_in_use():
+            show_warning("请稍候", "上一次生成仍在进行，请等待完成后再开始。")
+            return
+        self.validate_settings(on_success=self._choose_export_file, data_only=True)
+    
+    def _choose_export_file(self, data, notice=None):
+        """数据文件验证通过后选择导出文件并开始导出"""
+        output_file = filedialog.asksaveasfilename(
+            title="导出评价结果",
+            defaultextension=".xlsx",
+            filetypes=[("Excel文件", "*.xlsx"), ("CSV文件", "*.csv"), ("Parquet文件", "*.parquet")]
+        )
+        if not output_file:
+            return
+        
+        self.is_generating = True
+        self.generate_btn.config(state=tk.DISABLED)
+        self.export_btn.config(state=tk.DISABLED)
+        self.config_btn.config(state=tk.DISABLED)
+        self.status_var.set("正在导出评价结果...")
+        
+        # 验证时读取的数据交给本次导出，不再保留
+        self._validated_data = None
+        data_file = self.data_file_var.get()
+        
+        def export_thread():
+            try:
+                results = self.report_generator.export_evaluations(data_file, output_file, data=data)
+                message = (f"导出完成！\n\n受试者: {results['total']} 名\n"
+                           f"测评项目: {results['measures']} 个\n文件: {results['output_file']}")
+                self.logger.info(f"评价结果已导出: {results['output_file']}")
+                self.root.after(0, lambda: show_info("导出成功", message))
+            except Exception as e:
+                error = str(e)
+                self.logger.error(f"导出评价结果失败: {error}")
+                self.root.after(0, lambda error=error: show_error("导出错误", f"导出评价结果失败：{error}"))
+            finally:
+                self.root.after(0, self._on_generation_thread_done)
+        
+        self.generation_thread = threading.Thread(target=export_thread, daemon=True)
+        self.generation_thread.start()
     
     def _update_progress(self, progress, message):
         """更新进度显示"""
         self.progress_var.set(progress)
         self.progress_label.config(text=f"{progress:.1f}%")
-        self.status_var.set(message)
+        self.progress_detail_var.set(message)
     
     def _show_generation_results(self, results):
         """显示生成结果"""
@@ -486,6 +707,13 @@ class ReportGeneratorGUI:
         message += f"成功: {success} 个\n"
         message += f"失败: {failed} 个\n"
         
+        # 超时或导致渲染进程崩溃的行已隔离，列出Excel行号便于检查数据
+        quarantined = results.get("quarantined", [])
+        if quarantined:
+            message += f"\n已隔离 {len(quarantined)} 行（渲染超时或崩溃）: "
+            message += "、".join(f"第{item['excel_row']}行 {item['name']}" for item in quarantined[:5])
+            message += "\n"
+        
         if results["errors"]:
             message += f"\n错误详情:\n"
             for error in results["errors"][:5]:  # 只显示前5个错误
@@ -504,9 +732,19 @@ class ReportGeneratorGUI:
         """重置生成状态"""
         self.is_generating = False
         self.generate_btn.config(state=tk.NORMAL)
+        self.export_btn.config(state=tk.NORMAL)
+        self.config_btn.config(state=tk.NORMAL)
         self.stop_btn.config(state=tk.DISABLED)
         self.status_var.set("就绪")
     
+    def _on_generation_thread_done(self):
+        """生成或导出线程结束：应用期间修改的评分配置，并恢复界面状态"""
+        if self._pending_generator_settings is not None:
+            self.report_generator.apply_settings(self._pending_generator_settings)
+            self._pending_generator_settings = None
+            self.logger.info("评分配置已更新")
+        self._reset_generation_state()
+    
     def stop_generation(self):
         """停止生成（注意：这只是界面状态，实际生成可能仍在继续）"""
         if ask_yes_no("确认停止", "确定要停止生成吗？\n注意：已开始的报告生成可能仍会继续。"):
@@ -521,24 +759,128 @@ class ReportGeneratorGUI:
         else:
             show_error("错误", "输出目录不存在或未设置")
     
+    def _set_components_ready(self, ready: bool):
+        """启用或禁用依赖报告生成组件的按钮"""
+        state = tk.NORMAL if ready else tk.DISABLED
+        for button in (self.config_btn, self.generate_btn, self.export_btn, self.preview_btn):
+            button.config(state=state)
+    
+    def _on_window_shown(self):
+        """窗口显示后记录启动耗时，并开始后台预热"""
+        self.logger.info(f"窗口已显示，启动耗时 {time.perf_counter() - _STARTUP_BEGIN:.2f} 秒")
+        threading.Thread(
+            target=self._warm_up,
+            args=(self.report_title_var.get(), self.disclaimer_var.get()),
+            daemon=True
+        ).start()
+    
+    def _batch_options(self):
+        """按应用配置的 performance 设置创建批量生成的执行选项"""
+        from batch_engine import BatchOptions
+        
+        return BatchOptions(
+            workers=app_config.get("performance.workers", 0),
+            row_timeout=app_config.get("performance.row_timeout", 0) or None,
+            row_retries=app_config.get("performance.row_retries", 1),
+            memory_limit_mb=app_config.get("performance.memory_limit_mb", 0),
+            max_rows_in_flight=app_config.get("performance.max_rows_in_flight", 0)
+        )
+    
+    def _create_render_pool(self, report_generator):
+        """
+        启动整个会话共用的渲染进程池（工作进程在后台完成导入、字体注册等初始化）
+        
+        performance.keep_workers_warm 为 false 或只使用一个进程且不限制单行时间时返回None，每次生成时按需创建
+        """
+        if not app_config.get("performance.keep_workers_warm", True):
+            return None
+        from batch_engine import create_persistent_pool
+        
+        return create_persistent_pool(self._batch_options(), report_generator.get_generator_settings())
+    
+    def _warm_up(self, report_title: str, disclaimer: str):
+        """后台线程：导入 pandas、matplotlib、reportlab，加载上次的评分配置，注册字体，创建报告生成器并启动常驻渲染进程"""
+        start = time.perf_counter()
+        try:
+            from config_manager import ConfigManager
+            from report_generator import ReportGenerator
+            
+            # 初始化配置管理器，并加载上次使用的评分配置（文件未改变时直接读取编译缓存）
+            self.config_manager = ConfigManager()
+            self.load_last_config()
+            
+            # 初始化报告生成器
+            report_generator = ReportGenerator(
+                task_config=self.config_manager.get_task_config(),
+                evaluation_dict=self.config_manager.get_evaluation_dict(),
+                report_title=report_title,
+                disclaimer=disclaimer
+            )
+            self.render_pool = self._create_render_pool(report_generator)
+        except Exception as e:
+            error = str(e)
+            self.logger.error(f"组件加载失败: {error}")
+            self.root.after(0, lambda: self.status_var.set("组件加载失败"))
+            self.root.after(0, lambda error=error: show_error("启动错误", f"组件加载失败：{error}"))
+            return
+        
+        elapsed = time.perf_counter() - start
+        self.root.after(0, lambda: self._on_warm_up_done(report_generator, elapsed))
+    
+    def _on_warm_up_done(self, report_generator, elapsed: float):
+        """预热完成：启用生成按钮"""
+        self.report_generator = report_generator
+        if not self.is_validating:
+            self._set_components_ready(True)
+            self.status_var.set("就绪")
+        self.logger.info(f"组件加载完成，耗时 {elapsed:.2f} 秒（启动至可生成共 "
+                         f"{time.perf_counter() - _STARTUP_BEGIN:.2f} 秒）")
+    
     def open_config_dialog(self):
         """打开配置对话框"""
+        from config_manager import ConfigDialog
+        
         dialog = ConfigDialog(self.root, self.config_manager)
         result = dialog.show()
         
         if result:
-            # 配置已更新，重新初始化报告生成器
-            self.report_generator = ReportGenerator(
-                task_config=self.config_manager.get_task_config(),
-                evaluation_dict=self.config_manager.get_evaluation_dict()
-            )
+            # 记住当前配置文件，下次启动时自动加载
+            app_config.set("paths.last_config_file", self.config_manager.config_file_path or "")
+            app_config.save_config()
+            
+            # 配置已更新：就地更新报告生成器（不重新注册字体和样式），
+            # 常驻的渲染进程在下次生成时只收到改变的设置
+            settings = {
+                "task_config": self.config_manager.get_task_config(),
+                "evaluation_dict": self.config_manager.get_evaluation_dict()
+            }
+            if self._generator_in_use():
+                # 已停止但仍在进行的生成不受影响，结束后再应用
+                self._pending_generator_settings = settings
+                self.logger.info("评分配置将在本次生成结束后生效")
+                return
+            self.report_generator.apply_settings(settings)
             self.logger.info("评分配置已更新")
     
     def clear_log(self):
         """清空日志"""
         self.log_text.delete(1.0, tk.END)
+        self.gui_log_handler.reset()
+        self.full_log_label.config(text="查看完整日志")
         self.logger.info("日志已清空")
     
+    def _on_log_trimmed(self, trimmed_count: int):
+        """日志框裁剪旧行后更新完整日志链接的提示"""
+        self.full_log_label.config(text=f"仅显示最近的日志（已隐藏 {trimmed_count} 行），查看完整日志")
+    
+    def open_full_log(self):
+        """打开完整日志文件"""
+        log_file = get_log_file()
+        if log_file and log_file.exists():
+            os.startfile(str(log_file.resolve()))
+        else:
+            show_error("错误", "日志文件不存在")
+    
     def on_closing(self):
         """窗口关闭事件"""
         if self.is_generating:
@@ -548,12 +890,20 @@ class ReportGeneratorGUI:
         # 保存设置
         self.save_settings()
         
+        # 停止日志刷新定时器
+        self.gui_log_handler.stop()
+        
+        # 结束常驻的渲染进程
+        if self.render_pool is not None:
+            self.render_pool.close()
+        
         # 关闭窗口
         self.root.destroy()
     
     def run(self):
         """运行GUI"""
         try:
+            self.root.after_idle(self._on_window_shown)
             self.root.mainloop()
         except Exception as e:
             self.logger.error(f"GUI运行错误: {str(e)}")
@@ -582,4 +932,6 @@ def main():
 
 
 if __name__ == "__main__":
+    # 多进程渲染使用spawn方式启动子进程，打包为exe后需要此调用
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
@@ -0,0 +1,449 @@
+"""
+心理测试反馈报告生成器 - 受试者数据存储模块
+将读取的受试者数据转换为紧凑的列式存储，降低大批量生成时的内存占用
+"""
+
+import sys
+import pickle
+import numpy as np
+import pandas as pd
+from multiprocessing import shared_memory
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Iterator, Tuple
+
+
+# 个人信息列（不参与评价）
+INFO_COLUMNS = ['姓名', '性别', '生日', '年龄', '测试日期', 'ID', '结果说明']
+
+# 需要规范化为8位数字字符串的日期列
+DATE_COLUMNS = ['生日', '测试日期']
+
+# 测评变量从第7列开始（索引从0开始，所以第7列是索引6）
+SCORE_START_INDEX = 6
+
+# 可以逐行流式读取的Excel格式
+EXCEL_STREAM_SUFFIXES = ('.xlsx', '.xlsm')
+
+
+def normalize_date_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """将日期列转换为8位数字字符串（如 20250710）"""
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(str).str.replace(r'\D', '', regex=True).str.zfill(8)
+    return df
+
+
+def load_participant_data(data_file: str) -> pd.DataFrame:
+    """读取受试者Excel数据并规范化日期列"""
+    df = pd.read_excel(data_file)
+    return normalize_date_columns(df)
+
+
+def excel_row_count(data_file: str) -> Optional[int]:
+    """
+    不读取数据估计Excel数据行数（.xlsx 按工作表尺寸信息，不含表头）
+
+    Returns:
+        数据行数；无法估计时为None
+    """
+    if Path(data_file).suffix.lower() not in EXCEL_STREAM_SUFFIXES:
+        return None
+    from openpyxl import load_workbook
+    workbook = load_workbook(data_file, read_only=True, data_only=True)
+    try:
+        max_row = workbook.worksheets[0].max_row
+        return max(0, max_row - 1) if max_row else None
+    finally:
+        workbook.close()
+
+
+def _excel_cell(value):
+    """与 pd.read_excel 一致：整数值的浮点数转换为int，空字符串视为缺失值"""
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    if value == '':
+        return None
+    return value
+
+
+def iter_frame_chunks(df: pd.DataFrame, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """按块返回已读取的数据，每块最多 chunk_rows 行（每块为副本，调用方可以释放原数据）"""
+    chunk_rows = max(1, chunk_rows)
+    for start in range(0, len(df), chunk_rows):
+        yield df.iloc[start:start + chunk_rows].reset_index(drop=True)
+
+
+def iter_excel_chunks(data_file: str, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    按块读取受试者Excel数据，每块最多 chunk_rows 行（日期列已规范化）
+
+    .xlsx 用 openpyxl 只读模式逐行读取，内存中最多保留一块数据；
+    其他格式（.xls）整表读取后按块返回。跳过全空的行。
+    """
+    chunk_rows = max(1, chunk_rows)
+    if Path(data_file).suffix.lower() not in EXCEL_STREAM_SUFFIXES:
+        df = pd.read_excel(data_file)
+        for start in range(0, len(df), chunk_rows):
+            yield normalize_date_columns(df.iloc[start:start + chunk_rows].reset_index(drop=True))
+        return
+
+    from openpyxl import load_workbook
+    workbook = load_workbook(data_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [name if name is not None else f"Unnamed: {i}" for i, name in enumerate(header)]
+        width = len(columns)
+        buffer = []
+        for values in rows:
+            if all(value is None or value == '' for value in values):
+                continue
+            values = [_excel_cell(value) for value in values[:width]]
+            values.extend([None] * (width - len(values)))
+            buffer.append(values)
+            if len(buffer) >= chunk_rows:
+                yield normalize_date_columns(pd.DataFrame(buffer, columns=columns))
+                buffer = []
+        if buffer:
+            yield normalize_date_columns(pd.DataFrame(buffer, columns=columns))
+    finally:
+        workbook.close()
+
+
+def get_score_columns(columns: List[str]) -> List[str]:
+    """获取测评变量列 - 从第7列开始；列数不足7列时按列名排除个人信息列"""
+    columns = list(columns)
+    if len(columns) > SCORE_START_INDEX:
+        return columns[SCORE_START_INDEX:]
+    return [col for col in columns if col not in INFO_COLUMNS]
+
+
+# 共享内存中各数组的对齐字节数
+_SHM_ALIGNMENT = 64
+
+
+def _intern(value):
+    """字符串驻留，使重复文本在内存中只保留一份"""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class SharedStringTable:
+    """
+    共享内存中的字符串表 - UTF-8字节块 + 偏移数组
+
+    按需解码单个类别并缓存，不整体复制字节块。
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray):
+        self._offsets = offsets
+        self._blob = blob
+        self._decoded: Dict[int, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._offsets) - 1
+
+    def __getitem__(self, code: int) -> str:
+        code = int(code)
+        if code < 0 or code >= len(self):
+            raise IndexError(code)
+        text = self._decoded.get(code)
+        if text is None:
+            start, end = self._offsets[code], self._offsets[code + 1]
+            text = sys.intern(self._blob[start:end].tobytes().decode('utf-8'))
+            self._decoded[code] = text
+        return text
+
+    def __iter__(self):
+        for code in range(len(self)):
+            yield self[code]
+
+
+class ParticipantRecord:
+    """
+    单个受试者的轻量视图
+
+    不复制任何数据，只保存所属存储和行号；兼容报告生成中对 pd.Series 行的
+    常用访问方式（row[col]、row.get、col in row、row.index、dict(row)）。
+    """
+
+    __slots__ = ('_store', 'position')
+
+    def __init__(self, store: 'ParticipantStore', position: int):
+        self._store = store
+        self.position = position
+
+    @property
+    def index(self) -> List[str]:
+        """列名列表（对应 pd.Series.index）"""
+        return self._store.columns
+
+    def keys(self) -> List[str]:
+        return self._store.columns
+
+    def __getitem__(self, column: str):
+        return self._store.value(self.position, column)
+
+    def __contains__(self, column) -> bool:
+        return column in self._store.column_kinds
+
+    def __len__(self) -> int:
+        return len(self._store.columns)
+
+    @property
+    def level_codes(self) -> Optional[np.ndarray]:
+        """本行各测评变量的等级编号（与 score_columns 对应），未计算时为None"""
+        levels = self._store.levels
+        return levels[self.position] if levels is not None else None
+
+    def get(self, column: str, default=None):
+        if column in self._store.column_kinds:
+            return self._store.value(self.position, column)
+        return default
+
+    def to_series(self) -> pd.Series:
+        """转换为 pd.Series（仅用于需要完整 pandas 接口的场景）"""
+        return pd.Series([self[col] for col in self._store.columns],
+                         index=self._store.columns, dtype=object)
+
+    def __repr__(self) -> str:
+        return f"ParticipantRecord(position={self.position}, ID={self.get('ID')!r})"
+
+
+class ParticipantStore:
+    """
+    受试者列式存储
+
+    - 测评变量保存为连续的二维浮点矩阵（行=受试者，列=测评变量）
+    - 文本列（姓名、日期、结果说明、文本型成绩等）保存为分类编码 + 驻留字符串表
+    - 数值型个人信息列保持原始 numpy 数组
+    - 可选的等级矩阵（由 EvaluationEngine.classify 计算，与成绩矩阵同形状）
+    """
+
+    def __init__(self, columns: List[str], score_columns: List[str], scores: np.ndarray,
+                 score_kinds: Dict[str, str], numeric: Dict[str, np.ndarray],
+                 codes: Dict[str, np.ndarray], categories: Dict[str, List[Any]],
+                 levels: Optional[np.ndarray] = None):
+        self.columns = list(columns)
+        self.score_columns = list(score_columns)
+        self.scores = scores
+        self.levels = levels
+        self.score_kinds = score_kinds
+        self.numeric = numeric
+        self.codes = codes
+        self.categories = categories
+
+        # 列名 -> 存储方式，用于O(1)取值
+        self.score_index = {col: j for j, col in enumerate(self.score_columns)}
+        self.column_kinds: Dict[str, str] = {}
+        for col in self.columns:
+            if col in codes:
+                self.column_kinds[col] = 'category'
+            elif col in numeric:
+                self.column_kinds[col] = 'numeric'
+            else:
+                self.column_kinds[col] = 'score'
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame, dtype=np.float64) -> 'ParticipantStore':
+        """
+        从DataFrame构建列式存储
+
+        Args:
+            df: 受试者数据（日期列应已规范化）
+            dtype: 成绩矩阵的浮点类型，默认float64；内存紧张时可用float32
+
+        Returns:
+            ParticipantStore
+        """
+        columns = [str(col) if not isinstance(col, str) else col for col in df.columns]
+        df = df.set_axis(columns, axis=1)
+        score_columns = get_score_columns(columns)
+
+        scores = np.empty((len(df), len(score_columns)), dtype=dtype)
+        score_kinds = {}
+        numeric = {}
+        codes = {}
+        categories = {}
+
+        for j, col in enumerate(score_columns):
+            series = df[col]
+            if pd.api.types.is_bool_dtype(series) or not pd.api.types.is_numeric_dtype(series):
+                # 文本（或混合）列：矩阵中保存可解析的数值，原值保存为分类编码
+                score_kinds[col] = 'text'
+                codes[col], categories[col] = cls._encode_categories(series)
+                numeric_values = pd.to_numeric(series, errors='coerce')
+            else:
+                score_kinds[col] = 'int' if pd.api.types.is_integer_dtype(series) else 'float'
+                numeric_values = series
+            scores[:, j] = numeric_values.to_numpy(dtype=np.float64, na_value=np.nan)
+
+        for col in columns:
+            if col in score_kinds:
+                continue
+            series = df[col]
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_extension_array_dtype(series):
+                numeric[col] = series.to_numpy()
+            else:
+                codes[col], categories[col] = cls._encode_categories(series)
+
+        return cls(columns, score_columns, np.ascontiguousarray(scores), score_kinds,
+                   numeric, codes, categories)
+
+    @staticmethod
+    def _encode_categories(series: pd.Series):
+        """分类编码：返回 (int32编码数组, 驻留后的类别列表)，缺失值编码为-1"""
+        codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        return codes.astype(np.int32), [_intern(value) for value in uniques.tolist()]
+
+    def __len__(self) -> int:
+        return self.scores.shape[0]
+
+    def __iter__(self) -> Iterator[ParticipantRecord]:
+        for position in range(len(self)):
+            yield ParticipantRecord(self, position)
+
+    def record(self, position: int) -> ParticipantRecord:
+        """获取指定行的轻量记录"""
+        if not 0 <= position < len(self):
+            raise IndexError(f"行号超出范围: {position}")
+        return ParticipantRecord(self, position)
+
+    def value(self, position: int, column: str):
+        """获取单元格原始值（缺失值返回NaN）"""
+        kind = self.column_kinds[column]
+        if kind == 'category':
+            code = self.codes[column][position]
+            return self.categories[column][code] if code >= 0 else np.nan
+        if kind == 'numeric':
+            return self.numeric[column][position].item()
+        value = self.scores[position, self.score_index[column]]
+        if self.score_kinds[column] == 'int':
+            return int(value)
+        return float(value)
+
+    def column_values(self, column: str) -> np.ndarray:
+        """获取整列原始值（object数组）"""
+        kind = self.column_kinds[column]
+        if kind == 'category':
+            table = np.empty(len(self.categories[column]) + 1, dtype=object)
+            table[:-1] = list(self.categories[column])
+            table[-1] = np.nan
+            return table[self.codes[column]]
+        if kind == 'numeric':
+            return self.numeric[column].astype(object)
+        values = self.scores[:, self.score_index[column]]
+        if self.score_kinds[column] == 'int':
+            return values.astype(np.int64).astype(object)
+        return values.astype(object)
+
+    def nbytes(self) -> int:
+        """存储占用的数组字节数（不含Python对象开销）"""
+        total = self.scores.nbytes
+        if self.levels is not None:
+            total += self.levels.nbytes
+        total += sum(arr.nbytes for arr in self.numeric.values())
+        total += sum(arr.nbytes for arr in self.codes.values())
+        return total
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """还原为DataFrame（用于导出或调试）"""
+        return pd.DataFrame({col: self.column_values(col) for col in self.columns},
+                            columns=self.columns)
+
+    def to_shared_memory(self) -> Tuple[shared_memory.SharedMemory, Dict[str, Any]]:
+        """
+        将存储写入一块共享内存，供工作进程零拷贝读取
+
+        成绩矩阵、数值列、分类编码和字符串表依次排列在同一块共享内存中；
+        返回的描述信息只包含列名和各数组的偏移，体积与受试者数量无关。
+
+        Returns:
+            (共享内存对象, 描述信息)；调用方负责在批次结束后 close() 和 unlink()
+        """
+        arrays = {'scores': self.scores}
+        if self.levels is not None:
+            arrays['levels'] = self.levels
+        for col, values in self.numeric.items():
+            arrays[f'numeric:{col}'] = values
+        tables = {}
+        for col, values in self.codes.items():
+            arrays[f'codes:{col}'] = values
+            categories = self.categories[col]
+            if all(isinstance(item, str) for item in categories):
+                encoded = [item.encode('utf-8') for item in categories]
+                offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+                offsets[1:] = np.cumsum([len(item) for item in encoded])
+                arrays[f'offsets:{col}'] = offsets
+                arrays[f'blob:{col}'] = np.frombuffer(b''.join(encoded) or b'\0', dtype=np.uint8)
+                tables[col] = 'utf8'
+            else:
+                # 非字符串类别（如混合类型列）整体序列化，工作进程中解码一次
+                arrays[f'blob:{col}'] = np.frombuffer(pickle.dumps(list(categories)), dtype=np.uint8)
+                tables[col] = 'pickle'
+
+        layout = {}
+        offset = 0
+        for key, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            if array.dtype.hasobject:
+                raise TypeError(f"列 {key} 不是数值数组，无法放入共享内存")
+            arrays[key] = array
+            layout[key] = (offset, array.dtype.str, array.shape)
+            offset += -(-array.nbytes // _SHM_ALIGNMENT) * _SHM_ALIGNMENT
+
+        shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for key, array in arrays.items():
+            start, dtype, shape = layout[key]
+            target = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+            target[...] = array
+
+        descriptor = {
+            'name': shm.name,
+            'layout': layout,
+            'columns': self.columns,
+            'score_columns': self.score_columns,
+            'score_kinds': self.score_kinds,
+            'tables': tables,
+        }
+        return shm, descriptor
+
+    @classmethod
+    def attach_shared_memory(cls, descriptor: Dict[str, Any]) -> Tuple['ParticipantStore', shared_memory.SharedMemory]:
+        """
+        在工作进程中挂载共享内存中的存储（数组直接引用共享内存，不复制）
+
+        Returns:
+            (存储, 共享内存对象)；数组引用共享内存，使用完毕后先释放存储再 close()
+        """
+        if sys.version_info >= (3, 13):
+            shm = shared_memory.SharedMemory(name=descriptor['name'], track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=descriptor['name'])
+
+        def view(key):
+            start, dtype, shape = descriptor['layout'][key]
+            array = np.ndarray(shape, dtype=dtype, buffer=shm.buf, offset=start)
+            array.flags.writeable = False
+            return array
+
+        numeric = {}
+        codes = {}
+        categories = {}
+        for key in descriptor['layout']:
+            kind, _, col = key.partition(':')
+            if kind == 'numeric':
+                numeric[col] = view(key)
+            elif kind == 'codes':
+                codes[col] = view(key)
+        for col, table_kind in descriptor['tables'].items():
+            if table_kind == 'utf8':
+                categories[col] = SharedStringTable(view(f'offsets:{col}'), view(f'blob:{col}'))
+            else:
+                categories[col] = pickle.loads(view(f'blob:{col}').tobytes())
+
+        levels = view('levels') if 'levels' in descriptor['layout'] else None
+        store = cls(descriptor['columns'], descriptor['score_columns'], view('scores'),
+                    descriptor['score_kinds'], numeric, codes, categories, levels)
+        return store, shm
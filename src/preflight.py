@@ -0,0 +1,239 @@
+"""
+心理测试反馈报告生成器 - 数据预检模块
+生成报告前按整列检查全部受试者数据，一次列出所有问题行，避免批量渲染到中途才发现数据有误
+（本模块不导入matplotlib和reportlab）
+"""
+
+import logging
+import numpy as np
+import pandas as pd
+from pathlib import Path
+from typing import Dict, List
+
+from participant_store import DATE_COLUMNS, get_score_columns
+
+logger = logging.getLogger(__name__)
+
+SEVERITY_ERROR = "错误"
+SEVERITY_WARNING = "警告"
+
+# 问题类型 -> (级别, 说明)
+ISSUE_TYPES = {
+    'too_few_scores': (SEVERITY_ERROR, "有效成绩不足3个，无法生成雷达图"),
+    'duplicate_filename': (SEVERITY_ERROR, "报告文件名与其他行相同，生成时会相互覆盖"),
+    'invalid_score': (SEVERITY_WARNING, "成绩无法解析为数值，将被忽略"),
+    'text_score': (SEVERITY_WARNING, "成绩为文本，将从文本中提取数值"),
+    'invalid_date': (SEVERITY_WARNING, "日期为空或无法解析"),
+}
+
+ISSUE_COLUMNS = ['行号', 'ID', '姓名', '级别', '问题', '列', '说明']
+
+# 雷达图至少需要的有效成绩个数（与 RadarChartGenerator.filter_valid_data 一致）
+MIN_VALID_SCORES = 3
+
+
+def _text_values(series: pd.Series) -> pd.Series:
+    """去除首尾空白后的文本值，缺失值为空字符串"""
+    return series.astype(str).str.strip().where(series.notna(), "")
+
+
+class _UniqueValues:
+    """列中不重复的值及各行的编码；成绩和日期列的不同取值通常很少，检查只需对不重复的值进行"""
+
+    def __init__(self, series: pd.Series):
+        self.codes, uniques = pd.factorize(series, use_na_sentinel=True)
+        self.uniques = pd.Series(uniques, dtype=object)
+
+    def map(self, func) -> np.ndarray:
+        """对不重复的值计算 func（返回布尔数组），再按编码映射回各行（缺失值为False）"""
+        if len(self.uniques) == 0:
+            return np.zeros(len(self.codes), dtype=bool)
+        result = np.asarray(func(self.uniques), dtype=bool)
+        return np.where(self.codes >= 0, result[self.codes], False)
+
+
+def _parses_as_number(values: pd.Series) -> np.ndarray:
+    return pd.to_numeric(values, errors='coerce').notna().to_numpy()
+
+
+def _rescued_by_cleaning(values: pd.Series) -> np.ndarray:
+    cleaned = values.astype(str).str.strip().str.replace(r'[^\d.-]', '', regex=True)
+    return pd.to_numeric(cleaned, errors='coerce').notna().to_numpy()
+
+
+def _valid_date(values: pd.Series) -> np.ndarray:
+    digits = values.str.replace(r'\D', '', regex=True).str.zfill(8)
+    return pd.to_datetime(digits, format='%Y%m%d', errors='coerce').notna().to_numpy()
+
+
+def _join_columns(mask: np.ndarray, columns: List[str]) -> np.ndarray:
+    """按行拼接 mask 为真的列名（如 "测评项目1、测评项目3"）；相同的列组合只拼接一次"""
+    packed = np.packbits(mask, axis=1)
+    patterns, inverse = np.unique(packed, axis=0, return_inverse=True)
+    unpacked = np.unpackbits(patterns, axis=1, count=len(columns)).astype(bool)
+    labels = np.array(["、".join(col for col, hit in zip(columns, row) if hit) for row in unpacked],
+                      dtype=object)
+    return labels[inverse.reshape(-1)]
+
+
+def _score_issues(df: pd.DataFrame, score_columns: List[str]) -> Dict[str, tuple]:
+    """
+    检查成绩列（与 filter_valid_data 的解析规则一致：先按数值转换，失败时去除非数字字符后再转换）
+
+    Returns:
+        {问题类型: (行掩码, 各行涉及的列)}
+    """
+    n = len(df)
+    k = len(score_columns)
+    valid = np.zeros((n, k), dtype=bool)
+    text = np.zeros((n, k), dtype=bool)
+    invalid = np.zeros((n, k), dtype=bool)
+
+    for j, col in enumerate(score_columns):
+        series = df[col]
+        present = series.notna().to_numpy()
+        if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+            valid[:, j] = present
+            continue
+        values = _UniqueValues(series)
+        direct = values.map(_parses_as_number)
+        rest = present & ~direct
+        if rest.any():
+            rescued = values.map(_rescued_by_cleaning) & rest
+            text[:, j] = rescued
+            invalid[:, j] = rest & ~rescued
+        valid[:, j] = direct | text[:, j]
+
+    issues = {}
+    too_few = valid.sum(axis=1) < MIN_VALID_SCORES
+    issues['too_few_scores'] = (too_few, np.full(n, "", dtype=object))
+    for name, mask in (('invalid_score', invalid), ('text_score', text)):
+        rows = mask.any(axis=1)
+        if rows.any():
+            issues[name] = (rows, _join_columns(mask, score_columns))
+    return issues
+
+
+def _date_issues(df: pd.DataFrame) -> Dict[str, tuple]:
+    """检查日期列能否解析为8位日期（与 normalize_date_columns 的规范化规则一致）"""
+    columns = [col for col in DATE_COLUMNS if col in df.columns]
+    if not columns:
+        return {}
+    bad = np.zeros((len(df), len(columns)), dtype=bool)
+    for j, col in enumerate(columns):
+        # 缺失值规范化后为 "00000000"，同样视为无法解析
+        # 与 normalize_date_columns 一样先整列转为文本（Excel日期列转为 "2010-01-01"）
+        bad[:, j] = ~(_UniqueValues(df[col].astype(str)).map(_valid_date) & df[col].notna().to_numpy())
+    rows = bad.any(axis=1)
+    return {'invalid_date': (rows, _join_columns(bad, columns))} if rows.any() else {}
+
+
+def report_base_names(df: pd.DataFrame, filename_mode: str = "name_custom") -> pd.Series:
+    """按整列计算报告文件名的主体部分（与 ReportGenerator.build_report_filename 一致）"""
+    fallback = pd.Series([f"报告_{i + 1}" for i in range(len(df))], index=df.index)
+    ids = _text_values(df['ID']) if 'ID' in df.columns else pd.Series("", index=df.index)
+    by_id = ids.where(ids != "", fallback)
+    if filename_mode == "id_only" or '姓名' not in df.columns:
+        return by_id
+    names = df['姓名']
+    # 以 object 类型清洗：Python 正则的 \w 与 str.isalnum 一致包含中文（pyarrow 字符串的 \w 只匹配ASCII）
+    cleaned = names.astype(str).astype(object).str.replace(r'[^\w \-]', '', regex=True).str.rstrip()
+    cleaned = cleaned.where(cleaned != "", fallback)
+    blank = names.isna() | (names.astype(str).str.strip() == "")
+    return cleaned.where(~blank, by_id)
+
+
+def _filename_issues(df: pd.DataFrame, filename_mode: str) -> Dict[str, tuple]:
+    """检查报告文件名是否重复（不区分大小写，与Windows文件系统一致）"""
+    keys = report_base_names(df, filename_mode).str.lower()
+    duplicated = keys.duplicated(keep=False).to_numpy()
+    if not duplicated.any():
+        return {}
+    field = "ID" if filename_mode == "id_only" else "姓名"
+    return {'duplicate_filename': (duplicated, np.full(len(df), field, dtype=object))}
+
+
+def preflight_check(df: pd.DataFrame, filename_mode: str = "name_custom") -> pd.DataFrame:
+    """
+    预检全部受试者数据
+
+    Args:
+        df: 受试者数据（读取的原始数据或已规范化日期列的数据均可）
+        filename_mode: 文件命名模式，见 ReportGenerator.generate_batch_reports
+
+    Returns:
+        问题表（列见 ISSUE_COLUMNS），每行一个问题，按行号排序；没有问题时为空表
+    """
+    columns = [str(col) if not isinstance(col, str) else col for col in df.columns]
+    df = df.set_axis(columns, axis=1)
+    score_columns = get_score_columns(columns)
+
+    found = {}
+    found.update(_score_issues(df, score_columns))
+    found.update(_date_issues(df))
+    found.update(_filename_issues(df, filename_mode))
+    checks = {issue: found[issue] for issue in ISSUE_TYPES if issue in found}
+
+    ids = _text_values(df['ID']).to_numpy() if 'ID' in df.columns else np.full(len(df), "")
+    names = _text_values(df['姓名']).to_numpy() if '姓名' in df.columns else np.full(len(df), "")
+    frames = []
+    for issue, (mask, involved) in checks.items():
+        positions = np.flatnonzero(mask)
+        if len(positions) == 0:
+            continue
+        severity, description = ISSUE_TYPES[issue]
+        frames.append(pd.DataFrame({
+            '行号': positions + 2,  # Excel中的行号（第1行为表头）
+            'ID': ids[positions],
+            '姓名': names[positions],
+            '级别': severity,
+            '问题': issue,
+            '列': involved[positions],
+            '说明': description,
+        }))
+
+    if not frames:
+        return pd.DataFrame(columns=ISSUE_COLUMNS)
+    # 同一行的问题按 ISSUE_TYPES 的顺序排列（错误在前）
+    issues = pd.concat(frames, ignore_index=True)
+    return issues.sort_values('行号', kind='stable', ignore_index=True)
+
+
+def summarize_issues(issues: pd.DataFrame) -> Dict[str, int]:
+    """统计问题：各问题类型的行数，以及有错误/警告的行数"""
+    summary = {issue: int(count) for issue, count in issues['问题'].value_counts().items()}
+    summary['error_rows'] = int(issues.loc[issues['级别'] == SEVERITY_ERROR, '行号'].nunique())
+    summary['warning_rows'] = int(issues.loc[issues['级别'] == SEVERITY_WARNING, '行号'].nunique())
+    return summary
+
+
+def format_issues(issues: pd.DataFrame, limit: int = 10) -> str:
+    """问题摘要文本（各类问题的行数和前几个问题行），用于界面提示和命令行输出"""
+    if issues.empty:
+        return "数据预检通过，未发现问题"
+    summary = summarize_issues(issues)
+    lines = [f"数据预检发现 {summary['error_rows']} 行错误、{summary['warning_rows']} 行警告："]
+    for issue, (severity, description) in ISSUE_TYPES.items():
+        if issue in summary:
+            lines.append(f"  [{severity}] {description}：{summary[issue]} 行")
+    lines.append("")
+    # 先列出错误行
+    shown = pd.concat([issues[issues['级别'] == SEVERITY_ERROR], issues[issues['级别'] != SEVERITY_ERROR]])
+    for item in shown.head(limit).itertuples(index=False):
+        where = f"（{item.列}）" if item.列 else ""
+        lines.append(f"  第{item.行号}行 {item.姓名 or item.ID or '-'}：{ISSUE_TYPES[item.问题][1]}{where}")
+    if len(issues) > limit:
+        lines.append(f"  ……共 {len(issues)} 个问题")
+    return "\n".join(lines)
+
+
+def write_issues(issues: pd.DataFrame, output_file: str) -> str:
+    """将问题表写入CSV（Excel可直接打开）或Excel文件，返回文件路径"""
+    path = Path(output_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if path.suffix.lower() in ('.xlsx', '.xls'):
+        issues.to_excel(path, index=False)
+    else:
+        issues.to_csv(path, index=False, encoding='utf-8-sig')
+    logger.info(f"数据预检问题表已保存: {path}（{len(issues)} 个问题）")
+    return str(path)
@@ -0,0 +1,441 @@
+"""
+心理测试反馈报告生成器 - 报告预览模块
+按屏幕分辨率快速绘制单个受试者报告第一页的草图（低分辨率雷达图 + 按报告版式直接绘制表格），不生成PDF。
+雷达图和整页草图分别按内容缓存：切换受试者时只需重绘未见过的雷达图，修改标题或结果说明时只需重新排版。
+"""
+
+import time
+import logging
+import threading
+import tkinter as tk
+from tkinter import ttk
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Tuple
+
+import pandas as pd
+import matplotlib.pyplot as plt
+from PIL import Image, ImageDraw, ImageFont, ImageOps, ImageTk
+
+from font_index import resolve_font
+from radar_chart import RadarChartGenerator, CHART_FONT
+
+logger = logging.getLogger(__name__)
+
+# 屏幕分辨率（每英寸像素数），A4页面约为 794x1123 像素
+PREVIEW_DPI = 96
+
+# 缓存容量：雷达图草图每张约 0.3 MB，整页草图每页约 2.7 MB
+CHART_CACHE_SIZE = 128
+PAGE_CACHE_SIZE = 16
+
+# 页面版式（与 ReportGenerator.generate_single_report 和 ReportStyleManager 一致，单位：厘米/磅）
+PAGE_SIZE_CM = (21.0, 29.7)
+MARGIN_LEFT_CM = 1.5
+MARGIN_TOP_CM = 1.0
+MARGIN_BOTTOM_CM = 0.5
+FRAME_PADDING_PT = 6
+CHART_SIZE_CM = 8
+
+GRID_COLOR = '#D3DFEE'
+HEADER_COLOR = '#4F81BD'
+STRIPE_COLOR = '#F2F2F2'
+
+
+class _LRUCache:
+    """按最近使用淘汰的缓存"""
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.items = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        if key in self.items:
+            self.items.move_to_end(key)
+            self.hits += 1
+            return self.items[key]
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self.items[key] = value
+        self.items.move_to_end(key)
+        while len(self.items) > self.maxsize:
+            self.items.popitem(last=False)
+
+
+def _wrap_text(text: str, font, width: float) -> List[str]:
+    """按字符折行（中文文本没有空格，与 reportlab 的 CJK 折行效果接近）"""
+    lines = []
+    line = ""
+    for char in str(text).replace("\n", " "):
+        if line and font.getlength(line + char) > width:
+            lines.append(line)
+            line = char.lstrip()
+        else:
+            line += char
+    lines.append(line)
+    return lines
+
+
+class PreviewRenderer:
+    """报告第一页的草图渲染器（与一个 ReportGenerator 绑定；评分配置改变后需创建新的渲染器）"""
+
+    def __init__(self, report_generator, dpi: int = PREVIEW_DPI):
+        """
+        Args:
+            report_generator: 提供评分配置、个人信息和评价内容的报告生成器
+            dpi: 草图分辨率（每英寸像素数）
+        """
+        self.report_generator = report_generator
+        self.dpi = dpi
+        self.chart_px = round(self._cm(CHART_SIZE_CM))
+
+        # 草图雷达图：图形尺寸和样式与报告相同，分辨率按屏幕上的雷达图大小计算，不裁剪边界、不压缩PNG
+        radar = report_generator.radar_generator
+        self.radar = RadarChartGenerator(
+            figure_size=radar.figure_size,
+            dpi=self.chart_px / radar.figure_size[0],
+            baseline_score=radar.baseline_score,
+            tight_bbox=False,
+            png_optimize=False,
+            font_file=report_generator.font_manager.registered_fonts.get(CHART_FONT)
+        )
+        self.radar.style_config = dict(radar.style_config)
+        self.radar.set_variables(radar.default_variables)
+
+        self.chart_cache = _LRUCache(CHART_CACHE_SIZE)
+        self.page_cache = _LRUCache(PAGE_CACHE_SIZE)
+        self._fonts: Dict[Tuple[str, float], ImageFont.FreeTypeFont] = {}
+
+        # matplotlib 不是线程安全的，同一时间只绘制一页
+        self.lock = threading.Lock()
+
+    def _cm(self, value: float) -> float:
+        return value * self.dpi / 2.54
+
+    def _pt(self, value: float) -> float:
+        return value * self.dpi / 72
+
+    def _font(self, font_name: str, points: float):
+        """报告字体（SimSun / SimKai / SimHei）的指定字号，找不到字体时使用PIL默认字体"""
+        key = (font_name, points)
+        if key not in self._fonts:
+            found = resolve_font(font_name, truetype_only=False)
+            size = self._pt(points)
+            if found:
+                self._fonts[key] = ImageFont.truetype(found[0], round(size), index=found[1])
+            else:
+                self._fonts[key] = ImageFont.load_default(size)
+        return self._fonts[key]
+
+    def chart(self, row: pd.Series) -> Optional[Image.Image]:
+        """
+        雷达图草图（按有效变量和分数缓存）
+
+        Returns:
+            边长为 CHART_SIZE_CM 的图像；有效数据不足、无法绘制时返回None
+        """
+        try:
+            variables, scores = self.radar.filter_valid_data(row)
+        except ValueError:
+            return None
+        key = (tuple(variables), scores.tobytes())
+        image = self.chart_cache.get(key)
+        if image is not None:
+            return image
+
+        fig = self.radar.create_figure(row)
+        try:
+            fig.canvas.draw()
+            width, height = fig.canvas.get_width_height()
+            image = Image.frombuffer('RGBA', (width, height), fig.canvas.buffer_rgba(), 'raw', 'RGBA', 0, 1)
+            image = image.convert('RGB')
+        finally:
+            plt.close(fig)
+
+        # 代替保存时的 bbox_inches='tight'：按非白色内容的边界裁剪（保留0.1英寸边距），再缩放到报告中的大小
+        bbox = ImageOps.invert(image).getbbox()
+        if bbox:
+            pad = round(0.1 * self.radar.dpi)
+            image = image.crop((max(bbox[0] - pad, 0), max(bbox[1] - pad, 0),
+                                min(bbox[2] + pad, width), min(bbox[3] + pad, height)))
+        image = image.resize((self.chart_px, self.chart_px), Image.LANCZOS)
+        self.chart_cache.put(key, image)
+        return image
+
+    def render(self, row: pd.Series, title: str, disclaimer: str) -> Image.Image:
+        """
+        绘制报告第一页的草图（按受试者数据、标题和结果说明缓存）
+
+        Returns:
+            页面图像；image.info['hidden_rows'] 为排不下、在后续页面的测评项目数
+        """
+        key = (tuple(map(str, row.index)), tuple(map(str, row.values)), title, disclaimer)
+        with self.lock:
+            page = self.page_cache.get(key)
+            if page is None:
+                page = self._layout(row, title, disclaimer)
+                self.page_cache.put(key, page)
+            return page
+
+    def _draw_lines(self, draw: ImageDraw.ImageDraw, lines: List[str], font, leading: float,
+                    box: Tuple[float, float, float, float], align: str = 'center', fill='black'):
+        """在单元格内垂直居中绘制多行文字"""
+        left, top, right, bottom = box
+        y = top + (bottom - top - leading * len(lines)) / 2
+        for i, line in enumerate(lines):
+            center_y = y + leading * (i + 0.5)
+            if align == 'center':
+                draw.text(((left + right) / 2, center_y), line, font=font, fill=fill, anchor='mm')
+            else:
+                draw.text((left, center_y), line, font=font, fill=fill, anchor='lm')
+
+    def _layout(self, row: pd.Series, title: str, disclaimer: str) -> Image.Image:
+        generator = self.report_generator
+        width, height = round(self._cm(PAGE_SIZE_CM[0])), round(self._cm(PAGE_SIZE_CM[1]))
+        page = Image.new('RGB', (width, height), 'white')
+        draw = ImageDraw.Draw(page)
+
+        x0 = self._cm(MARGIN_LEFT_CM)
+        y = self._cm(MARGIN_TOP_CM) + self._pt(FRAME_PADDING_PT)
+        bottom_limit = height - self._cm(MARGIN_BOTTOM_CM) - self._pt(FRAME_PADDING_PT)
+
+        # 标题（ReportTitle：黑体26磅，行距24磅，段后30磅）
+        title_font = self._font('SimHei', 26)
+        title_lines = _wrap_text(title, title_font, self._cm(18))
+        self._draw_lines(draw, title_lines, title_font, self._pt(24),
+                         (x0, y, x0 + self._cm(18), y + self._pt(24) * len(title_lines)))
+        y += self._pt(24) * len(title_lines) + self._pt(30)
+
+        # 个人信息表格（2cm + 7cm，5行1.2cm + 结果说明2.0cm）
+        y += self._pt(3)
+        fields = generator._header_fields(row, disclaimer)
+        row_heights = [self._cm(1.2)] * 5 + [self._cm(2.0)]
+        label_font = self._font('SimKai', 13)
+        note_font = self._font('SimKai', 11)
+        col_x = [x0, x0 + self._cm(2), x0 + self._cm(9)]
+        top = y
+        for (label, value), row_height in zip(fields, row_heights):
+            box_bottom = top + row_height
+            self._draw_lines(draw, [label], label_font, self._pt(18), (col_x[0], top, col_x[1], box_bottom))
+            if len(value) > 20:
+                padding = self._pt(6)
+                lines = _wrap_text(value, note_font, col_x[2] - col_x[1] - 2 * padding)
+                self._draw_lines(draw, lines, note_font, self._pt(14),
+                                 (col_x[1] + padding, top, col_x[2] - padding, box_bottom), align='left')
+            else:
+                self._draw_lines(draw, [value], label_font, self._pt(18), (col_x[1], top, col_x[2], box_bottom))
+            draw.rectangle((col_x[0], top, col_x[1], box_bottom), outline=GRID_COLOR, width=1)
+            draw.rectangle((col_x[1], top, col_x[2], box_bottom), outline=GRID_COLOR, width=1)
+            top = box_bottom
+
+        # 雷达图（右对齐，8x8cm 边框）
+        chart_x = round(x0 + self._cm(10))
+        chart = self.chart(row)
+        if chart is not None:
+            page.paste(chart, (chart_x, round(y)))
+        else:
+            self._draw_lines(draw, ["[雷达图生成失败]"], self._font('SimSun', 10), self._pt(14),
+                             (chart_x, y, chart_x + self.chart_px, y + self.chart_px))
+        draw.rectangle((chart_x, y, chart_x + self.chart_px, y + self.chart_px), outline=GRID_COLOR, width=1)
+        y += self._cm(CHART_SIZE_CM) + self._pt(3) + self._cm(0.5)
+
+        # 评价表格（4cm + 4cm + 10cm，内边距5磅，隔行底色）
+        score_header, rows = generator._evaluation_rows(row)
+        col_x = [x0, x0 + self._cm(4), x0 + self._cm(8), x0 + self._cm(18)]
+        padding = self._pt(5)
+        header_font = self._font('SimHei', 12)
+        data_font = self._font('SimHei', 10)
+        body_font = self._font('SimSun', 10)
+        table_top = y
+
+        header_height = self._pt(14) + 2 * padding
+        draw.rectangle((col_x[0], y, col_x[3], y + header_height), fill=HEADER_COLOR)
+        for i, text in enumerate(["测评项目", score_header, "描述"]):
+            self._draw_lines(draw, [text], header_font, self._pt(14),
+                             (col_x[i], y, col_x[i + 1], y + header_height), fill='white')
+        y += header_height
+
+        hidden_rows = 0
+        for n, (task, score_display, evaluation) in enumerate(rows):
+            cells = [
+                (_wrap_text(task, data_font, col_x[1] - col_x[0] - 2 * padding), data_font, 'center'),
+                (_wrap_text(score_display, data_font, col_x[2] - col_x[1] - 2 * padding), data_font, 'center'),
+                (_wrap_text(evaluation, body_font, col_x[3] - col_x[2] - 2 * padding), body_font, 'left'),
+            ]
+            row_height = max(len(lines) for lines, _, _ in cells) * self._pt(14) + 2 * padding
+            if y + row_height > bottom_limit:
+                hidden_rows = len(rows) - n
+                break
+            if n % 2:
+                draw.rectangle((col_x[0], y, col_x[3], y + row_height), fill=STRIPE_COLOR)
+            for i, (lines, font, align) in enumerate(cells):
+                self._draw_lines(draw, lines, font, self._pt(14),
+                                 (col_x[i] + padding, y, col_x[i + 1] - padding, y + row_height), align=align)
+                draw.rectangle((col_x[i], y, col_x[i + 1], y + row_height), outline=GRID_COLOR, width=1)
+            y += row_height
+        draw.rectangle((col_x[0], table_top, col_x[3], y), outline=HEADER_COLOR, width=1)
+
+        page.info['hidden_rows'] = hidden_rows
+        return page
+
+
+def participant_label(index: int, row: pd.Series) -> str:
+    """受试者在选择列表中的显示文字（Excel行号 + 姓名或ID）"""
+    for field in ('姓名', 'ID'):
+        if field in row and pd.notna(row[field]) and str(row[field]).strip():
+            return f"第{index + 2}行  {str(row[field]).strip()}"
+    return f"第{index + 2}行"
+
+
+class PreviewPanel:
+    """报告预览窗口：选择受试者后在后台线程中绘制草图，修改标题或结果说明时自动刷新"""
+
+    # 标题、结果说明修改后等待多久再刷新（毫秒），连续输入时只刷新一次
+    REFRESH_DELAY_MS = 300
+
+    def __init__(self, parent, get_generator: Callable, title_var: tk.StringVar,
+                 disclaimer_var: tk.StringVar, is_busy: Callable[[], bool] = lambda: False,
+                 dpi: int = PREVIEW_DPI):
+        """
+        Args:
+            parent: 主窗口
+            get_generator: 返回当前的报告生成器（尚未加载时返回None）
+            title_var: 报告标题变量
+            disclaimer_var: 结果说明变量
+            is_busy: 是否正在生成报告（生成时不绘制预览，避免与生成线程同时使用matplotlib）
+            dpi: 草图分辨率
+        """
+        self.parent = parent
+        self.get_generator = get_generator
+        self.title_var = title_var
+        self.disclaimer_var = disclaimer_var
+        self.is_busy = is_busy
+        self.dpi = dpi
+        self.data: Optional[pd.DataFrame] = None
+        self.renderer: Optional[PreviewRenderer] = None
+        self.closed = False
+        self._token = 0
+        self._refresh_job = None
+        self._photo = None
+
+        self.window = tk.Toplevel(parent)
+        self.window.title("报告预览")
+        self.window.geometry(f"{round(PAGE_SIZE_CM[0] * dpi / 2.54) + 40}x760")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.window.columnconfigure(0, weight=1)
+        self.window.rowconfigure(1, weight=1)
+
+        toolbar = ttk.Frame(self.window, padding="5")
+        toolbar.grid(row=0, column=0, columnspan=2, sticky=(tk.W, tk.E))
+        ttk.Button(toolbar, text="上一个", command=lambda: self.step(-1)).pack(side=tk.LEFT, padx=2)
+        self.selector = ttk.Combobox(toolbar, state="readonly", width=36)
+        self.selector.pack(side=tk.LEFT, padx=2)
+        self.selector.bind("<<ComboboxSelected>>", lambda event: self.request_render())
+        ttk.Button(toolbar, text="下一个", command=lambda: self.step(1)).pack(side=tk.LEFT, padx=2)
+        self.status_var = tk.StringVar()
+        ttk.Label(toolbar, textvariable=self.status_var).pack(side=tk.LEFT, padx=10)
+
+        self.canvas = tk.Canvas(self.window, background="#808080", highlightthickness=0)
+        self.canvas.grid(row=1, column=0, sticky=(tk.W, tk.E, tk.N, tk.S))
+        scrollbar = ttk.Scrollbar(self.window, orient=tk.VERTICAL, command=self.canvas.yview)
+        scrollbar.grid(row=1, column=1, sticky=(tk.N, tk.S))
+        self.canvas.configure(yscrollcommand=scrollbar.set)
+        self.canvas.bind("<MouseWheel>", lambda event: self.canvas.yview_scroll(-event.delta // 120, "units"))
+
+        self._traces = [
+            (self.title_var, self.title_var.trace_add("write", self._on_settings_changed)),
+            (self.disclaimer_var, self.disclaimer_var.trace_add("write", self._on_settings_changed)),
+        ]
+
+    def set_data(self, data: pd.DataFrame):
+        """设置受试者数据（日期列已规范化），保留当前选择的行号"""
+        self.data = data
+        labels = [participant_label(i, data.iloc[i]) for i in range(len(data))]
+        self.selector.config(values=labels)
+        if labels:
+            current = self.selector.current()
+            self.selector.current(current if 0 <= current < len(labels) else 0)
+        self.request_render()
+
+    def step(self, offset: int):
+        """选择上一个/下一个受试者"""
+        count = len(self.selector.cget("values"))
+        if count:
+            self.selector.current((self.selector.current() + offset) % count)
+            self.request_render()
+
+    def _on_settings_changed(self, *args):
+        if self._refresh_job is not None:
+            self.window.after_cancel(self._refresh_job)
+        self._refresh_job = self.window.after(self.REFRESH_DELAY_MS, self.request_render)
+
+    def request_render(self):
+        """在后台线程中绘制当前选择的受试者（只显示最近一次请求的结果）"""
+        self._refresh_job = None
+        index = self.selector.current()
+        if self.closed or self.data is None or index < 0:
+            return
+        generator = self.get_generator()
+        if generator is None:
+            self.status_var.set("组件尚未加载完成")
+            return
+        if self.is_busy():
+            self.status_var.set("正在生成报告，完成后再预览")
+            return
+        if self.renderer is None or self.renderer.report_generator is not generator:
+            self.renderer = PreviewRenderer(generator, self.dpi)
+
+        self._token += 1
+        self.status_var.set("正在绘制...")
+        threading.Thread(
+            target=self._render_thread,
+            args=(self.renderer, self._token, self.data.iloc[index],
+                  self.title_var.get(), self.disclaimer_var.get()),
+            daemon=True
+        ).start()
+
+    def _render_thread(self, renderer: PreviewRenderer, token: int, row: pd.Series, title: str, disclaimer: str):
+        """绘制草图的线程函数"""
+        if token != self._token:
+            return  # 已有更新的请求
+        start = time.perf_counter()
+        try:
+            page = renderer.render(row, title, disclaimer)
+        except Exception as e:
+            error = str(e)
+            logger.error(f"预览绘制失败: {error}")
+            self.parent.after(0, lambda error=error: self._show(token, None, 0, f"预览绘制失败：{error}"))
+            return
+        elapsed = time.perf_counter() - start
+        self.parent.after(0, lambda: self._show(token, page, elapsed))
+
+    def _show(self, token: int, page: Optional[Image.Image], elapsed: float, error: str = None):
+        """在界面线程中显示草图"""
+        if self.closed or token != self._token:
+            return
+        if page is None:
+            self.status_var.set(error)
+            return
+        self._photo = ImageTk.PhotoImage(page)
+        self.canvas.delete("all")
+        self.canvas.create_image(10, 10, anchor=tk.NW, image=self._photo)
+        self.canvas.configure(scrollregion=(0, 0, page.width + 20, page.height + 20))
+        status = f"第1页草图（{elapsed * 1000:.0f} 毫秒）"
+        hidden_rows = page.info.get('hidden_rows', 0)
+        if hidden_rows:
+            status += f"，另有 {hidden_rows} 个测评项目在后续页面"
+        self.status_var.set(status)
+
+    def lift(self):
+        self.window.deiconify()
+        self.window.lift()
+
+    def close(self):
+        """关闭预览窗口并移除变量监听"""
+        self.closed = True
+        for var, trace_id in self._traces:
+            var.trace_remove("write", trace_id)
+        self.window.destroy()
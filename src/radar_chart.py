@@ -5,16 +5,28 @@
 
 import pandas as pd
 import numpy as np
+import matplotlib
+# 只生成图片，不需要界面后端；也避免在后台线程中导入 pyplot 时加载 Tk 后端
+matplotlib.use('Agg')
 import matplotlib.pyplot as plt
+from matplotlib.font_manager import FontProperties
 from pathlib import Path
+import gc
 import io
+import re
 from typing import List, Tuple, Optional, Dict, Any
 import logging
 
-# 设置中文字体支持
-plt.rcParams['font.sans-serif'] = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
+from utils import log_event
+from instrumentation import StageTimer
+from font_index import resolve_font
+
 plt.rcParams['axes.unicode_minus'] = False
 
+# 雷达图文字使用的字体（与PDF表格一致）；找不到字体文件时按字体族名交给 matplotlib 查找
+CHART_FONT = "SimHei"
+FALLBACK_FONT_FAMILIES = ['SimHei', 'Microsoft YaHei', 'DejaVu Sans']
+
 logger = logging.getLogger(__name__)
 
 
@@ -25,7 +37,10 @@ class RadarChartGenerator:
                  figure_size: Tuple[int, int] = (8, 8),
                  dpi: int = 300,  # 提高DPI到300，大幅提升清晰度
                  baseline_score: float = 100.0,
-                 chart_shape: str = 'circle'):
+                 chart_shape: str = 'circle',
+                 tight_bbox: bool = True,
+                 png_optimize: bool = True,
+                 font_file: Optional[str] = None):
         """
         初始化雷达图生成器
         
@@ -34,11 +49,23 @@ class RadarChartGenerator:
             dpi: 图像分辨率
             baseline_score: 基准线分数
             chart_shape: 图表形状 (固定为圆形)
+            tight_bbox: 保存时是否裁剪到内容边界（需要额外绘制一次）
+            png_optimize: 是否压缩优化PNG（文件更小，编码更慢）
+            font_file: 文字使用的字体文件，默认按字体索引查找 CHART_FONT
         """
         self.figure_size = figure_size
         self.dpi = dpi
         self.baseline_score = baseline_score
         self.chart_shape = 'circle'  # 固定为圆形
+        self.tight_bbox = tight_bbox
+        self.png_optimize = png_optimize
+        
+        # 构造时解析一次字体，绘图时直接传给各文字元素，不再逐次查找字体
+        self.font_properties = self._resolve_font_properties(font_file)
+        self._sized_fonts: Dict[float, FontProperties] = {}
+        
+        # 分阶段计时器（默认不启用；由 ReportGenerator 替换为共享的计时器）
+        self.timer = StageTimer()
         
         # 默认变量列表（可动态调整）
         self.default_variables = []
@@ -47,9 +74,11 @@ class RadarChartGenerator:
         self.style_config = {
             'line_color': '#1E3A8A',        # 更深的蓝色，增强对比度
             'line_width': 3.5,              # 稍微加粗线条
+            'show_markers': True,           # 是否绘制数据点标记
             'marker_size': 12,              # 增大标记点
             'marker_face_color': '#FFFFFF', # 纯白色标记
             'marker_edge_width': 2,         # 加粗标记边框
+            'show_fill': True,              # 是否填充数据区域
             'fill_color': '#3B82F6',        # 更鲜艳的蓝色填充
             'fill_alpha': 0.15,             # 稍微增加填充透明度
             'baseline_color': '#DC2626',    # 鲜艳的红色基准线
@@ -189,17 +218,14 @@ class RadarChartGenerator:
             all_columns = list(row.index)
             if len(all_columns) > 6:
                 variables = all_columns[6:]  # 从第7列开始
-                logger.info(f"动态读取变量列表（从第7列开始）: {variables}")
             else:
                 # 如果列数不足7列，使用默认变量列表
                 variables = self.default_variables
-                logger.warning(f"列数不足7列，使用默认变量列表: {variables}")
+                logger.warning("列数不足7列，使用默认变量列表: %s", variables)
         
-        # 添加调试信息
-        logger.info(f"处理数据行 - ID: {row.get('ID', '未知')}")
-        logger.info(f"期望的变量列表: {variables}")
-        logger.info(f"Excel文件中的所有列: {list(row.index)}")
-        logger.info(f"当前行的数据: {dict(row)}")
+        # 调试信息（仅在DEBUG级别启用时才格式化）
+        log_event(logger, "radar.row", id=row.get('ID', '未知'), variables=variables,
+                  columns=lambda: list(row.index), values=lambda: dict(row))
         
         # 过滤有效数据
         valid_data = []
@@ -209,34 +235,30 @@ class RadarChartGenerator:
                     # 先尝试直接转换
                     score = float(row[var])
                     valid_data.append((var, score))
-                    logger.info(f"成功识别数值: {var} = {score}")
                 except (ValueError, TypeError):
                     # 如果直接转换失败，尝试处理文本格式的数值
                     try:
                         # 去除空格和特殊字符，尝试转换
                         cleaned_value = str(row[var]).strip()
                         # 移除可能的非数字字符（保留数字、小数点、负号）
-                        import re
                         numeric_value = re.sub(r'[^\d.-]', '', cleaned_value)
                         if numeric_value:
                             score = float(numeric_value)
                             valid_data.append((var, score))
-                            logger.info(f"成功转换文本格式数值: {var} = '{row[var]}' -> {score}")
+                            log_event(logger, "radar.text_value", variable=var, raw=row[var], score=score)
                         else:
-                            logger.warning(f"无法从文本中提取数值: {var} = '{row[var]}'")
+                            logger.warning("无法从文本中提取数值: %s = '%s'", var, row[var])
                             continue
                     except (ValueError, TypeError):
-                        logger.warning(f"无法转换变量 {var} 的值: {row[var]}")
+                        logger.warning("无法转换变量 %s 的值: %s", var, row[var])
                         continue
             else:
                 if var not in row:
-                    logger.warning(f"变量 '{var}' 在Excel文件中不存在")
-                elif pd.isna(row[var]):
-                    logger.warning(f"变量 '{var}' 的值为空: {row[var]}")
+                    logger.warning("变量 '%s' 在Excel文件中不存在", var)
+                else:
+                    log_event(logger, "radar.missing_value", variable=var)
         
-        logger.info(f"最终有效数据点: {len(valid_data)} 个")
-        for var, score in valid_data:
-            logger.info(f"  - {var}: {score}")
+        log_event(logger, "radar.valid_points", count=len(valid_data), points=valid_data)
         
         if len(valid_data) < 3:
             raise ValueError(f"有效数据点不足3个，无法生成雷达图。当前有效数据: {len(valid_data)}")
@@ -244,23 +266,44 @@ class RadarChartGenerator:
         valid_vars, valid_scores = zip(*valid_data)
         return list(valid_vars), np.array(valid_scores, dtype=float)
     
-    def generate_radar_chart(self, 
-                           row: pd.Series, 
-                           variables: List[str] = None,
-                           title: str = None,
-                           save_path: Optional[str] = None) -> Optional[bytes]:
+    @staticmethod
+    def _resolve_font_properties(font_file: Optional[str]) -> FontProperties:
+        """解析文字使用的字体"""
+        if font_file is None:
+            found = resolve_font(CHART_FONT, truetype_only=False)
+            # matplotlib 只能使用TTC中的第一个子字体
+            font_file = found[0] if found else None
+        if font_file:
+            logger.debug("雷达图字体: %s", font_file)
+            return FontProperties(fname=font_file)
+        logger.warning("未找到中文字体文件，雷达图文字可能无法正常显示")
+        return FontProperties(family=FALLBACK_FONT_FAMILIES)
+    
+    def _font(self, size: float) -> FontProperties:
+        """指定字号的字体（按字号缓存）"""
+        font = self._sized_fonts.get(size)
+        if font is None:
+            font = self.font_properties.copy()
+            font.set_size(size)
+            self._sized_fonts[size] = font
+        return font
+    
+    def create_figure(self, 
+                      row: pd.Series, 
+                      variables: List[str] = None,
+                      title: str = None):
         """
-        生成雷达图
+        创建雷达图图形（不保存、不编码）
         
         Args:
             row: 数据行
             variables: 变量列表
             title: 图表标题
-            save_path: 保存路径，如果为None则返回字节数据
             
         Returns:
-            如果save_path为None，返回图像字节数据；否则返回None
+            matplotlib Figure，使用完毕后需调用 plt.close(fig)
         """
+        fig = None
         try:
             # 设置matplotlib高质量渲染参数
             plt.rcParams['figure.dpi'] = self.dpi
@@ -295,7 +338,7 @@ class RadarChartGenerator:
             ax.set_aspect('equal')
             
             # 绘制主图形
-            ax.plot(angles, scores, 'o-', 
+            ax.plot(angles, scores, 'o-' if self.style_config['show_markers'] else '-', 
                    color=self.style_config['line_color'],
                    linewidth=self.style_config['line_width'],
                    markersize=self.style_config['marker_size'],
@@ -303,9 +346,10 @@ class RadarChartGenerator:
                    markeredgewidth=self.style_config['marker_edge_width'])
             
             # 填充区域
-            ax.fill(angles, scores, 
-                   color=self.style_config['fill_color'],
-                   alpha=self.style_config['fill_alpha'])
+            if self.style_config['show_fill']:
+                ax.fill(angles, scores, 
+                       color=self.style_config['fill_color'],
+                       alpha=self.style_config['fill_alpha'])
             
             # 设置坐标系统
             ax.set_ylim(range_min, range_max)
@@ -354,7 +398,7 @@ class RadarChartGenerator:
             ax.set_yticklabels([f"{int(y)}" if y != self.baseline_score else ""
                                for y in yticks], 
                               color=self.style_config['text_color'],
-                              fontsize=self.style_config['label_font_size'])
+                              fontproperties=self._font(self.style_config['label_font_size']))
             
             # 智能计算基准线标注位置，避开变量标签
             if self.baseline_score >= range_min and self.baseline_score <= range_max:
@@ -366,7 +410,7 @@ class RadarChartGenerator:
                 ax.text(safe_angle, label_radius, f"{int(self.baseline_score)}\n(基准)", 
                        ha='center', va='center',
                        color=self.style_config['text_color'],
-                       fontsize=self.style_config['label_font_size'],
+                       fontproperties=self._font(self.style_config['label_font_size']),
                        bbox=dict(boxstyle="round,pad=0.3", 
                                 facecolor='white', 
                                 edgecolor=self.style_config['baseline_color'],
@@ -374,49 +418,79 @@ class RadarChartGenerator:
             
             # 设置角度刻度 - 增大任务名称字体
             ax.set_thetagrids(np.degrees(angles[:-1]), valid_vars, 
-                             fontsize=self.style_config['title_font_size'])
+                             fontproperties=self._font(self.style_config['title_font_size']))
             
             # 设置标题
             if title:
                 ax.set_title(title, 
                            color=self.style_config['text_color'],
-                           fontsize=self.style_config['title_font_size'],
+                           fontproperties=self._font(self.style_config['title_font_size']),
                            pad=20)
             
             # 确保图形比例正确，防止压缩
             plt.tight_layout()
             fig.subplots_adjust(left=0.1, right=0.9, top=0.9, bottom=0.1)
             
-            # 保存或返回字节数据
-            if save_path:
-                plt.savefig(save_path, 
-                           dpi=self.dpi, 
-                           bbox_inches='tight',
-                           facecolor='white',      # 设置背景为白色
-                           edgecolor='none',       # 无边框
-                           format='png',           # 明确指定PNG格式
-                           pil_kwargs={'optimize': True, 'quality': 95})  # 高质量PNG
-                plt.close()
-                return None
-            else:
-                # 返回字节数据
-                buffer = io.BytesIO()
-                plt.savefig(buffer, 
-                           format='png', 
-                           dpi=self.dpi, 
-                           bbox_inches='tight',
-                           facecolor='white',      # 设置背景为白色
-                           edgecolor='none',       # 无边框
-                           pil_kwargs={'optimize': True, 'quality': 95})  # 高质量PNG
-                buffer.seek(0)
-                image_bytes = buffer.getvalue()
-                buffer.close()
-                plt.close()
-                return image_bytes
+            return fig
+        except Exception:
+            if fig is not None:
+                plt.close(fig)
+            raise
+    
+    def _savefig_kwargs(self) -> Dict[str, Any]:
+        """保存PNG时的参数"""
+        return {
+            'format': 'png',                # 明确指定PNG格式
+            'dpi': self.dpi,
+            'bbox_inches': 'tight' if self.tight_bbox else None,
+            'facecolor': 'white',           # 设置背景为白色
+            'edgecolor': 'none',            # 无边框
+            'pil_kwargs': {'optimize': self.png_optimize, 'quality': 95},  # 高质量PNG
+        }
+    
+    def encode_figure(self, fig) -> bytes:
+        """将图形编码为PNG字节数据（保存时才真正绘制）"""
+        buffer = io.BytesIO()
+        fig.savefig(buffer, **self._savefig_kwargs())
+        image_bytes = buffer.getvalue()
+        buffer.close()
+        return image_bytes
+    
+    def generate_radar_chart(self, 
+                           row: pd.Series, 
+                           variables: List[str] = None,
+                           title: str = None,
+                           save_path: Optional[str] = None) -> Optional[bytes]:
+        """
+        生成雷达图
+        
+        Args:
+            row: 数据行
+            variables: 变量列表
+            title: 图表标题
+            save_path: 保存路径，如果为None则返回字节数据
+            
+        Returns:
+            如果save_path为None，返回图像字节数据；否则返回None
+        """
+        fig = None
+        try:
+            fig = self.create_figure(row, variables, title)
+            
+            # 保存或返回字节数据（保存时才真正绘制和编码，计入 png_encode 阶段）
+            with self.timer.span('png_encode'):
+                if save_path:
+                    fig.savefig(save_path, **self._savefig_kwargs())
+                    image_bytes = None
+                else:
+                    image_bytes = self.encode_figure(fig)
+            plt.close(fig)
+            return image_bytes
                 
         except Exception as e:
             logger.error(f"生成雷达图失败 - ID: {row.get('ID', '未知')}, 错误: {str(e)}")
-            plt.close('all')  # 确保清理资源
+            if fig is not None:
+                plt.close(fig)  # 只关闭本次创建的图形，确保清理资源
             raise
     
     def batch_generate_radar_charts(self, 
@@ -507,6 +581,12 @@ class RadarChartGenerator:
             variables: 变量列表
         """
         self.default_variables = variables
+    
+    @staticmethod
+    def reset_state():
+        """关闭所有残留的图形并回收其循环引用（长批次中定期调用，避免内存缓慢增长）"""
+        plt.close('all')
+        gc.collect()
 
 
 # 便捷函数
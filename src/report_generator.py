@@ -22,11 +22,29 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 from reportlab.lib.enums import TA_CENTER, TA_LEFT
 import logging
-from typing import Dict, Any, Optional, Callable
+from typing import Dict, Any, List, Optional, Callable, Tuple, Iterator
+from contextlib import nullcontext
+from dataclasses import replace
 import io
+import itertools
 
-from utils import ProgressCallback
-from radar_chart import RadarChartGenerator
+from utils import ProgressCallback, log_event
+from font_index import FONT_FAMILIES, resolve_font
+from radar_chart import RadarChartGenerator, CHART_FONT
+from participant_store import (ParticipantStore, normalize_date_columns, iter_frame_chunks, iter_excel_chunks,
+                               excel_row_count)
+from batch_engine import RenderPool, ConcurrencyController, BatchOptions, resolve_worker_count
+from evaluation_engine import EvaluationEngine
+from evaluation_export import export_evaluations
+from instrumentation import (StageTimer, MemoryTracker, write_timings, write_memory_report,
+                             profile_call, write_profile, process_peak_rss, reset_peak_rss)
+
+
+# 批量生成时进度回调的最短间隔（秒）
+PROGRESS_INTERVAL = 0.1
+
+# 限制同时处理的行数时，每生成多少份报告重置一次绘图状态
+MATPLOTLIB_RESET_EVERY = 200
 
 
 class FontManager:
@@ -38,39 +56,21 @@ class FontManager:
     
     def register_chinese_fonts(self) -> str:
         """注册中文字体并返回默认字体名称"""
-        # 字体配置
-        font_configs = {
-            "SimSun": [
-                r'C:\Windows\Fonts\SimSun.ttc',
-                'SimSun.ttc',
-                '/System/Library/Fonts/STSong.ttf',
-                '/usr/share/fonts/truetype/Simsun.ttf'
-            ],
-            "SimKai": [
-                r'C:\Windows\Fonts\SIMKAI.TTF',
-                'SIMKAI.TTF',
-            ],
-            "SimHei": [
-                r'C:\Windows\Fonts\simhei.ttf',
-                'simhei.ttf',
-                '/System/Library/Fonts/STHeiti-Light.ttc',
-                '/usr/share/fonts/truetype/simhei.ttf'
-            ]
-        }
-        
-        # 注册字体
-        for font_name, paths in font_configs.items():
-            for path in paths:
-                try:
-                    pdfmetrics.registerFont(TTFont(font_name, path))
-                    self.registered_fonts[font_name] = path
-                    logging.info(f"成功加载字体: {font_name} ({path})")
-                    if self.default_font is None:
-                        self.default_font = font_name
-                    break
-                except Exception as e:
-                    logging.debug(f"字体加载失败: {font_name} ({path}) - {str(e)}")
-                    continue
+        # 按字体索引查找（见 font_index.resolve_font），找不到时使用通用中文字体
+        for font_name in FONT_FAMILIES:
+            found = resolve_font(font_name, truetype_only=True)
+            if found is None:
+                logging.warning(f"未找到可用字体: {font_name}")
+                continue
+            path, subfont = found
+            try:
+                pdfmetrics.registerFont(TTFont(font_name, path, subfontIndex=subfont))
+                self.registered_fonts[font_name] = path
+                logging.info(f"成功加载字体: {font_name} ({path})")
+                if self.default_font is None:
+                    self.default_font = font_name
+            except Exception as e:
+                logging.warning(f"字体加载失败: {font_name} ({path}) - {str(e)}")
         
         return self.default_font or "SimSun"
 
@@ -166,8 +166,15 @@ class ReportGenerator:
         self.font_manager.register_chinese_fonts()
         self.style_manager = ReportStyleManager(self.font_manager)
         
-        # 初始化雷达图生成器
-        self.radar_generator = RadarChartGenerator()
+        # 分阶段计时器（默认不启用，批量生成时按需开启）
+        self.timer = StageTimer()
+        
+        # 初始化雷达图生成器（与报告生成器共用计时器）
+        self.radar_generator = RadarChartGenerator(
+            font_file=self.font_manager.registered_fonts.get(CHART_FONT))
+        self.radar_generator.timer = self.timer
+        # 当前报告的雷达图PNG缓冲区，PDF写出后立即释放
+        self._chart_buffer = None
         
         # 设置默认配置
         self.task_config = task_config or self._get_default_task_config()
@@ -175,6 +182,9 @@ class ReportGenerator:
         self.report_title = report_title  # 添加可自定义的报告标题
         self.disclaimer = disclaimer  # 添加可自定义的结果说明
         
+        # 编译评价规则（阈值数组 + 等级说明表），每个分数只需一次二分查找
+        self.evaluation_engine = EvaluationEngine(self.task_config, self.evaluation_dict)
+        
         # 更新雷达图生成器的变量列表
         all_variables = self.task_config["常规任务"] + self.task_config["特殊任务"]
         self.radar_generator.set_variables(all_variables)
@@ -205,51 +215,18 @@ class ReportGenerator:
             return "N/A"
     
     def _get_evaluation(self, task: str, score: float) -> str:
-        """获取评价内容 - 支持灵活分档"""
-        if pd.isna(score):
-            return "-"
-
-        if task in self.task_config["常规任务"] + self.task_config["特殊任务"]:
-            # 获取该项目的配置
-            if task in self.evaluation_dict:
-                config = self.evaluation_dict[task]
-                thresholds = config["thresholds"]
-                levels = config["levels"]
-                level_names = config.get("level_names", ["low", "mid", "high"])
-                
-                # 根据分数确定等级
-                level_index = 0
-                for threshold in thresholds:
-                    if score > threshold:
-                        level_index += 1
-                    else:
-                        break
-                
-                # 确保索引不超出范围
-                if level_index >= len(level_names):
-                    level_index = len(level_names) - 1
-                
-                level_key = level_names[level_index]
-                return levels.get(level_key, "-")
-            else:
-                # 向后兼容：使用旧的固定三档逻辑
-                if score <= 85:
-                    level = "low"
-                elif 86 <= score <= 115:
-                    level = "mid"
-                else:
-                    level = "high"
-                
-                # 如果有配置则使用配置，否则返回默认值
-                if task in self.evaluation_dict:
-                    return self.evaluation_dict[task]["levels"].get(level, "-")
-        
-        return "-"
+        """获取评价内容 - 支持灵活分档（使用编译后的评价规则）"""
+        return self.evaluation_engine.evaluate(task, score)
     
-    def _build_header(self, row: pd.Series, image_dir: Path = None) -> Table:
-        """构建报告头部 - 规范化个人信息表格"""
+    def _header_fields(self, row: pd.Series, disclaimer: str = None) -> List[List[str]]:
+        """
+        个人信息表格的内容（标签, 值），按规定顺序：姓名、ID编号、出生日期、年龄、测试日期、结果说明
+        
+        Args:
+            row: 数据行
+            disclaimer: 数据中没有结果说明时使用的说明，None表示使用 self.disclaimer
+        """
         
-        # 规范化个人信息字段，按指定顺序：姓名、ID编号、出生日期、年龄、测试日期、结果说明
         def get_field_value(field_name, default="-"):
             """获取字段值，如果不存在或为空则返回默认值"""
             if field_name in row and pd.notna(row[field_name]) and str(row[field_name]).strip():
@@ -265,15 +242,20 @@ class ReportGenerator:
             except (ValueError, TypeError):
                 age_value = f"{age_value}岁" if not age_value.endswith('岁') else age_value
 
-        # 创建个人信息表格 - 按规定顺序
-        info_data = [
+        return [
             ["姓　　名", get_field_value('姓名')],
             ["ID  编号", get_field_value('ID')],
             ["出生日期", get_field_value('生日')],
             ["年　　龄", age_value],
             ["测试日期", get_field_value('测试日期')],
-            ["结果说明", get_field_value('结果说明', self.disclaimer)]
+            ["结果说明", get_field_value('结果说明', self.disclaimer if disclaimer is None else disclaimer)]
         ]
+    
+    def _build_header(self, row: pd.Series, image_dir: Path = None) -> Table:
+        """构建报告头部 - 规范化个人信息表格"""
+        
+        # 创建个人信息表格 - 按规定顺序
+        info_data = self._header_fields(row)
         
         # 处理结果说明的格式
         special_note = info_data[-1][1]
@@ -301,23 +283,25 @@ class ReportGenerator:
         # 生成雷达图
         try:
             # 首先尝试生成雷达图
-            image_bytes = self.radar_generator.generate_radar_chart(row)
+            with self.timer.span('chart'):
+                image_bytes = self.radar_generator.generate_radar_chart(row)
             if image_bytes:
-                # 从字节数据创建Image对象
-                img = Image(io.BytesIO(image_bytes), width=8 * cm, height=8 * cm)
-                self.logger.info(f"成功生成雷达图: {row.get('ID', 'Unknown')}")
+                # 从字节数据创建Image对象（缓冲区在PDF写出后由 generate_single_report 关闭）
+                self._chart_buffer = io.BytesIO(image_bytes)
+                img = Image(self._chart_buffer, width=8 * cm, height=8 * cm)
+                log_event(self.logger, "report.radar_ok", id=row.get('ID', 'Unknown'))
             else:
                 raise ValueError("雷达图生成返回空数据")
         except Exception as e:
-            self.logger.warning(f"雷达图生成失败: {row.get('ID', 'Unknown')} - {str(e)}")
+            self.logger.warning("雷达图生成失败: %s - %s", row.get('ID', 'Unknown'), e)
             # 如果生成失败，尝试从文件加载（向后兼容）
             if image_dir:
                 img_path = Path(image_dir) / f"{row.get('ID', 'unknown')}.png"
                 try:
                     img = Image(str(img_path.resolve()), width=8 * cm, height=8 * cm)
-                    self.logger.info(f"从文件加载雷达图: {img_path}")
+                    log_event(self.logger, "report.radar_file", path=img_path)
                 except Exception as e2:
-                    self.logger.warning(f"图片文件加载也失败: {img_path} - {str(e2)}")
+                    self.logger.warning("图片文件加载也失败: %s - %s", img_path, e2)
                     img = Paragraph("[雷达图生成失败]", self.style_manager.styles['CN_Body'])
             else:
                 img = Paragraph("[雷达图生成失败]", self.style_manager.styles['CN_Body'])
@@ -347,18 +331,22 @@ class ReportGenerator:
             ])
         )
     
-    def _build_evaluation_table(self, row: pd.Series) -> Table:
-        """构建评价表格 - 支持文本类型的成绩/风格列，动态从第7列开始读取变量"""
+    def _evaluation_rows(self, row: pd.Series) -> Tuple[str, List[Tuple[str, str, str]]]:
+        """
+        评价表格的内容 - 支持文本类型的成绩/风格列，动态从第7列开始读取变量
+        
+        Returns:
+            (成绩列标题, [(测评项目, 成绩, 描述)])
+        """
         
         # 动态从第7列开始读取变量名（索引从0开始，所以第7列是索引6）
         all_columns = list(row.index)
         if len(all_columns) > 6:
             score_columns = all_columns[6:]  # 从第7列开始
-            self.logger.info(f"动态读取评价变量（从第7列开始）: {score_columns}")
         else:
             # 如果列数不足7列，使用传统方法
             score_columns = [col for col in row.index if col not in ['姓名', 'ID', '生日', '年龄', '测试日期', '结果说明', '性别']]
-            self.logger.warning(f"列数不足7列，使用传统方法筛选变量: {score_columns}")
+            self.logger.warning("列数不足7列，使用传统方法筛选变量: %s", score_columns)
         
         # 判断是否为文本类型（风格）数据
         is_text_data = False
@@ -374,14 +362,13 @@ class ReportGenerator:
         # 根据数据类型设置列标题
         score_header = "风格" if is_text_data else "成绩"
         
-        data = [
-            [Paragraph("测评项目", self.style_manager.styles['TableHeader']),
-             Paragraph(score_header, self.style_manager.styles['TableHeader']),
-             Paragraph("描述", self.style_manager.styles['TableHeader'])]
-        ]
+        rows = []
 
+        # 批量生成时等级矩阵已按整列预先计算，这里只需按行索引
+        level_codes = getattr(row, 'level_codes', None)
+        
         # 使用动态读取的变量列表
-        for task in score_columns:
+        for j, task in enumerate(score_columns):
             if task in row.index:
                 score_value = row[task]
                 
@@ -391,17 +378,34 @@ class ReportGenerator:
                     score_display = str(score_value) if pd.notna(score_value) else "-"
                 else:
                     # 数值数据进行评估
-                    evaluation = self._get_evaluation(task, score_value) if pd.notna(score_value) else "-"
+                    if level_codes is not None:
+                        evaluation = self.evaluation_engine.level_text(task, level_codes[j])
+                    else:
+                        evaluation = self._get_evaluation(task, score_value)
                     try:
                         score_display = f"{float(score_value):.0f}" if pd.notna(score_value) else "-"
                     except (ValueError, TypeError):
                         score_display = str(score_value) if pd.notna(score_value) else "-"
                 
-                data.append([
-                    Paragraph(task, self.style_manager.styles['Data_Body']),
-                    Paragraph(score_display, self.style_manager.styles['Data_Body']),
-                    Paragraph(evaluation, self.style_manager.styles['CN_Body'])
-                ])
+                rows.append((task, score_display, evaluation))
+        
+        return score_header, rows
+    
+    def _build_evaluation_table(self, row: pd.Series) -> Table:
+        """构建评价表格"""
+        score_header, rows = self._evaluation_rows(row)
+        
+        data = [
+            [Paragraph("测评项目", self.style_manager.styles['TableHeader']),
+             Paragraph(score_header, self.style_manager.styles['TableHeader']),
+             Paragraph("描述", self.style_manager.styles['TableHeader'])]
+        ]
+        for task, score_display, evaluation in rows:
+            data.append([
+                Paragraph(task, self.style_manager.styles['Data_Body']),
+                Paragraph(score_display, self.style_manager.styles['Data_Body']),
+                Paragraph(evaluation, self.style_manager.styles['CN_Body'])
+            ])
 
         return Table(
             data,
@@ -434,7 +438,7 @@ class ReportGenerator:
         生成单个报告
         
         Args:
-            row: 数据行
+            row: 数据行（pd.Series 或 ParticipantRecord）
             output_path: 输出路径
             image_dir: 图片目录（可选，用于向后兼容）
             
@@ -442,38 +446,54 @@ class ReportGenerator:
             bool: 是否成功生成
         """
         try:
-            # 创建PDF文档 - 允许表格分页
-            doc = SimpleDocTemplate(
-                str(output_path),
-                pagesize=A4,
-                leftMargin=1.5 * cm,
-                rightMargin=1.5 * cm,
-                topMargin=1 * cm,
-                bottomMargin=0.5 * cm,
-                pageCompression=0,
-                invariant=True,
-                allowSplitting=1,  # 允许分页
-                showBoundary=0,
-            )
-
-            elements = []
+            # 先在内存中生成PDF，再一次性写入文件
+            buffer = io.BytesIO()
             
-            # 添加标题
-            elements.append(Paragraph(
-                self.report_title,
-                self.style_manager.styles['ReportTitle']
-            ))
+            with self.timer.span('layout'):
+                # 创建PDF文档 - 允许表格分页
+                doc = SimpleDocTemplate(
+                    buffer,
+                    pagesize=A4,
+                    leftMargin=1.5 * cm,
+                    rightMargin=1.5 * cm,
+                    topMargin=1 * cm,
+                    bottomMargin=0.5 * cm,
+                    pageCompression=0,
+                    invariant=True,
+                    allowSplitting=1,  # 允许分页
+                    showBoundary=0,
+                )
 
-            # 添加头部信息（现在会自动生成雷达图）
-            elements.append(self._build_header(row, Path(image_dir) if image_dir else None))
-            elements.append(Spacer(1, 0.5 * cm))
-            
-            # 添加评价表格（支持跨页和重复表头）
-            elements.append(self._build_evaluation_table(row))
+                elements = []
+                
+                # 添加标题
+                elements.append(Paragraph(
+                    self.report_title,
+                    self.style_manager.styles['ReportTitle']
+                ))
+
+                # 添加头部信息（现在会自动生成雷达图）
+                elements.append(self._build_header(row, Path(image_dir) if image_dir else None))
+                elements.append(Spacer(1, 0.5 * cm))
+                
+                # 添加评价表格（支持跨页和重复表头）
+                elements.append(self._build_evaluation_table(row))
 
             # 生成PDF
-            doc.build(elements)
-            self.logger.info(f"成功生成报告: {output_path}")
+            with self.timer.span('build'):
+                doc.build(elements)
+            
+            # 排版完成后立即释放流式元素（其中的雷达图PNG字节较大）
+            del elements, doc
+            
+            with self.timer.span('write'):
+                # 直接写出缓冲区内容，不再复制一份PDF字节
+                with buffer.getbuffer() as pdf_bytes, open(output_path, 'wb') as f:
+                    f.write(pdf_bytes)
+                    size = pdf_bytes.nbytes
+                buffer.close()
+            self.timer.add_bytes(size)
+            log_event(self.logger, "report.written", path=output_path)
             return True
             
         except Exception as e:
@@ -487,13 +507,113 @@ class ReportGenerator:
             except:
                 pass
             
-            self.logger.error(f"报告生成失败（{name}）：{str(e)}")
+            self.logger.error(f"报告生成失败（{name}）：{str(e)}", exc_info=True)
             return False
+        
+        finally:
+            if self._chart_buffer is not None:
+                self._chart_buffer.close()
+                self._chart_buffer = None
+    
+    def reset_render_state(self):
+        """重置绘图状态（长批次中每隔一定行数调用一次）"""
+        self.radar_generator.reset_state()
+    
+    def get_generator_settings(self) -> Dict[str, Any]:
+        """获取重建报告生成器所需的设置（用于多进程渲染）"""
+        return {
+            "task_config": self.task_config,
+            "evaluation_dict": self.evaluation_dict,
+            "report_title": self.report_title,
+            "disclaimer": self.disclaimer,
+        }
+    
+    def apply_settings(self, settings: Dict[str, Any]):
+        """
+        就地更新设置（键同 get_generator_settings，只需包含改变的项），不重新注册字体和样式
+        
+        评分配置改变时重新编译评价规则并更新雷达图的变量列表。
+        """
+        if 'report_title' in settings:
+            self.report_title = settings['report_title']
+        if 'disclaimer' in settings:
+            self.disclaimer = settings['disclaimer']
+        if 'task_config' in settings or 'evaluation_dict' in settings:
+            if 'task_config' in settings:
+                self.task_config = settings['task_config'] or self._get_default_task_config()
+            if 'evaluation_dict' in settings:
+                self.evaluation_dict = settings['evaluation_dict'] or self._get_default_evaluation_dict()
+            self.evaluation_engine = EvaluationEngine(self.task_config, self.evaluation_dict)
+            self.radar_generator.set_variables(self.task_config["常规任务"] + self.task_config["特殊任务"])
+    
+    def build_report_filename(self, row, index: int, filename_mode: str = "name_custom",
+                              filename_separator: str = "") -> Tuple[str, str]:
+        """
+        根据命名模式生成报告文件名
+        
+        Args:
+            row: 数据行
+            index: 行号（从0开始，用于姓名和ID都为空时的兜底名称）
+            filename_mode: 文件命名模式，见 generate_batch_reports
+            filename_separator: 自定义内容
+            
+        Returns:
+            (显示名称, 文件名)
+        """
+        if filename_mode == "id_only":
+            # 模式1：ID自定义内容报告
+            id_value = row.get('ID', '')
+            if pd.notna(id_value) and str(id_value).strip():
+                base_name = str(id_value).strip()
+            else:
+                # 如果ID为空，使用行号
+                base_name = f"报告_{index + 1}"
+        else:
+            # 模式2：姓名自定义内容报告
+            name_value = row.get('姓名', '')
+            if pd.isna(name_value) or not str(name_value).strip():
+                # 如果姓名为空，使用ID
+                id_value = row.get('ID', '')
+                if pd.notna(id_value) and str(id_value).strip():
+                    base_name = str(id_value).strip()
+                else:
+                    base_name = f"报告_{index + 1}"
+            else:
+                base_name = "".join(c for c in str(name_value) if c.isalnum() or c in (' ', '-', '_')).rstrip()
+                if not base_name:  # 如果处理后为空
+                    base_name = f"报告_{index + 1}"
+        
+        # 构建文件名：ID/姓名 + 自定义内容 + 报告.pdf
+        custom_content = filename_separator.strip() if filename_separator.strip() else ""
+        if custom_content:
+            filename = f"{base_name}{custom_content}报告.pdf"
+        else:
+            filename = f"{base_name}报告.pdf"
+        return base_name, filename
+    
+    def export_evaluations(self, data_file: str, output_file: str,
+                           data: Optional[pd.DataFrame] = None) -> Dict[str, Any]:
+        """
+        仅评价模式 - 导出所有受试者各测评项目的成绩、等级和说明，不生成PDF
+        
+        Args:
+            data_file: Excel数据文件路径
+            output_file: 导出文件路径（.csv / .parquet / .xlsx）
+            data: 已读取的数据（可选，如验证时读取的数据；提供时不再读取data_file）
+            
+        Returns:
+            Dict: 导出结果统计
+        """
+        if data is not None:
+            data = normalize_date_columns(data)
+        return export_evaluations(data_file, output_file, self.task_config, self.evaluation_dict, data=data)
     
     def generate_batch_reports(self, data_file: str, output_dir: str, image_dir: str = None,
                              progress_callback: Optional[Callable] = None,
                              filename_mode: str = "name_custom",
-                             filename_separator: str = "") -> Dict[str, Any]:
+                             filename_separator: str = "",
+                             data: Optional[pd.DataFrame] = None,
+                             options: Optional[BatchOptions] = None) -> Dict[str, Any]:
         """
         批量生成报告
         
@@ -506,10 +626,28 @@ class ReportGenerator:
                 - "id_only": 实际生成 ID自定义内容报告.pdf（GUI显示为ID[自定义内容]报告）
                 - "name_custom": 实际生成 姓名自定义内容报告.pdf（GUI显示为姓名[自定义内容]报告，如果姓名为空则使用ID）
             filename_separator: 自定义内容（在GUI中显示在[]中，实际文件名直接连接）
+            data: 已读取的数据（可选，如验证时读取的数据；提供时不再读取data_file，日期列会被原地规范化）
+            options: 执行选项（进程数、单行时间限制、内存限制、常驻进程池、耗时和内存统计等，见 BatchOptions），
+                None表示全部使用默认值（在当前进程中逐个生成）
             
         Returns:
-            Dict: 生成结果统计
+            Dict: 生成结果统计（peak_rss 为主进程本次生成中的峰值RSS，多进程渲染时 worker_peak_rss 为单个渲染进程的峰值RSS）
         """
+        options = options or BatchOptions()
+        if options.profile:
+            if options.workers != 1:
+                self.logger.info("性能分析模式下在当前进程中逐个生成报告")
+            results, profiler = profile_call(
+                self.generate_batch_reports, data_file, output_dir, image_dir,
+                progress_callback, filename_mode, filename_separator, data=data,
+                options=replace(options, workers=1, profile=False, pool=None, row_timeout=None))
+            try:
+                results.update(write_profile(profiler, output_dir))
+                self.logger.info(f"性能分析结果已保存: {results['profile_summary_file']}")
+            except Exception as e:
+                results["errors"].append(f"性能分析结果写入失败: {str(e)}")
+            return results
+
         results = {
             "total": 0,
             "success": 0,
@@ -517,102 +655,236 @@ class ReportGenerator:
             "errors": []
         }
         
+        reset_peak_rss()
+        timer = self.timer
+        timer.reset()
+        timer.enabled = bool(options.timing or options.timing_format)
+        timer.start()
+        memory = None
+        if options.memory_sample_every > 0:
+            memory = MemoryTracker(options.memory_sample_every, options.trace_allocations)
+        
         try:
-            # 读取数据
-            df = pd.read_excel(data_file)
-            results["total"] = len(df)
+            # 读取数据、规范化日期列并转换为紧凑的列式存储（限制行数时逐块读取和转换）
+            bounded = options.max_rows_in_flight > 0
+            expected = 0
+            if bounded:
+                expected = len(data) if data is not None else (excel_row_count(data_file) or 0)
+            stores = self._iter_stores(data_file, data, options.max_rows_in_flight)
+            data = None
+            first = next(stores, None)
+            if first is not None:
+                expected = max(expected, len(first[1]))
             
             # 创建输出目录
             output_path = Path(output_dir)
             output_path.mkdir(parents=True, exist_ok=True)
             
-            # 转换日期列
-            date_cols = ['生日', '测试日期']
-            for col in date_cols:
-                if col in df.columns:
-                    df[col] = df[col].astype(str).str.replace(r'\D', '', regex=True).str.zfill(8)
-            
-            # 设置进度回调
+            # 设置进度回调（按时间节流，附带速度和预计剩余时间）
             if progress_callback:
                 progress_callback(0, "开始生成报告...")
+            progress = ProgressCallback(progress_callback, interval=PROGRESS_INTERVAL)
+            progress.set_total(expected)
             
-            # 逐个生成报告
-            for index, (_, row) in enumerate(df.iterrows()):
-                try:
-                    # 根据命名模式生成文件名
-                    if filename_mode == "id_only":
-                        # 模式1：ID自定义内容报告
-                        id_value = row.get('ID', '')
-                        if pd.notna(id_value) and str(id_value).strip():
-                            base_name = str(id_value).strip()
-                        else:
-                            # 如果ID为空，使用行号
-                            base_name = f"报告_{index + 1}"
-                        
-                        # 构建文件名：ID自定义内容报告.pdf
-                        custom_content = filename_separator.strip() if filename_separator.strip() else ""
-                        if custom_content:
-                            filename = f"{base_name}{custom_content}报告.pdf"
-                        else:
-                            filename = f"{base_name}报告.pdf"
-                        output_file = output_path / filename
-                    else:
-                        # 模式2：姓名自定义内容报告
-                        name_value = row.get('姓名', '')
-                        if pd.isna(name_value) or not str(name_value).strip():
-                            # 如果姓名为空，使用ID
-                            id_value = row.get('ID', '')
-                            if pd.notna(id_value) and str(id_value).strip():
-                                base_name = str(id_value).strip()
-                            else:
-                                base_name = f"报告_{index + 1}"
-                        else:
-                            base_name = "".join(c for c in str(name_value) if c.isalnum() or c in (' ', '-', '_')).rstrip()
-                            if not base_name:  # 如果处理后为空
-                                base_name = f"报告_{index + 1}"
-                        
-                        # 构建文件名：姓名自定义内容报告.pdf
-                        custom_content = filename_separator.strip() if filename_separator.strip() else ""
-                        if custom_content:
-                            filename = f"{base_name}{custom_content}报告.pdf"
-                        else:
-                            filename = f"{base_name}报告.pdf"
-                        output_file = output_path / filename
-                    
-                    # 生成报告
-                    if self.generate_single_report(row, str(output_file), image_dir):
-                        results["success"] += 1
-                    else:
-                        results["failed"] += 1
-                        # 安全获取姓名用于错误信息
-                        error_name = base_name if base_name else "未知"
-                        results["errors"].append(f"{error_name}: 生成失败")
-                    
-                    # 更新进度 - 使用base_name作为显示名称
-                    progress_name = base_name if base_name else f"第{index + 1}个"
-                    
-                    if progress_callback:
-                        progress = (index + 1) / results["total"] * 100
-                        progress_callback(progress, f"已完成: {progress_name}")
-                        
-                except Exception as e:
+            workers, memory_limit = options.workers, options.memory_limit_mb * 1048576 or None
+            pool = options.pool
+            own_pool = pool is None
+            worker_count = resolve_worker_count(workers, expected)
+            controller = None
+            if not own_pool:
+                # 常驻进程池：只发送改变的设置，沿用已启动的工作进程（缺少的进程在 run_batch 中补足）
+                pool.update_settings(self.get_generator_settings())
+                active = pool.worker_count
+                if not workers:
+                    controller = ConcurrencyController(max(worker_count, active), memory_limit)
+                    controller.resume(active)
+                worker_count = active
+            elif not workers and worker_count > 1:
+                controller = ConcurrencyController(worker_count, memory_limit)
+                worker_count = controller.initial_workers(expected)
+            reset_every = MATPLOTLIB_RESET_EVERY if bounded else 0
+            
+            def on_result(index, success, name, error, row_timing=None):
+                timer.add_row(row_timing)
+                if memory:
+                    memory.on_row()
+                if success:
+                    results["success"] += 1
+                else:
                     results["failed"] += 1
-                    # 安全获取姓名用于错误信息
-                    try:
-                        error_name = base_name if 'base_name' in locals() and base_name else f"第{index + 1}个"
-                    except:
-                        error_name = f"第{index + 1}个"
-                    
-                    error_msg = f"{error_name}: {str(e)}"
-                    results["errors"].append(error_msg)
-                    self.logger.error(error_msg)
+                    results["errors"].append(f"{name}: {error}")
+                progress.update(f"已完成: {name}", success)
             
-            if progress_callback:
-                progress_callback(100, "所有报告生成完成")
+            # 多进程渲染：每块数据放入共享内存，工作进程只接收行号；单行超时或崩溃只影响该行
+            if own_pool and (controller or worker_count > 1 or options.row_timeout):
+                pool = RenderPool(worker_count, self.get_generator_settings(),
+                                  row_timeout=options.row_timeout, row_retries=options.row_retries,
+                                  controller=controller)
+            with pool if own_pool and pool else nullcontext():
+                if memory:
+                    memory.start(pids=pool.worker_pids if pool else None)
+                
+                chunks = itertools.chain([first], stores) if first is not None else ()
+                for offset, store in chunks:
+                    results["total"] += len(store)
+                    progress.total = max(progress.total, results["total"])
+                    if pool:
+                        quarantined = pool.run_batch(store, output_path, image_dir, filename_mode,
+                                                     filename_separator, on_result, timing=timer.enabled,
+                                                     index_offset=offset, reset_every=reset_every,
+                                                     controller=controller)
+                        if quarantined:
+                            results.setdefault("quarantined", []).extend(self._describe_quarantined(
+                                store, quarantined, filename_mode, filename_separator, offset))
+                    else:
+                        self._generate_sequential(store, output_path, image_dir, filename_mode,
+                                                  filename_separator, progress, results, memory,
+                                                  index_offset=offset, reset_every=reset_every)
+                    # 渲染完一块后立即释放，读取下一块时内存中只有一块数据
+                    store = None
+                if memory:
+                    memory.stop()
+            
+            if pool:
+                results["concurrency"] = controller.summary() if controller else {
+                    "mode": "fixed", "initial": worker_count, "final": worker_count, "changes": []}
+                results["worker_peak_rss"] = pool.peak_worker_rss if own_pool else pool.measure_peak_rss()
+                if not own_pool:
+                    results["concurrency"]["persistent"] = True
+            else:
+                results["concurrency"] = {"mode": "sequential", "initial": 1, "final": 1, "changes": []}
+            
+            progress.finish("所有报告生成完成")
                 
         except Exception as e:
             error_msg = f"批量生成失败: {str(e)}"
             results["errors"].append(error_msg)
             self.logger.error(error_msg)
+        finally:
+            timer.stop()
+        
+        results["peak_rss"] = process_peak_rss()
+        
+        if timer.enabled:
+            results["timings"] = timer.summary()
+            if options.timing_format:
+                try:
+                    results["timings_file"] = write_timings(results["timings"], output_dir, options.timing_format)
+                except Exception as e:
+                    results["errors"].append(f"耗时统计写入失败: {str(e)}")
+            timer.enabled = False
         
-        return results
\ No newline at end of file
+        if memory and memory.samples:
+            results["memory"] = memory.summary()
+            try:
+                results["memory_file"] = write_memory_report(results["memory"], output_dir)
+            except Exception as e:
+                results["errors"].append(f"内存统计写入失败: {str(e)}")
+        
+        return results
+    
+    def _iter_stores(self, data_file: str, data: Optional[pd.DataFrame],
+                     chunk_rows: int = 0) -> Iterator[Tuple[int, ParticipantStore]]:
+        """
+        读取数据并转换为已计算评价等级的列式存储
+        
+        Args:
+            data_file: Excel数据文件路径
+            data: 已读取的数据（可选）
+            chunk_rows: 每块的行数，0表示整体转换为一个存储
+            
+        Yields:
+            (本块第一行在数据文件中的行号, 存储)
+        """
+        timer = self.timer
+        if chunk_rows <= 0:
+            if data is None:
+                with timer.span('load'):
+                    data = pd.read_excel(data_file)
+            frames = iter([data])
+        elif data is None:
+            frames = iter_excel_chunks(data_file, chunk_rows)
+        else:
+            # 生成器持有数据的引用，下面清除局部变量后仍可按块读取
+            frames = iter_frame_chunks(data, chunk_rows)
+        data = None
+        
+        offset = 0
+        while True:
+            with timer.span('load'):
+                df = next(frames, None)
+            if df is None:
+                return
+            with timer.span('normalize_dates'):
+                df = normalize_date_columns(df)
+            with timer.span('store'):
+                store = ParticipantStore.from_dataframe(df)
+            del df
+            
+            # 按整列计算所有受试者的评价等级
+            with timer.span('evaluate'):
+                store.levels = self.evaluation_engine.classify(store.score_columns, store.scores)
+            yield offset, store
+            offset += len(store)
+            store = None
+    
+    def _describe_quarantined(self, store: ParticipantStore, quarantined: List[Dict[str, Any]],
+                              filename_mode: str, filename_separator: str,
+                              index_offset: int = 0) -> List[Dict[str, Any]]:
+        """为被隔离的行补充Excel行号、ID和显示名称，便于定位问题数据"""
+        described = []
+        for item in quarantined:
+            row = store.record(item['index'])
+            index = item['index'] + index_offset
+            try:
+                name = self.build_report_filename(row, index, filename_mode, filename_separator)[0]
+            except Exception:
+                name = f"第{index + 1}个"
+            described.append(dict(item, index=index, excel_row=index + 2, id=str(row.get('ID', '')), name=name))
+        return described
+    
+    def _generate_sequential(self, store: ParticipantStore, output_path: Path, image_dir: Optional[str],
+                             filename_mode: str, filename_separator: str,
+                             progress: ProgressCallback, results: Dict[str, Any],
+                             memory: Optional[MemoryTracker] = None,
+                             index_offset: int = 0, reset_every: int = 0):
+        """在当前进程中逐个生成报告（index_offset 为本块第一行的行号，reset_every 见 RenderPool.run_batch）"""
+        for index, row in enumerate(store, index_offset):
+            if reset_every and index and index % reset_every == 0:
+                self.reset_render_state()
+            try:
+                # 根据命名模式生成文件名
+                base_name, filename = self.build_report_filename(
+                    row, index, filename_mode, filename_separator)
+                output_file = output_path / filename
+                
+                # 生成报告
+                self.timer.begin_row()
+                success = self.generate_single_report(row, str(output_file), image_dir)
+                self.timer.end_row(index)
+                if memory:
+                    memory.on_row()
+                if success:
+                    results["success"] += 1
+                else:
+                    results["failed"] += 1
+                    # 安全获取姓名用于错误信息
+                    error_name = base_name if base_name else "未知"
+                    results["errors"].append(f"{error_name}: 生成失败")
+                
+                # 更新进度 - 使用base_name作为显示名称
+                progress_name = base_name if base_name else f"第{index + 1}个"
+                progress.update(f"已完成: {progress_name}", success)
+                    
+            except Exception as e:
+                results["failed"] += 1
+                # 安全获取姓名用于错误信息
+                try:
+                    error_name = base_name if 'base_name' in locals() and base_name else f"第{index + 1}个"
+                except:
+                    error_name = f"第{index + 1}个"
+                
+                error_msg = f"{error_name}: {str(e)}"
+                results["errors"].append(error_msg)
+                self.logger.error(error_msg)
+                progress.update(f"失败: {error_name}", False)
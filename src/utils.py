@@ -5,15 +5,107 @@
 
 import os
 import sys
+import atexit
+import queue
 import logging
+import logging.handlers
+import threading
+import time
+from collections import deque, OrderedDict
 from datetime import datetime
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Any
 import tkinter as tk
 from tkinter import messagebox
 
-def setup_logging(log_dir: str = "logs") -> logging.Logger:
-    """设置日志系统"""
+# 当前日志文件路径（由 setup_logging 设置）
+_log_file: Optional[Path] = None
+
+# 后台写日志的监听器（由 setup_logging 启动）
+_log_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class SamplingFilter(logging.Filter):
+    """
+    重复日志采样过滤器
+    
+    按 (记录器, 级别, 事件名或消息模板) 计数：前 burst 条全部输出，之后每 every 条输出一条，
+    并在消息后注明省略的条数。ERROR 及以上级别不采样。
+    log_event 的记录按事件名计数；其余记录按格式化前的 record.msg 计数，
+    因此热路径日志应使用 %s 占位符而非 f-string。
+    计数最多保留 maxsize 种，超出时淘汰最久未出现的一种，长时间运行时内存不会增长。
+    """
+    
+    def __init__(self, burst: int = 5, every: int = 100, maxsize: int = 1024):
+        super().__init__()
+        self.burst = burst
+        self.every = every
+        self.maxsize = maxsize
+        self._counts: 'OrderedDict[tuple, int]' = OrderedDict()
+        self._lock = threading.Lock()
+    
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.ERROR:
+            return True
+        key = (record.name, record.levelno, getattr(record, 'event', None) or str(record.msg))
+        with self._lock:
+            count = self._counts.get(key, 0) + 1
+            self._counts[key] = count
+            self._counts.move_to_end(key)
+            while len(self._counts) > self.maxsize:
+                self._counts.popitem(last=False)
+        if count <= self.burst:
+            return True
+        if (count - self.burst) % self.every == 0:
+            record.msg = f"{record.msg}（同类日志已省略 {self.every - 1} 条）"
+            return True
+        return False
+
+
+class _EventFields:
+    """结构化事件字段 - 仅在日志真正输出时才求值和格式化"""
+    
+    __slots__ = ('fields',)
+    
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+    
+    def __str__(self) -> str:
+        parts = []
+        for key, value in self.fields.items():
+            if callable(value):
+                value = value()
+            parts.append(f"{key}={value!r}")
+        return " ".join(parts)
+
+
+def log_event(logger: logging.Logger, event: str, level: int = logging.DEBUG, **fields):
+    """
+    记录结构化日志事件（如逐行调试信息）
+    
+    未启用对应级别时直接返回，不构造任何字符串；字段值可以是无参函数
+    （如 values=lambda: dict(row)），只在输出时才调用。
+    """
+    if logger.isEnabledFor(level):
+        logger.log(level, "%s %s", event, _EventFields(fields), extra={'event': event})
+
+
+def setup_logging(log_dir: str = "logs", level: int = logging.INFO,
+                  max_bytes: int = 10 * 1024 * 1024, backup_count: int = 5) -> logging.Logger:
+    """
+    设置日志系统
+    
+    日志记录只在调用线程中入队，文件和控制台输出由后台线程完成；
+    日志文件按大小轮转（默认单个10MB，保留5个备份）。
+    
+    Args:
+        log_dir: 日志目录
+        level: 日志级别
+        max_bytes: 单个日志文件的最大字节数
+        backup_count: 保留的轮转备份数量
+    """
+    global _log_file, _log_listener
+    
     # 创建日志目录
     log_path = Path(log_dir)
     log_path.mkdir(exist_ok=True)
@@ -21,29 +113,132 @@ def setup_logging(log_dir: str = "logs") -> logging.Logger:
     # 创建日志文件名（包含日期）
     log_file = log_path / f"app_{datetime.now().strftime('%Y%m%d')}.log"
     
-    # 配置日志格式
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.FileHandler(log_file, encoding='utf-8'),
-            logging.StreamHandler(sys.stdout)
-        ]
-    )
+    if _log_listener is None:
+        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+        file_handler = logging.handlers.RotatingFileHandler(
+            log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setFormatter(formatter)
+        
+        # 调用线程只负责入队，I/O由监听线程完成
+        log_queue = queue.SimpleQueue()
+        queue_handler = logging.handlers.QueueHandler(log_queue)
+        queue_handler.addFilter(SamplingFilter())
+        
+        root_logger = logging.getLogger()
+        root_logger.setLevel(level)
+        root_logger.addHandler(queue_handler)
+        
+        _log_listener = logging.handlers.QueueListener(log_queue, file_handler, stream_handler)
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+        _log_file = log_file
     
     return logging.getLogger(__name__)
 
-def validate_excel_file(file_path: str) -> Tuple[bool, str]:
-    """验证Excel文件是否有效"""
+
+def get_log_file() -> Optional[Path]:
+    """获取当前日志文件路径（未调用 setup_logging 时为None）"""
+    return _log_file
+
+class BufferedTextHandler(logging.Handler):
+    """
+    GUI日志处理器 - 批量刷新、限制行数
+    
+    emit() 只把格式化后的日志放入缓冲区（可在任意线程调用）；
+    由界面线程定时调用 flush_to_widget() 一次性插入文本框，
+    文本框只保留最近 max_lines 行，更早的内容可在完整日志文件中查看。
+    """
+    
+    def __init__(self, text_widget, max_lines: int = 1000, flush_interval: int = 200):
+        super().__init__()
+        self.text_widget = text_widget
+        self.max_lines = max_lines
+        self.flush_interval = flush_interval
+        # 缓冲区本身也有上限，界面来不及刷新时只保留最新的记录
+        self._buffer = deque(maxlen=max_lines)
+        self._lock = threading.Lock()
+        self._pending_dropped = 0
+        self.line_count = 0
+        self.trimmed_count = 0
+        self.on_trim = None
+        self._timer = None
+    
+    def emit(self, record: logging.LogRecord):
+        try:
+            msg = self.format(record)
+        except Exception:
+            self.handleError(record)
+            return
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self._pending_dropped += 1
+            self._buffer.append(msg)
+    
+    def start(self):
+        """启动定时刷新（需在界面线程调用）"""
+        if self._timer is None:
+            self._timer = self.text_widget.after(self.flush_interval, self._tick)
+    
+    def stop(self):
+        """停止定时刷新"""
+        if self._timer is not None:
+            self.text_widget.after_cancel(self._timer)
+            self._timer = None
+    
+    def _tick(self):
+        self._timer = None
+        self.flush_to_widget()
+        self.start()
+    
+    def flush_to_widget(self):
+        """将缓冲的日志一次性写入文本框，并裁剪超出上限的旧行"""
+        with self._lock:
+            if not self._buffer:
+                return
+            lines = list(self._buffer)
+            self._buffer.clear()
+            dropped, self._pending_dropped = self._pending_dropped, 0
+        
+        widget = self.text_widget
+        widget.insert(tk.END, '\n'.join(lines) + '\n')
+        self.line_count += len(lines)
+        excess = self.line_count - self.max_lines
+        if excess > 0:
+            widget.delete('1.0', f'{excess + 1}.0')
+            self.line_count -= excess
+        if excess > 0 or dropped:
+            self.trimmed_count += max(excess, 0) + dropped
+            if self.on_trim:
+                self.on_trim(self.trimmed_count)
+        widget.see(tk.END)
+    
+    def reset(self):
+        """清空文本框后重置计数"""
+        with self._lock:
+            self._buffer.clear()
+            self._pending_dropped = 0
+        self.line_count = 0
+        self.trimmed_count = 0
+
+
+def read_excel_file(file_path: str) -> Tuple[bool, str, Optional[Any]]:
+    """
+    验证并读取Excel数据文件
+    
+    Returns:
+        (是否有效, 提示信息, 读取的DataFrame；无效时为None)
+    """
     if not file_path:
-        return False, "请选择Excel文件"
+        return False, "请选择Excel文件", None
     
     path = Path(file_path)
     if not path.exists():
-        return False, "文件不存在"
+        return False, "文件不存在", None
     
     if not path.suffix.lower() in ['.xlsx', '.xls']:
-        return False, "文件格式不正确，请选择Excel文件"
+        return False, "文件格式不正确，请选择Excel文件", None
     
     try:
         import pandas as pd
@@ -54,15 +249,28 @@ def validate_excel_file(file_path: str) -> Tuple[bool, str]:
         missing_columns = [col for col in required_columns if col not in df.columns]
         
         if missing_columns:
-            return False, f"Excel文件缺少必要的列: {', '.join(missing_columns)}"
+            return False, f"Excel文件缺少必要的列: {', '.join(missing_columns)}", None
         
         if len(df) == 0:
-            return False, "Excel文件没有数据行"
+            return False, "Excel文件没有数据行", None
         
-        return True, "文件验证通过"
+        return True, "文件验证通过", df
         
     except Exception as e:
-        return False, f"文件读取错误: {str(e)}"
+        return False, f"文件读取错误: {str(e)}", None
+
+def validate_excel_file(file_path: str) -> Tuple[bool, str]:
+    """验证Excel文件是否有效"""
+    is_valid, message, _ = read_excel_file(file_path)
+    return is_valid, message
+
+def file_signature(file_path: str) -> Optional[Tuple[str, int, int]]:
+    """文件签名（路径、修改时间、大小），用于判断已读取的数据是否仍然有效"""
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+    return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size
 
 def validate_image_directory(dir_path: str) -> Tuple[bool, str]:
     """验证图片目录是否有效（可选）"""
@@ -76,8 +284,9 @@ def validate_image_directory(dir_path: str) -> Tuple[bool, str]:
     if not path.is_dir():
         return False, "路径不是一个目录"
     
-    # 检查是否有图片文件
-    image_files = list(path.glob("*.png")) + list(path.glob("*.jpg")) + list(path.glob("*.jpeg"))
+    # 检查是否有图片文件（只遍历一次目录）
+    image_files = [entry for entry in os.scandir(path)
+                   if entry.is_file() and Path(entry.name).suffix.lower() in ('.png', '.jpg', '.jpeg')]
     if not image_files:
         return False, "目录中没有找到图片文件（支持PNG、JPG格式）"
     
@@ -143,6 +352,25 @@ def get_resource_path(relative_path: str) -> str:
     
     return os.path.join(base_path, relative_path)
 
+# 缓存目录所在的应用数据子目录名
+APP_DIR_NAME = "PsychReportGenerator"
+
+def get_cache_dir() -> Path:
+    """
+    获取缓存目录（编译后配置、字体索引等），与启动时的工作目录无关
+    
+    Windows 为 %LOCALAPPDATA%，macOS 为 ~/Library/Caches，其他系统为 $XDG_CACHE_HOME（默认 ~/.cache）
+    下的 PsychReportGenerator/cache。目录在首次写入缓存时创建。
+    """
+    home = Path.home()
+    if sys.platform == 'win32':
+        base = Path(os.environ.get('LOCALAPPDATA') or home / 'AppData' / 'Local')
+    elif sys.platform == 'darwin':
+        base = home / 'Library' / 'Caches'
+    else:
+        base = Path(os.environ.get('XDG_CACHE_HOME') or home / '.cache')
+    return base / APP_DIR_NAME / 'cache'
+
 def format_file_size(size_bytes: int) -> str:
     """格式化文件大小显示"""
     if size_bytes == 0:
@@ -163,27 +391,92 @@ def safe_filename(filename: str) -> str:
         filename = filename.replace(char, '_')
     return filename
 
+def format_duration(seconds: float) -> str:
+    """格式化时长显示（如 1小时02分、3分05秒、12秒）"""
+    seconds = int(round(max(seconds, 0)))
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}小时{minutes:02d}分"
+    if minutes:
+        return f"{minutes}分{secs:02d}秒"
+    return f"{secs}秒"
+
 class ProgressCallback:
-    """进度回调类"""
+    """
+    进度回调类
+    
+    按时间节流（默认每0.1秒最多回调一次，最后一项总会回调），
+    回调消息中附带已完成数量、成功/失败计数、最近若干项的平均速度和预计剩余时间。
+    """
     
-    def __init__(self, callback_func=None):
+    def __init__(self, callback_func=None, interval: float = 0.1, window: int = 50):
         self.callback_func = callback_func
+        self.interval = interval
         self.total = 0
         self.current = 0
+        self.success = 0
+        self.failed = 0
+        # 最近 window 项的完成时间，用于计算移动平均速度
+        self._times = deque(maxlen=window + 1)
+        self._last_emit = 0.0
     
     def set_total(self, total: int):
         """设置总数"""
         self.total = total
         self.current = 0
+        self.success = 0
+        self.failed = 0
+        self._times.clear()
+        self._times.append(time.perf_counter())
+        self._last_emit = 0.0
+    
+    @property
+    def rate(self) -> float:
+        """最近若干项的平均速度（项/秒）"""
+        if len(self._times) < 2:
+            return 0.0
+        span = self._times[-1] - self._times[0]
+        return (len(self._times) - 1) / span if span > 0 else 0.0
     
-    def update(self, message: str = ""):
-        """更新进度"""
+    @property
+    def eta(self) -> Optional[float]:
+        """预计剩余时间（秒），尚无法估计时为None"""
+        rate = self.rate
+        if rate <= 0:
+            return None
+        return (self.total - self.current) / rate
+    
+    def status_text(self, message: str = "") -> str:
+        """生成带统计信息的进度文本"""
+        parts = [f"{self.current}/{self.total}（成功 {self.success}，失败 {self.failed}）"]
+        rate = self.rate
+        if rate > 0:
+            parts.append(f"{rate:.1f} 份/秒")
+            if self.current < self.total:
+                parts.append(f"预计剩余 {format_duration(self.eta)}")
+        if message:
+            parts.append(message)
+        return "｜".join(parts)
+    
+    def update(self, message: str = "", success: bool = True):
+        """更新进度（每完成一项调用一次）"""
         self.current += 1
-        if self.callback_func:
-            progress = (self.current / self.total * 100) if self.total > 0 else 0
-            self.callback_func(progress, message)
+        if success:
+            self.success += 1
+        else:
+            self.failed += 1
+        now = time.perf_counter()
+        self._times.append(now)
+        if not self.callback_func:
+            return
+        if now - self._last_emit < self.interval and self.current < self.total:
+            return
+        self._last_emit = now
+        progress = (self.current / self.total * 100) if self.total > 0 else 0
+        self.callback_func(progress, self.status_text(message))
     
     def finish(self, message: str = "完成"):
         """完成进度"""
         if self.callback_func:
-            self.callback_func(100, message)
\ No newline at end of file
+            self.callback_func(100, message)
@@ -0,0 +1,311 @@
+"""
+心理测试反馈报告生成器 - 监视文件夹模式
+定时轮询输入目录，发现新增或修改的受试者数据Excel（按大小、修改时间和内容哈希判断）后，
+用常驻的报告生成器把报告生成到与文件名对应的输出子目录，并在台账中记录完成情况，重启后不会重复生成
+"""
+
+import os
+import json
+import time
+import tempfile
+import logging
+import threading
+from pathlib import Path
+from datetime import datetime
+from dataclasses import replace
+from typing import Any, Callable, Dict, List, Optional
+
+from utils import read_excel_file, file_signature
+from config_manager import ConfigManager, file_sha256
+from batch_engine import BatchOptions, create_persistent_pool
+
+logger = logging.getLogger(__name__)
+
+WORKBOOK_EXTENSIONS = ('.xlsx', '.xls')
+LEDGER_FILE = "watch_ledger.json"
+LEDGER_VERSION = 1
+PREFLIGHT_FILE = "数据预检问题.csv"
+
+# 轮询间隔（秒）；文件最后一次修改后至少经过 DEFAULT_SETTLE 秒、且两次轮询之间未变化才处理，避免读到正在写入的文件
+DEFAULT_INTERVAL = 2.0
+DEFAULT_SETTLE = 2.0
+
+# 台账中每个文件最多记录的错误数
+MAX_LEDGER_ERRORS = 20
+
+
+class WatchLedger:
+    """处理台账：数据文件名 -> 已处理时的文件签名（大小、修改时间、SHA-256）和生成结果"""
+
+    def __init__(self, ledger_file: str):
+        self.ledger_file = Path(ledger_file)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+
+    def load(self) -> 'WatchLedger':
+        """读取台账（不存在或损坏时从空台账开始）"""
+        if self.ledger_file.exists():
+            try:
+                with open(self.ledger_file, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                if data.get('version') == LEDGER_VERSION:
+                    self.entries = data['entries']
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"台账读取失败，将重新处理全部文件：{self.ledger_file} - {e}")
+        return self
+
+    def save(self):
+        """保存台账（先写独立的临时文件再替换，中途退出或多个进程同时保存时不会留下半个文件）"""
+        self.ledger_file.parent.mkdir(parents=True, exist_ok=True)
+        temp_file = None
+        try:
+            with tempfile.NamedTemporaryFile('w', encoding='utf-8', dir=self.ledger_file.parent,
+                                             prefix=self.ledger_file.stem + '.', suffix='.tmp',
+                                             delete=False) as f:
+                temp_file = f.name
+                json.dump({'version': LEDGER_VERSION, 'entries': self.entries}, f, ensure_ascii=False, indent=2)
+            os.replace(temp_file, self.ledger_file)
+        except BaseException:
+            if temp_file is not None:
+                try:
+                    os.unlink(temp_file)
+                except OSError:
+                    pass
+            raise
+
+    def get(self, name: str) -> Optional[Dict[str, Any]]:
+        return self.entries.get(name)
+
+    def record(self, name: str, entry: Dict[str, Any]):
+        self.entries[name] = entry
+        self.save()
+
+
+class FolderWatcher:
+    """监视输入目录并自动生成报告"""
+
+    def __init__(self, input_dir: str, output_root: str, config_file: str,
+                 interval: float = DEFAULT_INTERVAL,
+                 settle: float = DEFAULT_SETTLE,
+                 filename_mode: str = "name_custom",
+                 filename_separator: str = "",
+                 options: Optional[BatchOptions] = None,
+                 ledger_file: Optional[str] = None,
+                 on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None):
+        """
+        Args:
+            input_dir: 监视的输入目录（只处理目录下的 .xlsx / .xls 文件，不含子目录）
+            output_root: 输出根目录，每个数据文件的报告生成到 output_root/<文件名（不含扩展名）>
+            config_file: 评分配置Excel文件（文件改变后自动重新加载）
+            interval: 轮询间隔（秒）
+            settle: 文件最后一次修改后至少等待的秒数
+            filename_mode: 文件命名模式，见 ReportGenerator.generate_batch_reports
+            filename_separator: 文件名中的自定义内容
+            options: 执行选项（进程数、单行时间限制、内存限制等，见 BatchOptions）；常驻进程池由监视器创建，
+                忽略其中的 pool
+            ledger_file: 台账文件，默认为 output_root/watch_ledger.json
+            on_result: 每处理完一个文件后调用，参数为（数据文件名, 台账记录）
+        """
+        self.input_dir = Path(input_dir)
+        self.output_root = Path(output_root)
+        self.config_file = config_file
+        self.interval = interval
+        self.settle = settle
+        self.filename_mode = filename_mode
+        self.filename_separator = filename_separator
+        self.options = options or BatchOptions()
+        self.on_result = on_result
+        self.ledger = WatchLedger(ledger_file or self.output_root / LEDGER_FILE).load()
+
+        # 常驻的报告生成器、渲染进程池及评分配置文件的签名
+        self._generator = None
+        self._pool = None
+        self._config_signature = None
+        # 上一次轮询时各文件的（大小, 修改时间）
+        self._last_seen: Dict[str, tuple] = {}
+
+    def scan(self) -> List[Path]:
+        """输入目录中的数据文件（跳过Office临时文件和隐藏文件）"""
+        if not self.input_dir.is_dir():
+            return []
+        with os.scandir(self.input_dir) as entries:
+            return sorted(
+                Path(entry.path) for entry in entries
+                if entry.is_file()
+                and entry.name.lower().endswith(WORKBOOK_EXTENSIONS)
+                and not entry.name.startswith(('~$', '.'))
+            )
+
+    def output_dir_for(self, workbook: Path) -> Path:
+        """数据文件对应的输出目录"""
+        return self.output_root / workbook.stem
+
+    def output_dir_owner(self, workbook: Path) -> Optional[str]:
+        """
+        已使用同一输出目录的其他数据文件（如 a.xlsx 与 a.xls，不区分大小写）
+
+        台账中记录了该目录（且未因目录冲突被跳过）、仍在输入目录中的文件占用该目录；没有时返回None
+        """
+        key = str(self.output_dir_for(workbook)).lower()
+        for name, entry in self.ledger.entries.items():
+            if (name != workbook.name and not entry.get('conflict')
+                    and str(entry.get('output_dir', '')).lower() == key
+                    and (self.input_dir / name).is_file()):
+                return name
+        return None
+
+    def pending(self, settled_only: bool = True) -> List[Path]:
+        """
+        需要处理的数据文件：台账中没有记录、或大小/修改时间与记录不同，且已停止写入
+
+        Args:
+            settled_only: 只返回已停止写入的文件；False 时返回所有需要处理的文件（单次运行时使用）
+        """
+        now = time.time()
+        ready = []
+        seen = {}
+        for workbook in self.scan():
+            signature = file_signature(str(workbook))
+            if signature is None:
+                continue
+            _, mtime_ns, size = signature
+            entry = self.ledger.get(workbook.name)
+            if entry is not None and entry['size'] == size and entry['mtime_ns'] == mtime_ns:
+                continue
+            seen[workbook.name] = (size, mtime_ns)
+            if not settled_only or (self._last_seen.get(workbook.name) == (size, mtime_ns)
+                                    and now - mtime_ns / 1e9 >= self.settle):
+                ready.append(workbook)
+        self._last_seen = seen
+        return ready
+
+    def _get_generator(self):
+        """
+        常驻的报告生成器和渲染进程池；评分配置文件改变时重新创建
+        （只使用一个进程且不限制单行时间时没有进程池，逐行生成）
+        """
+        signature = file_signature(self.config_file)
+        if self._generator is None or signature != self._config_signature:
+            from report_generator import ReportGenerator
+
+            config_manager = ConfigManager()
+            if not config_manager.load_config_from_excel(self.config_file):
+                raise ValueError(f"评分配置加载失败：{self.config_file}")
+            self._generator = ReportGenerator(
+                task_config=config_manager.get_task_config(),
+                evaluation_dict=config_manager.get_evaluation_dict()
+            )
+            self._config_signature = signature
+            logger.info(f"已加载评分配置：{self.config_file}")
+            self.close()
+            self._pool = create_persistent_pool(self.options, self._generator.get_generator_settings())
+        return self._generator
+
+    def close(self):
+        """结束常驻的渲染进程"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool = None
+
+    def process(self, workbook: Path) -> Optional[Dict[str, Any]]:
+        """
+        处理一个数据文件并记录到台账
+
+        Returns:
+            台账记录；内容与台账中的记录相同（只是修改时间变化）时不重新生成，返回None
+        """
+        signature = file_signature(str(workbook))
+        if signature is None:
+            return None  # 文件已被移走
+        _, mtime_ns, size = signature
+        try:
+            digest = file_sha256(str(workbook))
+        except OSError as e:
+            logger.warning(f"文件暂时无法读取，稍后重试：{workbook.name} - {e}")
+            return None
+        previous = self.ledger.get(workbook.name)
+        if previous is not None and previous.get('sha256') == digest:
+            self.ledger.record(workbook.name, dict(previous, size=size, mtime_ns=mtime_ns))
+            logger.info(f"文件内容未改变，跳过：{workbook.name}")
+            return None
+
+        output_dir = self.output_dir_for(workbook)
+        owner = self.output_dir_owner(workbook)
+        entry = {
+            'size': size,
+            'mtime_ns': mtime_ns,
+            'sha256': digest,
+            'output_dir': str(output_dir),
+            'processed_at': datetime.now().isoformat(timespec='seconds'),
+            'total': 0,
+            'success': 0,
+            'failed': 0,
+            'errors': [],
+        }
+        start = time.perf_counter()
+        try:
+            if owner is not None:
+                # 不覆盖其他数据文件的报告和预检问题表；记入台账，文件改名或再次改变时重新处理
+                entry['conflict'] = owner
+                raise ValueError(f"输出目录 {output_dir} 已被 {owner} 使用，请修改文件名")
+            is_valid, message, data = read_excel_file(str(workbook))
+            if not is_valid:
+                raise ValueError(message)
+
+            # 按整列预检，问题表与报告放在一起
+            from preflight import preflight_check, format_issues, write_issues
+
+            issues = preflight_check(data, self.filename_mode)
+            if not issues.empty:
+                logger.warning(f"{workbook.name}: {format_issues(issues)}")
+                write_issues(issues, output_dir / PREFLIGHT_FILE)
+
+            generator = self._get_generator()
+            results = generator.generate_batch_reports(
+                data_file=str(workbook),
+                output_dir=str(output_dir),
+                filename_mode=self.filename_mode,
+                filename_separator=self.filename_separator,
+                data=data,
+                options=replace(self.options, pool=self._pool)
+            )
+            for key in ('total', 'success', 'failed'):
+                entry[key] = results[key]
+            entry['errors'] = results['errors'][:MAX_LEDGER_ERRORS]
+            if results.get('quarantined'):
+                entry['quarantined'] = results['quarantined']
+            if results.get('concurrency'):
+                entry['concurrency'] = results['concurrency']
+        except Exception as e:
+            # 读取或生成失败也记入台账，文件再次改变时重新处理
+            logger.error(f"处理失败：{workbook.name} - {str(e)}")
+            entry['errors'] = [str(e)]
+        entry['elapsed'] = round(time.perf_counter() - start, 2)
+
+        self.ledger.record(workbook.name, entry)
+        logger.info(f"已处理 {workbook.name}：成功 {entry['success']} 份，失败 {entry['failed']} 份，"
+                    f"耗时 {entry['elapsed']} 秒")
+        if self.on_result:
+            self.on_result(workbook.name, entry)
+        return entry
+
+    def poll_once(self, settled_only: bool = True) -> List[Dict[str, Any]]:
+        """轮询一次，处理所有已就绪的数据文件"""
+        processed = []
+        for workbook in self.pending(settled_only):
+            entry = self.process(workbook)
+            if entry is not None:
+                processed.append(entry)
+        return processed
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """持续监视，直到 stop_event 被设置（或按 Ctrl+C），退出时结束渲染进程"""
+        stop_event = stop_event or threading.Event()
+        logger.info(f"开始监视：{self.input_dir} -> {self.output_root}（每 {self.interval} 秒检查一次）")
+        try:
+            # 启动时先创建报告生成器和渲染进程，第一个文件到达时无需等待导入和字体注册
+            self._get_generator()
+            while not stop_event.is_set():
+                self.poll_once()
+                stop_event.wait(self.interval)
+        finally:
+            self.close()
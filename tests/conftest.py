@@ -0,0 +1,10 @@
+"""
+pytest 配置：与 src/main.py 一致，将src目录加入Python路径，以便直接导入各模块
+"""
+
+import os
+import sys
+
+SRC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'src')
+if SRC_DIR not in sys.path:
+    sys.path.insert(0, SRC_DIR)
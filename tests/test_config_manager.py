@@ -0,0 +1,116 @@
+"""评分配置校验：一次收集所有错误行；编译后配置缓存的读写"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from config_manager import ConfigManager, validate_config_frame
+
+LABELS = ['低分说明', '中等分说明', '高分说明']
+
+
+def _config(rows) -> pd.DataFrame:
+    return pd.DataFrame(rows, columns=['测评项目', '阈值1', '阈值2'] + LABELS)
+
+
+def test_valid_config_has_no_errors():
+    df = _config([
+        ['图形推理', 85, 115, '偏低', '中等', '较好'],
+        ['言语能力', '90', '110', '偏低', '中等', '较好'],
+    ])
+    assert validate_config_frame(df, 2, LABELS) == []
+
+
+def test_collects_every_error_row_with_excel_row_numbers():
+    df = _config([
+        ['图形推理', 85, 115, '偏低', '中等', '较好'],
+        ['言语能力', 'abc', 110, '偏低', '中等', '较好'],
+        ['数字运算', 120, 100, '偏低', '中等', '较好'],
+        [np.nan, np.nan, np.nan, np.nan, np.nan, np.nan],  # 空行不校验
+        ['专注力', 90, np.nan, '  ', '中等', None],
+    ])
+
+    errors = validate_config_frame(df, 2, LABELS)
+
+    assert errors == [
+        "第3行：阈值1必须是有效数字",
+        "第4行：阈值必须递增排列",
+        "第6行：阈值2必须是有效数字；低分说明不能为空；高分说明不能为空",
+    ]
+
+
+def test_equal_thresholds_are_not_increasing():
+    df = _config([['图形推理', 100, 100, '偏低', '中等', '较好']])
+    assert validate_config_frame(df, 2, LABELS) == ["第2行：阈值必须递增排列"]
+
+
+def _config_file(tmp_path):
+    config_file = tmp_path / "config.xlsx"
+    _config([
+        ['图形推理', 85, 115, '偏低', '中等', '较好'],
+        ['言语能力', 90, 110, '偏低', '中等', '较好'],
+    ]).to_excel(config_file, index=False)
+    return str(config_file)
+
+
+def test_compiled_config_is_cached_and_reused(tmp_path, monkeypatch):
+    config_file = _config_file(tmp_path)
+    cache_dir = tmp_path / "cache"
+    first = ConfigManager(cache_dir=str(cache_dir))
+    first.load_config_from_excel(config_file)
+    # 先写临时文件再替换，不留下临时文件
+    cache_files = [path.name for path in cache_dir.iterdir()]
+    assert len(cache_files) == 1 and cache_files[0].endswith(".json")
+
+    def fail(*args, **kwargs):
+        raise AssertionError("文件未改变时应读取缓存")
+
+    second = ConfigManager(cache_dir=str(cache_dir))
+    monkeypatch.setattr(second, "_compile_config_from_excel", fail)
+    second.load_config_from_excel(config_file)
+
+    assert second.task_config == first.task_config
+    assert second.evaluation_dict == first.evaluation_dict
+
+
+def test_corrupt_cache_is_reparsed_and_replaced(tmp_path):
+    config_file = _config_file(tmp_path)
+    cache_dir = tmp_path / "cache"
+    expected = ConfigManager(cache_dir=None)
+    expected.load_config_from_excel(config_file)
+    ConfigManager(cache_dir=str(cache_dir)).load_config_from_excel(config_file)
+    (cache_file,) = cache_dir.iterdir()
+    cache_file.write_text('{"version": ', encoding='utf-8')
+
+    manager = ConfigManager(cache_dir=str(cache_dir))
+    manager.load_config_from_excel(config_file)
+
+    assert manager.evaluation_dict == expected.evaluation_dict
+    assert ConfigManager(cache_dir=None)._read_compiled_config(cache_file) is not None
+
+
+def test_each_cache_write_uses_its_own_temp_file(tmp_path, monkeypatch):
+    cache_file = tmp_path / "config_abc.json"
+    temp_files = []
+    real_replace = os.replace
+
+    def record_replace(src, dst):
+        temp_files.append(src)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(os, "replace", record_replace)
+    manager = ConfigManager(cache_dir=str(tmp_path))
+    manager._write_compiled_config(cache_file, {"version": 1})
+    manager._write_compiled_config(cache_file, {"version": 2})
+
+    # 多个进程同时写同一缓存时，各自的临时文件互不覆盖
+    assert len(set(temp_files)) == 2
+    assert all(os.path.dirname(path) == str(tmp_path) for path in temp_files)
+    assert [path.name for path in tmp_path.iterdir()] == ["config_abc.json"]
+
+
+def test_failed_cache_write_leaves_no_temp_file(tmp_path):
+    manager = ConfigManager(cache_dir=str(tmp_path))
+    manager._write_compiled_config(tmp_path / "config_abc.json", {"version": object()})
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,67 @@
+"""评价引擎：整列分档与逐行评价的一致性"""
+
+import numpy as np
+import pandas as pd
+
+from evaluation_engine import EvaluationEngine, MISSING_TEXT, NO_LEVEL
+
+TASK_CONFIG = {"常规任务": ["图形推理", "言语能力", "未配置项目"], "特殊任务": ["负性情绪"]}
+EVALUATION_DICT = {
+    "图形推理": {"thresholds": [85, 115],
+                 "levels": {"low": "偏低", "mid": "中等", "high": "较好"}},
+    # 阈值非递增时，原逻辑遇到第一个未超过的阈值即停止
+    "言语能力": {"thresholds": [90, 80, 110, 120],
+                 "level_names": ["very_low", "low", "mid", "high", "very_high"],
+                 "levels": {"very_low": "很低", "low": "低", "mid": "中", "high": "高", "very_high": "很高"}},
+    "负性情绪": {"thresholds": [50],
+                 "level_names": ["low", "high"],
+                 "levels": {"low": "正常", "high": "需关注"}},
+    # 不在任务列表中的项目不参与评价
+    "其他项目": {"thresholds": [100], "levels": {"low": "低", "mid": "高"}},
+}
+
+
+def legacy_evaluation(task: str, score) -> str:
+    """改为整列分档之前 ReportGenerator._get_evaluation 的逐行评价逻辑"""
+    if pd.isna(score):
+        return "-"
+    if task in TASK_CONFIG["常规任务"] + TASK_CONFIG["特殊任务"] and task in EVALUATION_DICT:
+        config = EVALUATION_DICT[task]
+        level_names = config.get("level_names", ["low", "mid", "high"])
+        level_index = 0
+        for threshold in config["thresholds"]:
+            if score > threshold:
+                level_index += 1
+            else:
+                break
+        level_index = min(level_index, len(level_names) - 1)
+        return config["levels"].get(level_names[level_index], "-")
+    return "-"
+
+
+def test_classify_matches_legacy_evaluation():
+    columns = ["图形推理", "言语能力", "未配置项目", "负性情绪", "其他项目"]
+    values = [np.nan, 0, 50, 79.9, 80, 80.5, 85, 85.01, 90, 90.5, 100, 110, 115, 115.5, 120, 121, 200]
+    scores = np.array([[value] * len(columns) for value in values], dtype=np.float64)
+    engine = EvaluationEngine(TASK_CONFIG, EVALUATION_DICT)
+
+    levels = engine.classify(columns, scores)
+
+    assert levels.shape == scores.shape
+    for i, value in enumerate(values):
+        for j, task in enumerate(columns):
+            expected = legacy_evaluation(task, value)
+            assert engine.level_text(task, levels[i, j]) == expected, (task, value)
+            assert engine.evaluate(task, value) == expected, (task, value)
+            assert engine.level_index(task, value) == levels[i, j], (task, value)
+
+
+def test_unevaluable_cells_are_no_level_and_missing_text():
+    engine = EvaluationEngine(TASK_CONFIG, EVALUATION_DICT)
+    levels = engine.classify(["图形推理", "未配置项目", "其他项目"],
+                             np.array([[np.nan, 100.0, 100.0]]))
+
+    assert list(levels[0]) == [NO_LEVEL, NO_LEVEL, NO_LEVEL]
+    assert engine.level_text("图形推理", NO_LEVEL) == MISSING_TEXT == "-"
+    assert engine.level_name("图形推理", NO_LEVEL) == "-"
+    assert engine.evaluate("图形推理", "缺考") == "-"
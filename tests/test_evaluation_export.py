@@ -0,0 +1,55 @@
+"""评价结果导出：混合数值和文本成绩的 Parquet 往返"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from evaluation_engine import EvaluationEngine
+from evaluation_export import build_evaluation_frame, write_evaluation_frame
+from participant_store import ParticipantStore
+
+TASK_CONFIG = {"常规任务": ["图形推理", "言语能力"], "特殊任务": []}
+EVALUATION_DICT = {
+    "图形推理": {"thresholds": [90, 110], "levels": {"low": "偏低", "mid": "中等", "high": "较好"}},
+    "言语能力": {"thresholds": [90, 110], "levels": {"low": "偏低", "mid": "中等", "high": "较好"}},
+}
+
+
+def _mixed_frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "ID": [1001, "A-02", 1003],
+        "姓名": ["张三", "李四", "王五"],
+        "图形推理": [85.5, "缺考", 120],
+        "言语能力": [100, 95, np.nan],
+    })
+
+
+def test_parquet_round_trip_with_mixed_scores(tmp_path):
+    pytest.importorskip("pyarrow")
+    store = ParticipantStore.from_dataframe(_mixed_frame())
+    frame = build_evaluation_frame(store, EvaluationEngine(TASK_CONFIG, EVALUATION_DICT))
+    output_file = tmp_path / "result.parquet"
+
+    assert write_evaluation_frame(frame, str(output_file)) == "parquet"
+
+    loaded = pd.read_parquet(output_file)
+    assert len(loaded) == len(frame) == 6
+    assert list(loaded.columns) == list(frame.columns)
+    assert list(loaded["ID"].astype(str)) == ["1001", "1001", "A-02", "A-02", "1003", "1003"]
+    scores = dict(zip(zip(loaded["姓名"], loaded["测评项目"]), loaded["成绩"]))
+    assert scores[("李四", "图形推理")] == "缺考"
+    assert float(scores[("张三", "图形推理")]) == 85.5
+    assert pd.isna(scores[("王五", "言语能力")])
+    assert list(loaded["等级"].astype(str)) == list(frame["等级"].astype(str))
+
+
+def test_csv_round_trip_with_mixed_scores(tmp_path):
+    store = ParticipantStore.from_dataframe(_mixed_frame())
+    frame = build_evaluation_frame(store, EvaluationEngine(TASK_CONFIG, EVALUATION_DICT))
+    output_file = tmp_path / "result.csv"
+
+    assert write_evaluation_frame(frame, str(output_file)) == "csv"
+
+    loaded = pd.read_csv(output_file, encoding="utf-8-sig", dtype=str)
+    assert len(loaded) == 6
+    assert "缺考" in set(loaded["成绩"])
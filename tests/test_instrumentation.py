@@ -0,0 +1,66 @@
+"""内存跟踪：每1000份报告增长的拟合；性能分析结果的写入"""
+
+import pstats
+import sys
+
+import pytest
+
+from instrumentation import MemoryTracker, MIN_GROWTH_ROWS, MIN_GROWTH_SAMPLES, profile_call, write_profile
+
+
+def _tracker(samples):
+    tracker = MemoryTracker(sample_every=100)
+    tracker.samples = [{"rows": rows, "rss": rss} for rows, rss in samples]
+    return tracker
+
+
+def test_growth_is_none_with_too_few_samples():
+    tracker = _tracker([(0, 100), (100, 200), (200, 210), (300, 220)])
+    assert tracker.summary()["growth_per_1000"] is None
+
+
+def test_growth_is_none_when_samples_span_too_few_rows():
+    step = MIN_GROWTH_ROWS // (MIN_GROWTH_SAMPLES + 2)
+    samples = [(i * step, 1000 + i) for i in range(MIN_GROWTH_SAMPLES + 2)]
+    assert _tracker(samples).summary()["growth_per_1000"] is None
+
+
+def test_growth_excludes_warm_up_sample():
+    # 第一个采样区间的预热开销（+10000）不计入增长，之后每份报告增长2字节
+    samples = [(0, 1000), (100, 11000)] + [(rows, 11000 + 2 * rows) for rows in range(200, 1100, 100)]
+    summary = _tracker(samples).summary()
+    assert abs(summary["growth_per_1000"] - 2000) < 1e-6
+    assert summary["peak_rss"] == 11000 + 2 * 1000
+
+
+def _busy(n):
+    total = 0
+    for i in range(n):
+        total += i * i
+    return total
+
+
+def _profile(tmp_path):
+    result, profiler = profile_call(_busy, 300000)
+    assert result == _busy(300000)
+    files = write_profile(profiler, tmp_path)
+    stats = pstats.Stats(files["profile_file"])
+    summary = open(files["profile_summary_file"], encoding="utf-8").read()
+    assert any(function == "_busy" for _, _, function in stats.stats)
+    assert "_busy" in summary
+    return summary
+
+
+def test_profile_falls_back_to_cprofile(tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, "pyinstrument", None)  # 未安装 pyinstrument
+    summary = _profile(tmp_path)
+    assert summary.startswith("分析方式: cProfile")
+
+
+def test_profile_uses_sampling_profiler_when_available(tmp_path):
+    pytest.importorskip("pyinstrument")
+    summary = _profile(tmp_path)
+    assert summary.startswith("分析方式: pyinstrument")
+    # 采样分析没有调用次数
+    busy_line = next(line for line in summary.splitlines() if "_busy" in line)
+    assert busy_line.split()[2] == "-"
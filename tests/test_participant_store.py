@@ -0,0 +1,70 @@
+"""受试者列式存储：共享内存往返"""
+
+import numpy as np
+import pandas as pd
+
+from participant_store import ParticipantStore
+
+
+def _frame() -> pd.DataFrame:
+    return pd.DataFrame({
+        "姓名": ["张三", "李四", None],
+        "性别": ["男", "女", "男"],
+        "生日": ["20100101", "20091231", "00000000"],
+        "年龄": [15, 16, 15],
+        "测试日期": ["20250710", "20250710", "20250711"],
+        "ID": [1001, 1002, 1003],
+        "图形推理": [85.5, np.nan, 120.0],
+        "言语能力": [100, 95, 110],
+        "专注力": ["105分", "缺考", None],
+        "备注": [1, "A", 2.5],
+    })
+
+
+def _assert_same_values(actual: ParticipantStore, expected: ParticipantStore):
+    assert actual.columns == expected.columns
+    assert actual.score_columns == expected.score_columns
+    assert actual.score_kinds == expected.score_kinds
+    np.testing.assert_array_equal(actual.scores, expected.scores)
+    for position in range(len(expected)):
+        for column in expected.columns:
+            left, right = actual.value(position, column), expected.value(position, column)
+            assert (pd.isna(left) and pd.isna(right)) or left == right, (position, column)
+
+
+def test_shared_memory_round_trip():
+    store = ParticipantStore.from_dataframe(_frame())
+    store.levels = np.array([[0, -1, 1, 2], [1, 2, -1, 0], [2, 1, 0, -1]], dtype=np.int8)
+    shm, descriptor = store.to_shared_memory()
+    try:
+        attached, attached_shm = ParticipantStore.attach_shared_memory(descriptor)
+        try:
+            assert len(attached) == len(store) == 3
+            _assert_same_values(attached, store)
+            np.testing.assert_array_equal(attached.levels, store.levels)
+            assert attached.record(1)["专注力"] == "缺考"
+            assert list(attached.column_values("姓名")[:2]) == ["张三", "李四"]
+            assert pd.isna(attached.column_values("姓名")[2])
+            # 挂载的数组直接引用共享内存，只读
+            assert not attached.scores.flags.writeable
+        finally:
+            attached = None
+            attached_shm.close()
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def test_descriptor_does_not_grow_with_rows():
+    small = ParticipantStore.from_dataframe(_frame())
+    large = ParticipantStore.from_dataframe(pd.concat([_frame()] * 100, ignore_index=True))
+    small_shm, small_descriptor = small.to_shared_memory()
+    large_shm, large_descriptor = large.to_shared_memory()
+    try:
+        assert small_descriptor.keys() == large_descriptor.keys()
+        assert small_descriptor["tables"] == large_descriptor["tables"]
+        assert large_descriptor["layout"]["scores"][2] == (300, 4)
+    finally:
+        for shm in (small_shm, large_shm):
+            shm.close()
+            shm.unlink()
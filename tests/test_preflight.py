@@ -0,0 +1,66 @@
+"""数据预检：各类问题的识别"""
+
+import numpy as np
+import pandas as pd
+
+from preflight import ISSUE_COLUMNS, ISSUE_TYPES, SEVERITY_ERROR, preflight_check, summarize_issues
+
+
+def _frame(**overrides) -> pd.DataFrame:
+    data = {
+        "姓名": ["张三", "李四", "王五"],
+        "性别": ["男", "女", "男"],
+        "生日": ["20100101", "20091231", "20080808"],
+        "年龄": [15, 16, 17],
+        "测试日期": ["20250710", "20250710", "20250710"],
+        "ID": ["A1", "A2", "A3"],
+        "测评1": [100, 90, 110],
+        "测评2": [95, 105, 100],
+        "测评3": [88, 92, 120],
+    }
+    data.update(overrides)
+    return pd.DataFrame(data)
+
+
+def _issues_by_row(issues: pd.DataFrame):
+    return {(row['行号'], row['问题']): row['列'] for _, row in issues.iterrows()}
+
+
+def test_clean_data_has_no_issues():
+    issues = preflight_check(_frame())
+    assert issues.empty
+    assert list(issues.columns) == ISSUE_COLUMNS
+
+
+def test_detects_each_issue_type():
+    df = _frame(**{
+        "姓名": ["张三", "张三", "王五"],
+        "生日": ["20100101", "不详", "20080808"],
+        "测评1": ["105分", 90, "缺考"],
+        "测评2": [95, 105, np.nan],
+    })
+
+    issues = preflight_check(df)
+    found = _issues_by_row(issues)
+
+    assert found[(2, 'text_score')] == "测评1"
+    assert found[(4, 'invalid_score')] == "测评1"
+    assert found[(4, 'too_few_scores')] == ""
+    assert found[(3, 'invalid_date')] == "生日"
+    assert found[(2, 'duplicate_filename')] == found[(3, 'duplicate_filename')] == "姓名"
+    assert set(issues['问题']) == set(ISSUE_TYPES)
+    # 行号与Excel一致且有序，级别来自 ISSUE_TYPES
+    assert list(issues['行号']) == sorted(issues['行号'])
+    for _, row in issues.iterrows():
+        assert row['级别'] == ISSUE_TYPES[row['问题']][0]
+
+    summary = summarize_issues(issues)
+    assert summary['error_rows'] == 3
+    assert (issues['级别'] == SEVERITY_ERROR).sum() == 3
+
+
+def test_duplicate_ids_only_matter_in_id_mode():
+    df = _frame(ID=["A1", "a1", "A3"])
+    assert 'duplicate_filename' not in set(preflight_check(df, "name_custom")['问题'])
+    duplicates = preflight_check(df, "id_only")
+    assert list(duplicates.loc[duplicates['问题'] == 'duplicate_filename', '行号']) == [2, 3]
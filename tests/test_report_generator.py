@@ -0,0 +1,64 @@
+"""批量生成：内存受限模式按块处理已读取的数据"""
+
+import pandas as pd
+
+from batch_engine import BatchOptions
+from report_generator import ReportGenerator
+
+TASK_CONFIG = {"常规任务": ["图形推理", "言语能力", "数字运算"], "特殊任务": []}
+EVALUATION_DICT = {
+    task: {"thresholds": [85, 115], "levels": {"low": "偏低", "mid": "中等", "high": "较好"}}
+    for task in TASK_CONFIG["常规任务"]
+}
+
+
+def _frame(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "姓名": [f"受试者{i:03d}" for i in range(rows)],
+        "性别": ["男", "女"] * (rows // 2) + ["男"] * (rows % 2),
+        "生日": ["20100101"] * rows,
+        "年龄": [15] * rows,
+        "测试日期": ["20250710"] * rows,
+        "ID": [f"A{i:03d}" for i in range(rows)],
+        "图形推理": [80 + i for i in range(rows)],
+        "言语能力": [100] * rows,
+        "数字运算": [120] * rows,
+    })
+
+
+def _recording_generator(rendered: list) -> ReportGenerator:
+    """逐行渲染只记录收到的行和输出文件，不实际绘制PDF"""
+    generator = ReportGenerator(TASK_CONFIG, EVALUATION_DICT)
+
+    def record(row, output_path, image_dir=None):
+        rendered.append((row["ID"], output_path))
+        return True
+
+    generator.generate_single_report = record
+    return generator
+
+
+def test_bounded_batch_with_preloaded_data_renders_every_row(tmp_path):
+    df = _frame(7)
+    rendered = []
+    generator = _recording_generator(rendered)
+
+    results = generator.generate_batch_reports(
+        str(tmp_path / "unused.xlsx"), str(tmp_path / "out"), filename_mode="id_only",
+        data=df, options=BatchOptions(max_rows_in_flight=3))
+
+    assert results["errors"] == []
+    assert results["total"] == results["success"] == 7
+    assert [row_id for row_id, _ in rendered] == list(df["ID"])
+    assert len({path for _, path in rendered}) == 7
+
+
+def test_bounded_batch_matches_unbounded_batch(tmp_path):
+    unbounded, bounded = [], []
+    _recording_generator(unbounded).generate_batch_reports(
+        str(tmp_path / "unused.xlsx"), str(tmp_path / "a"), data=_frame(5))
+    _recording_generator(bounded).generate_batch_reports(
+        str(tmp_path / "unused.xlsx"), str(tmp_path / "a"), data=_frame(5),
+        options=BatchOptions(max_rows_in_flight=2))
+
+    assert bounded == unbounded
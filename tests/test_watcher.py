@@ -0,0 +1,171 @@
+"""监视文件夹模式：台账的保存与恢复、待处理文件的判断"""
+
+import json
+import os
+import time
+
+import pytest
+
+from config_manager import file_sha256
+from watcher import LEDGER_VERSION, FolderWatcher, WatchLedger
+
+
+def _entry(**fields):
+    entry = {'size': 1024, 'mtime_ns': 1, 'sha256': 'abc', 'total': 3, 'success': 3, 'failed': 0,
+             'errors': []}
+    entry.update(fields)
+    return entry
+
+
+def test_save_and_load_round_trip(tmp_path):
+    ledger_file = tmp_path / "out" / "watch_ledger.json"
+    ledger = WatchLedger(str(ledger_file))
+    ledger.record("a.xlsx", _entry())
+    ledger.record("b.xlsx", _entry(success=2, failed=1, errors=["第2个: 生成失败"]))
+    ledger.save()
+
+    loaded = WatchLedger(str(ledger_file)).load()
+
+    assert loaded.entries == ledger.entries
+    assert loaded.get("b.xlsx")["errors"] == ["第2个: 生成失败"]
+    assert loaded.get("missing.xlsx") is None
+    # 先写临时文件再替换，不留下临时文件
+    assert [path.name for path in ledger_file.parent.iterdir()] == ["watch_ledger.json"]
+
+
+
+def test_failed_save_leaves_previous_ledger_and_no_temp_file(tmp_path):
+    ledger_file = tmp_path / "watch_ledger.json"
+    ledger = WatchLedger(str(ledger_file))
+    ledger.record("a.xlsx", _entry())
+    ledger.entries["b.xlsx"] = {"bad": object()}
+
+    with pytest.raises(TypeError):
+        ledger.save()
+
+    assert WatchLedger(str(ledger_file)).load().entries == {"a.xlsx": _entry()}
+    assert [path.name for path in tmp_path.iterdir()] == ["watch_ledger.json"]
+
+def test_missing_file_starts_empty(tmp_path):
+    assert WatchLedger(str(tmp_path / "watch_ledger.json")).load().entries == {}
+
+
+def test_corrupt_file_starts_empty_and_is_replaced_on_save(tmp_path):
+    ledger_file = tmp_path / "watch_ledger.json"
+    ledger_file.write_text('{"version": 1, "entries": {"a.xlsx": ', encoding='utf-8')
+
+    ledger = WatchLedger(str(ledger_file)).load()
+    assert ledger.entries == {}
+
+    ledger.record("a.xlsx", _entry())
+    ledger.save()
+    assert WatchLedger(str(ledger_file)).load().entries == {"a.xlsx": _entry()}
+
+
+def test_other_version_or_missing_entries_starts_empty(tmp_path):
+    ledger_file = tmp_path / "watch_ledger.json"
+    ledger_file.write_text(json.dumps({'version': LEDGER_VERSION + 1, 'entries': {"a.xlsx": _entry()}}),
+                           encoding='utf-8')
+    assert WatchLedger(str(ledger_file)).load().entries == {}
+
+    ledger_file.write_text(json.dumps({'version': LEDGER_VERSION}), encoding='utf-8')
+    assert WatchLedger(str(ledger_file)).load().entries == {}
+
+
+def _watcher(tmp_path, settle=0.0, **kwargs) -> FolderWatcher:
+    (tmp_path / "in").mkdir(exist_ok=True)
+    return FolderWatcher(str(tmp_path / "in"), str(tmp_path / "out"), str(tmp_path / "missing_config.xlsx"),
+                         settle=settle, **kwargs)
+
+
+def _write(path, content=b"data", age=0.0):
+    path.write_bytes(content)
+    if age:
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+    return path
+
+
+def test_scan_skips_office_temp_hidden_and_other_files(tmp_path):
+    watcher = _watcher(tmp_path)
+    inbox = tmp_path / "in"
+    for name in ("b.xls", "a.xlsx", "~$a.xlsx", ".hidden.xlsx", "notes.txt", "C.XLSX"):
+        _write(inbox / name)
+    (inbox / "sub.xlsx").mkdir()
+
+    assert [path.name for path in watcher.scan()] == ["C.XLSX", "a.xlsx", "b.xls"]
+
+
+def test_pending_waits_until_file_is_unchanged_between_polls(tmp_path):
+    watcher = _watcher(tmp_path)
+    workbook = _write(tmp_path / "in" / "a.xlsx")
+
+    assert watcher.pending() == []  # 第一次看到
+    assert watcher.pending() == [workbook]  # 两次轮询之间未变化
+
+    _write(workbook, b"more data")
+    assert watcher.pending() == []  # 仍在写入
+    assert watcher.pending() == [workbook]
+    # 单次运行时不等待
+    _write(workbook, b"final data")
+    assert watcher.pending(settled_only=False) == [workbook]
+
+
+def test_pending_waits_for_settle_time_after_last_write(tmp_path):
+    watcher = _watcher(tmp_path, settle=60)
+    recent = _write(tmp_path / "in" / "recent.xlsx")
+    settled = _write(tmp_path / "in" / "settled.xlsx", age=120)
+
+    watcher.pending()
+    assert watcher.pending() == [settled]
+    assert recent not in watcher.pending()
+
+
+def test_pending_skips_files_recorded_with_same_size_and_mtime(tmp_path):
+    watcher = _watcher(tmp_path)
+    workbook = _write(tmp_path / "in" / "a.xlsx", age=10)
+    stat = workbook.stat()
+    watcher.ledger.entries["a.xlsx"] = _entry(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+
+    watcher.pending()
+    assert watcher.pending() == []
+
+    _write(workbook, age=5)  # 内容相同，修改时间改变
+    watcher.pending()
+    assert watcher.pending() == [workbook]
+
+
+def test_process_skips_when_only_mtime_changed(tmp_path):
+    results = []
+    watcher = _watcher(tmp_path, on_result=lambda name, entry: results.append(name))
+    workbook = _write(tmp_path / "in" / "a.xlsx", age=5)
+    watcher.ledger.entries["a.xlsx"] = _entry(size=workbook.stat().st_size, mtime_ns=1,
+                                              sha256=file_sha256(str(workbook)),
+                                              output_dir=str(tmp_path / "out" / "a"))
+
+    assert watcher.process(workbook) is None
+
+    # 只更新台账中的修改时间，不重新生成（评分配置不存在，生成时会记录错误）
+    assert watcher.ledger.get("a.xlsx")["mtime_ns"] == workbook.stat().st_mtime_ns
+    assert watcher.ledger.get("a.xlsx")["errors"] == []
+    assert results == []
+    assert watcher.pending(settled_only=False) == []
+
+
+def test_process_does_not_overwrite_reports_of_same_named_workbook(tmp_path):
+    watcher = _watcher(tmp_path)
+    owner = _write(tmp_path / "in" / "a.xlsx")
+    watcher.ledger.entries["a.xlsx"] = _entry(sha256=file_sha256(str(owner)),
+                                              output_dir=str(watcher.output_dir_for(owner)))
+    newcomer = _write(tmp_path / "in" / "a.xls", b"other data")
+
+    entry = watcher.process(newcomer)
+
+    assert entry["conflict"] == "a.xlsx"
+    assert "a.xlsx" in entry["errors"][0]
+    assert entry["total"] == 0
+    assert not (tmp_path / "out" / "a").exists()
+    assert watcher.output_dir_owner(owner) is None  # 被跳过的文件不占用目录
+    # 原来的文件移走后目录可以使用
+    owner.unlink()
+    assert watcher.output_dir_owner(newcomer) is None